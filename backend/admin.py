@@ -0,0 +1,66 @@
+# backend/admin.py
+import functools
+
+from flask import Blueprint, Response, jsonify, request
+
+from backend.metrics import metrics_payload
+from backend.profiling import collapsed, get_profile_store, is_admin, summary
+
+admin = Blueprint('admin', __name__)
+
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin(request):
+            return jsonify({"error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin.route('/health')
+@admin.route('/api/health')
+def health_check():
+    return jsonify({"status": "healthy"})
+
+
+@admin.route('/metrics')
+def metrics():
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
+
+
+@admin.route('/admin/cache')
+@admin_only
+def cache_report():
+    from backend.cache import cache_stats
+    return jsonify(cache_stats())
+
+
+@admin.route('/admin/quota')
+@admin_only
+def quota_report():
+    from backend.youtube_api import get_youtube_api
+    try:
+        youtube = get_youtube_api()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"keys": youtube.quota_status(), "daily_quota": youtube.daily_quota})
+
+
+@admin.route('/admin/profiles')
+@admin_only
+def list_profiles():
+    return jsonify({"profiles": [summary(profile) for profile in get_profile_store().list()]})
+
+
+@admin.route('/admin/profiles/<profile_id>')
+@admin_only
+def get_profile(profile_id):
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get('format', 'collapsed') == 'json':
+        return jsonify(profile)
+    # Collapsed stacks, e.g. `curl ... | flamegraph.pl > profile.svg`
+    return Response(collapsed(profile), mimetype='text/plain')
@@ -1,25 +1,295 @@
-from flask import Flask, request, jsonify
-from backend.youtube_api import fetch_comments
-from backend.sentiment_analysis import analyze_sentiment
+from flask import Flask, Response, g, request, jsonify, send_file
+from backend.youtube_api import iter_comment_batches
+from backend.youtube_async import fetch_comment_batch, fetch_video_metadata_batch, get_async_client, run_sync
+from backend.cache import cache_comment_batch, get_cached_comment_batch, get_or_refresh, video_cache_key
+from backend.comment_batch import CommentBatch
+from backend.config import Config
+from backend.sentiment_analysis import analyze_sentiment, merge_counts, score_comments, summarize_scores, SentimentAccumulator, SentimentTrends, COMPOUND, TREND_RESOLUTIONS
+from backend.data_visualization import (
+    PLOTLY_JS_URL,
+    build_engagement_figure,
+    build_sentiment_distribution_figure,
+    build_sentiment_trends_figure,
+    build_wordcloud_figure,
+    figure_spec,
+    plotly_js_path
+)
+from backend.singleflight import create_single_flight
+from backend.jobs import create_job_queue
+from backend.timing import stage, stage_durations, start_timing, server_timing_header
+from backend import utils
+from backend.admin import admin
+from backend.profiling import profiled
+from backend.metrics import REQUEST_SECONDS, STAGE_SECONDS, render_timer
+import asyncio
+import time
 import os
+import json
 import logging
 from backend.exceptions import YouTubeAPIError, VideoNotFoundError, QuotaExceededError, InternalServerError, ServiceUnavailableError, BadRequestError
-import aiohttp
-import asyncio
 
 app = Flask(__name__)
+app.register_blueprint(admin)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
-# YouTube API key
-API_KEY = os.environ.get("YOUTUBE_API_KEY") 
+# YouTube API keys. Every fetch spreads its calls over them by remaining
+# quota through youtube_api.get_youtube_api().
+if not (os.environ.get("YOUTUBE_API_KEYS") or os.environ.get("YOUTUBE_API_KEY")):
+    raise ValueError("No YouTube API key found in environment variables. Please set YOUTUBE_API_KEY or YOUTUBE_API_KEYS.")
+
+@app.before_request
+def start_server_timing():
+    g.timing = start_timing()
+
+@app.after_request
+def add_server_timing(response):
+    # Per-stage durations, so load tests and browsers can see where the time went.
+    header = server_timing_header()
+    if header:
+        response.headers['Server-Timing'] = header
+    for name, duration in stage_durations().items():
+        STAGE_SECONDS.labels(name).observe(duration / 1000)
+    REQUEST_SECONDS.labels(request.endpoint or 'unknown', request.method, response.status_code).observe(
+        time.perf_counter() - g.timing['started']
+    )
+    return response
+
+# Concurrent requests for the same video share one fetch and analysis.
+analysis_flight = create_single_flight()
+
+def run_analysis(video_id):
+    """
+    Fetches a video's comments and analyzes their sentiment.
+    """
+    with stage('fetch'):
+        comments = run_sync(fetch_comment_batch(video_id))
+    with stage('score'):
+        sentiment = analyze_sentiment(comments)
+    return {
+        "sentiment": sentiment,
+        "comment_count": len(comments)
+    }
+
+def get_cached_analysis(video_id):
+    """
+    Returns a video's analysis, serving a stale cached one while it refreshes.
+    """
+    key = video_cache_key(video_id, 'analysis')
+    with stage('analysis'):
+        return get_or_refresh(
+            key,
+            lambda: analysis_flight.do(key, run_analysis, video_id),
+            ttl=Config.ANALYSIS_FRESH_TTL,
+            stale_ttl=Config.ANALYSIS_STALE_TTL
+        )
+
+def run_analysis_job(job, report):
+    """
+    Analyzes a video page by page for a background job, reporting progress.
+    """
+    accumulator = SentimentAccumulator()
+    for page in iter_comment_batches(job['video_id']):
+        accumulator.update(page)
+        report(pages=accumulator.pages, comments=accumulator.comment_count)
+    return {
+        "sentiment": accumulator.result(),
+        "comment_count": accumulator.comment_count
+    }
+
+analysis_jobs = create_job_queue(run_analysis_job)
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    body = request.get_json(silent=True) or {}
+    video_url = body.get('url') or request.args.get('url')
+    if not video_url:
+        return jsonify({"error": "Missing video URL"}), 400
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        return jsonify({"error": "Invalid YouTube URL"}), 400
+
+    job = analysis_jobs.submit(video_id)
+    return jsonify(job), 202, {"Location": f"/jobs/{job['id']}"}
 
-if not API_KEY:
-    raise ValueError("No YouTube API key found in environment variables. Please set YOUTUBE_API_KEY.")
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = analysis_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 202
+
+
+async def analyze_batch_video(client, semaphore, video_id, metadata):
+    """
+    Analyzes one video of a batch, turning its failure into a per-video error.
+    """
+    try:
+        async with semaphore:
+            comments = await fetch_comment_batch(video_id, client=client)
+        sentiment = await asyncio.to_thread(analyze_sentiment, comments)
+    except YouTubeAPIError as e:
+        logging.error(f"Batch analysis failed for video_id {video_id}: {str(e)}")
+        return {"video_id": video_id, "error": str(e), "status_code": e.status_code}
+    except Exception as e:
+        logging.error(f"Batch analysis failed for video_id {video_id}: {str(e)}")
+        return {"video_id": video_id, "error": "An error occurred", "status_code": 500}
+    return {
+        "video_id": video_id,
+        "title": metadata['snippet'].get('title') if metadata else None,
+        "sentiment": sentiment,
+        "comment_count": len(comments)
+    }
+
+async def analyze_batch_videos(video_ids, metadata):
+    """
+    Analyzes the videos of a batch concurrently on the shared client.
+    """
+    client = get_async_client()
+    semaphore = asyncio.Semaphore(Config.BATCH_CONCURRENCY)
+    return await asyncio.gather(*(
+        analyze_batch_video(client, semaphore, video_id, metadata.get(video_id))
+        for video_id in video_ids
+    ))
+
+@app.route('/batch', methods=['POST'])
+def analyze_batch():
+    body = request.get_json(silent=True) or {}
+    videos = body.get('videos') or body.get('urls') or []
+    if not isinstance(videos, list) or not videos:
+        return jsonify({"error": "Provide a non-empty list of video URLs or IDs as 'videos'"}), 400
+    if len(videos) > Config.BATCH_MAX_VIDEOS:
+        return jsonify({"error": f"At most {Config.BATCH_MAX_VIDEOS} videos per batch"}), 400
+
+    invalid = []
+    video_ids = []
+    for value in videos:
+        video_id = extract_video_id(value)
+        if video_id is None:
+            invalid.append({"video_id": None, "input": value, "error": "Invalid YouTube URL", "status_code": 400})
+        elif video_id not in video_ids:
+            video_ids.append(video_id)
+
+    try:
+        with stage('metadata'):
+            metadata = run_sync(fetch_video_metadata_batch(video_ids))
+    except YouTubeAPIError as e:
+        logging.error(f"Batch metadata lookup failed: {str(e)}")
+        metadata = {}
+    with stage('analysis'):
+        analyses = run_sync(analyze_batch_videos(video_ids, metadata))
+
+    succeeded = [analysis for analysis in analyses if 'error' not in analysis]
+    failed = [analysis for analysis in analyses if 'error' in analysis] + invalid
+    return jsonify({
+        "videos": succeeded + failed,
+        "combined": {
+            "sentiment": merge_counts(analysis['sentiment'] for analysis in succeeded),
+            "comment_count": sum(analysis['comment_count'] for analysis in succeeded)
+        },
+        "succeeded": len(succeeded),
+        "failed": len(failed)
+    })
+
+
+def sentiment_overview(compound):
+    """
+    Summarizes compound scores in the overall_stats shape the distribution chart expects.
+    """
+    summary = summarize_scores(compound)
+    total = summary['comment_count']
+    return {'overall_stats': {
+        'total_comments': total,
+        'sentiment_distribution': {
+            label: summary[label] / total if total else 0.0
+            for label in ['positive', 'neutral', 'negative']
+        },
+        'average_sentiment': summary['score_sum'] / total if total else 0.0
+    }}
+
+async def collect_trends(video_id, resolution):
+    """
+    Builds a video's sentiment trends page by page as its comments arrive.
+    """
+    trends = SentimentTrends(resolution)
+    async for page in get_async_client().iter_comment_batches(video_id):
+        await asyncio.to_thread(trends.update, page)
+    return trends.trends()
+
+async def build_chart(chart, video_id, resolution='hour'):
+    """
+    Builds one of the CHARTS figures for a video. Run it with run_sync().
+    """
+    if chart == 'trends':
+        trends = await collect_trends(video_id, resolution)
+        if not trends:
+            raise ValueError("No comments to chart")
+        return await asyncio.to_thread(build_sentiment_trends_figure, trends)
+
+    if chart == 'engagement':
+        metadata = (await fetch_video_metadata_batch([video_id])).get(video_id)
+        if metadata is None:
+            raise VideoNotFoundError()
+        return await asyncio.to_thread(build_engagement_figure, metadata)
+
+    comments = await fetch_comment_batch(video_id)
+    if chart == 'wordcloud':
+        return await asyncio.to_thread(build_wordcloud_figure, comments)
+    scores = await asyncio.to_thread(score_comments, comments)
+    return await asyncio.to_thread(build_sentiment_distribution_figure, sentiment_overview(scores[:, COMPOUND]))
+
+CHARTS = ('sentiment', 'engagement', 'wordcloud', 'trends')
+
+@app.route('/charts/<chart>')
+def get_chart(chart):
+    if chart not in CHARTS:
+        return jsonify({"error": f"Unknown chart; expected one of {', '.join(CHARTS)}"}), 404
+
+    video_id = extract_video_id(request.args.get('url', ''))
+    if not video_id:
+        return jsonify({"error": "Missing or invalid YouTube URL"}), 400
+
+    chart_format = request.args.get('format', 'json')
+    if chart_format not in ['json', 'html']:
+        return jsonify({"error": "Unsupported chart format"}), 400
+
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in TREND_RESOLUTIONS:
+        return jsonify({"error": "Unsupported trend resolution"}), 400
+
+    try:
+        fig = run_sync(build_chart(chart, video_id, resolution))
+    except YouTubeAPIError as e:
+        logging.error(f"Failed to build {chart} chart for video_id {video_id}: {str(e)}")
+        return jsonify({"error": str(e)}), e.status_code
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    with render_timer(chart, chart_format):
+        if chart_format == 'html':
+            body, mimetype = fig.to_html(include_plotlyjs=PLOTLY_JS_URL, full_html=True), 'text/html'
+        else:
+            body, mimetype = figure_spec(fig), 'application/json'
+    return Response(body, mimetype=mimetype)
+
+@app.route(PLOTLY_JS_URL)
+def plotly_js():
+    # Every chart page shares this one bundle, so browsers download it once.
+    return send_file(plotly_js_path(), mimetype='application/javascript', max_age=86400)
 
 
 @app.route('/comments')
+@profiled
 async def get_comments():
     video_url = request.args.get('url')
     if not video_url:
@@ -29,16 +299,29 @@ async def get_comments():
     if not video_id:
         return jsonify({"error": "Invalid YouTube URL"}), 400
 
+    stream_format = request.args.get('stream')
+    if stream_format:
+        if stream_format not in STREAM_MIMETYPES:
+            return jsonify({"error": "Unsupported stream format"}), 400
+        return Response(
+            stream_analysis(video_id, stream_format),
+            mimetype=STREAM_MIMETYPES[stream_format],
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
     try:
-        comments = await fetch_comments(video_id, API_KEY)
-        if comments is None:
-            return jsonify({"error": "Failed to fetch comments from YouTube API"}), 500
-
-        sentiment_results = analyze_sentiment(comments)
-        return jsonify({
-            "sentiment": sentiment_results,
-            "comment_count": len(comments)
-        })
+        if request.args.get('incremental', '').lower() in ['true', '1', 't']:
+            # Imported lazily so the app can start without a database.
+            from backend.comment_sync import sync_comments
+            synced = await asyncio.to_thread(sync_comments, video_id)
+            return jsonify({
+                "sentiment": synced['sentiment'],
+                "comment_count": synced['comment_count'],
+                "new_comment_count": len(synced['new_comments'])
+            })
+
+        result = await asyncio.to_thread(get_cached_analysis, video_id)
+        return jsonify(result)
     except VideoNotFoundError as e:
         logging.error(f"Video not found for video_id {video_id}: {str(e)}")
         return jsonify({"error": "Video not found"}), e.status_code
@@ -61,23 +344,69 @@ async def get_comments():
         logging.error(f"Error during real-time analysis for video_id {video_id}: {str(e)}")
         return jsonify({"error": "An error occurred"}), 500
 
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+def format_stream_event(event, stream_format):
+    """
+    Serializes one partial result for a streamed /comments response.
+    """
+    payload = json.dumps(event)
+    if stream_format == 'sse':
+        return f"event: {'done' if event.get('done') else 'progress'}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+def stream_analysis(video_id, stream_format):
+    """
+    Yields running sentiment counts for a video after every fetched comment page.
+    """
+    accumulator = SentimentAccumulator()
+    cached_comments = get_cached_comment_batch(video_id)
+    pages = [cached_comments] if cached_comments is not None else iter_comment_batches(video_id)
+    fetched = []
+    try:
+        for comments in pages:
+            if cached_comments is None:
+                fetched.append(comments)
+            page_sentiment = accumulator.update(comments)
+            yield format_stream_event({
+                "video_id": video_id,
+                "page": accumulator.pages,
+                "page_sentiment": page_sentiment,
+                "sentiment": accumulator.result(),
+                "comment_count": accumulator.comment_count,
+                "done": False
+            }, stream_format)
+    except Exception as e:
+        logging.error(f"Error while streaming analysis for video_id {video_id}: {str(e)}")
+        yield format_stream_event({
+            "video_id": video_id,
+            "error": "Failed to fetch comments from YouTube API",
+            "done": True
+        }, stream_format)
+        return
+    if cached_comments is None:
+        # Only a complete fetch is cached, as fetch_comment_batch() does.
+        cache_comment_batch(video_id, CommentBatch.concat(fetched))
+    yield format_stream_event({
+        "video_id": video_id,
+        "sentiment": accumulator.result(),
+        "comment_count": accumulator.comment_count,
+        "done": True
+    }, stream_format)
+
 def extract_video_id(url):
     """
-    Extracts video ID from a YouTube URL.
+    Extracts the video ID from a YouTube URL or a bare video ID, or returns None.
     """
-    video_id = None
+    if not isinstance(url, str):
+        return None
     try:
-        from urllib.parse import urlparse, parse_qs
-        parsed_url = urlparse(url)
-        if parsed_url.hostname in ['www.youtube.com', 'youtube.com', 'm.youtube.com', 'youtu.be']:
-            if parsed_url.hostname in ['www.youtube.com', 'youtube.com', 'm.youtube.com']:
-                query_params = parse_qs(parsed_url.query)
-                video_id = query_params.get('v', [None])[0]
-            elif parsed_url.hostname == 'youtu.be':
-                video_id = parsed_url.path[1:]
-    except:
-        pass
-    return video_id
+        return utils.extract_video_id(url)
+    except ValueError:
+        return None
 
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() in ['true', '1', 't']
@@ -1,12 +1,11 @@
-from flask import Flask, jsonify
+from flask import Flask
 from flask_cors import CORS
 
+from backend.admin import admin
+
 app = Flask(__name__)
 CORS(app)
-
-@app.route('/api/health')
-def health_check():
-    return jsonify({"status": "healthy"})
+app.register_blueprint(admin)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000)
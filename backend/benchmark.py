@@ -0,0 +1,372 @@
+# backend/benchmark.py
+"""
+Benchmarks for the scoring, fetching, caching, ingest and rendering hot paths.
+
+    python -m backend.benchmark run --output results.json
+    python -m backend.benchmark run --quick --only sentiment cache
+    python -m backend.benchmark compare baseline.json results.json --threshold 0.15
+    python -m backend.benchmark run --output results.json --baseline baseline.json
+
+Every input is synthetic and generated from a fixed seed, comments are
+fetched from an in-process backend.fake_youtube_api server, and ingest runs
+against a throwaway SQLite database unless --database-url is given. Results are
+medians over --repeat runs. compare (or run --baseline) exits with status
+1 when any benchmark got slower than the threshold allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.fake_youtube_api import VOCABULARY
+
+# Sizes per group; --quick uses the first entries only.
+SIZES = {
+    'sentiment': (1000, 100000, 1000000),
+    'fetch': (1000, 10000),
+    'cache': (1000, 100000),
+    'ingest': (1000, 20000),
+    'render': (10000,)
+}
+QUICK_SIZES = {
+    'sentiment': (1000, 10000),
+    'fetch': (1000,),
+    'cache': (1000,),
+    'ingest': (1000,),
+    'render': (1000,)
+}
+
+
+
+def synthetic_comments(count, seed=0):
+    """Deterministic comment texts with a mix of positive, negative and neutral words."""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(4, 24))) + f' #{i}'
+        for i in range(count)
+    ]
+
+
+def synthetic_records(count, seed=0):
+    """Comment records shaped like youtube_api.parse_comment_threads() output."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': f'comment{i}',
+            'text': text,
+            'published_at': (start + timedelta(seconds=37 * i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'like_count': i % 50,
+            'parent_id': None
+        }
+        for i, text in enumerate(synthetic_comments(count, seed))
+    ]
+
+
+def _timed(fn, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _result(timings, items, **extra):
+    median = statistics.median(timings)
+    result = {
+        'median_s': median,
+        'min_s': min(timings),
+        'runs': len(timings),
+        'items': items,
+        'items_per_s': items / median if median else None
+    }
+    result.update(extra)
+    return result
+
+
+def _repeat_for(size, repeat):
+    # One run of the largest inputs takes long enough to be stable on its own.
+    return 1 if size >= 1000000 else repeat
+
+
+def bench_sentiment(sizes, repeat, context):
+    from backend.sentiment_analysis import analyze_sentiment, warm_up
+
+    warm_up()
+    results = {}
+    for size in sizes:
+        comments = synthetic_comments(size)
+        timings = _timed(lambda: analyze_sentiment(comments, parallel=False, memo=False), _repeat_for(size, repeat))
+        results[f'sentiment.analyze[{size}]'] = _result(timings, size)
+    return results
+
+
+def bench_fetch(sizes, repeat, context):
+    from backend.fake_youtube_api import create_app, start_server
+    from backend.youtube_async import AsyncYouTubeClient
+
+    async def run(size):
+        runner, base_url = await start_server(create_app(comments_per_video=size, replies_every=0))
+        try:
+            timings = []
+            async with AsyncYouTubeClient('benchmark', base_url=base_url) as client:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    comments = await client.fetch_comments('benchmark')
+                    timings.append(time.perf_counter() - started)
+            assert len(comments) == size
+            return timings
+        finally:
+            await runner.cleanup()
+
+    return {
+        f'fetch.comments[{size}]': _result(asyncio.run(run(size)), size, pages=-(-size // 100))
+        for size in sizes
+    }
+
+
+def bench_cache(sizes, repeat, context):
+    from backend.cache import decode_value, encode_value
+    from backend.comment_batch import CommentBatch
+
+    results = {}
+    for size in sizes:
+        comments = synthetic_comments(size)
+        batch = CommentBatch.from_records(synthetic_records(size))
+        batch_raw, batch_serialized_size = encode_value(batch)
+        results[f'cache.encode_batch[{size}]'] = _result(
+            _timed(lambda: encode_value(batch), repeat), size,
+            stored_bytes=len(batch_raw), serialized_bytes=batch_serialized_size, memory_bytes=batch.nbytes
+        )
+        results[f'cache.decode_batch[{size}]'] = _result(_timed(lambda: decode_value(batch_raw), repeat), size)
+        raw, serialized_size = encode_value(comments)
+        results[f'cache.encode[{size}]'] = _result(
+            _timed(lambda: encode_value(comments), repeat), size,
+            stored_bytes=len(raw), serialized_bytes=serialized_size
+        )
+        results[f'cache.decode[{size}]'] = _result(_timed(lambda: decode_value(raw), repeat), size)
+        json_raw = json.dumps(comments).encode('utf-8')
+        results[f'cache.json_roundtrip[{size}]'] = _result(
+            _timed(lambda: json.loads(json.dumps(comments)), repeat), size, stored_bytes=len(json_raw)
+        )
+    return results
+
+
+def bench_ingest(sizes, repeat, context):
+    from backend.config import Config
+    from backend.database import (
+        Comment, VideoSentimentAggregate, bulk_upsert_comments, dispose_engine, ensure_video, get_db
+    )
+
+    # POSTGRES_URL from the environment or .env is deliberately ignored: the
+    # benchmark only writes to a real database when one is passed explicitly.
+    configured_url = Config.POSTGRES_URL
+    Config.POSTGRES_URL = (
+        context.get('database_url') or f"sqlite:///{os.path.join(context['workdir'], 'benchmark.db')}"
+    )
+    dispose_engine()
+
+    video_id = 'benchmark_video'
+
+    def clear():
+        with get_db() as db:
+            db.query(Comment).filter(Comment.video_id == video_id).delete()
+            db.query(VideoSentimentAggregate).filter(VideoSentimentAggregate.video_id == video_id).delete()
+            ensure_video(db, video_id)
+            db.commit()
+
+    results = {}
+    try:
+        for size in sizes:
+            records = [dict(record, sentiment_score=0.0) for record in synthetic_records(size)]
+
+            def ingest():
+                with get_db() as db:
+                    bulk_upsert_comments(db, video_id, records)
+                    db.commit()
+
+            results[f'db.ingest[{size}]'] = _result(_timed(ingest, repeat, setup=clear), size)
+    finally:
+        clear()
+        dispose_engine()
+        Config.POSTGRES_URL = configured_url
+    return results
+
+
+def bench_render(sizes, repeat, context):
+    import pandas as pd
+    from backend import data_visualization as dv
+    from backend.sentiment_analysis import generate_sentiment_trends
+
+    dv.warm_up()
+    results = {}
+    for size in sizes:
+        comments = synthetic_comments(size)
+        records = synthetic_records(size)
+        trends = generate_sentiment_trends(comments, [record['published_at'] for record in records], memo=False)
+        frame = pd.DataFrame({
+            'hour': [i % 24 for i in range(size)],
+            'weekday': [i % 7 for i in range(size)],
+            'score': [(i % 200) / 100 - 1 for i in range(size)],
+            'likes': [i % 50 for i in range(size)]
+        })
+        figures = {
+            'wordcloud': lambda: dv.build_wordcloud_figure(comments),
+            'sentiment_distribution': lambda: dv.build_sentiment_distribution_figure({'overall_stats': {
+                'sentiment_distribution': {'positive': 0.5, 'neutral': 0.3, 'negative': 0.2},
+                'average_sentiment': 0.12
+            }}),
+            'engagement': lambda: dv.build_engagement_figure({'statistics': {
+                'viewCount': '1000000', 'likeCount': '50000', 'commentCount': str(size)
+            }}),
+            'trends': lambda: dv.build_sentiment_trends_figure(trends),
+            'heatmap': lambda: dv.build_heatmap_figure(frame, 'hour', 'weekday', 'score'),
+            'scatter': lambda: dv.build_scatter_figure(frame, 'score', 'likes', 'hour')
+        }
+        for name, build in figures.items():
+            for output in ['json', 'html']:
+                output_file = os.path.join(context['workdir'], f'{name}.{output}')
+                timings = _timed(
+                    lambda: dv._write_figure(build(), output_file, output), repeat,
+                    # Measure a cold render every time, not a render-cache hit.
+                    setup=dv.clear_render_cache
+                )
+                results[f'render.{name}.{output}[{size}]'] = _result(
+                    timings, size, output_bytes=os.path.getsize(output_file)
+                )
+    return results
+
+
+BENCHMARKS = {
+    'sentiment': bench_sentiment,
+    'fetch': bench_fetch,
+    'cache': bench_cache,
+    'ingest': bench_ingest,
+    'render': bench_render
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(groups=None, quick=False, repeat=3, database_url=None):
+    """
+    Runs benchmark groups and returns their results with environment metadata.
+
+    Returns:
+        dict: 'meta' (commit, Python, platform, CPU count, start time) and
+        'results', mapping benchmark names to timings and throughput.
+    """
+    sizes = QUICK_SIZES if quick else SIZES
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'quick': quick,
+            'repeat': repeat
+        },
+        'results': {}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        context = {'workdir': workdir, 'database_url': database_url}
+        for group in groups or BENCHMARKS:
+            print(f"Running {group} benchmarks...", file=sys.stderr)
+            report['results'].update(BENCHMARKS[group](sizes[group], repeat, context))
+    return report
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compares two reports by median time.
+
+    Returns:
+        list: (name, baseline_s, current_s, ratio, regressed) for every
+        benchmark present in both, where regressed means the current median
+        is more than `threshold` (a fraction) slower.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['median_s'] / before['median_s'] if before['median_s'] else float('inf')
+        rows.append((name, before['median_s'], result['median_s'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_results(report):
+    for name, result in report['results'].items():
+        rate = f"{result['items_per_s']:>14,.0f} items/s" if result['items_per_s'] else ''
+        print(f"{name:<45} {result['median_s'] * 1000:>10.1f} ms {rate}")
+
+
+def print_comparison(rows, threshold):
+    for name, before, after, ratio, regressed in rows:
+        flag = 'REGRESSION' if regressed else ('faster' if ratio < 1 - threshold else '')
+        print(f"{name:<45} {before * 1000:>10.1f} ms -> {after * 1000:>10.1f} ms  {ratio:>6.2f}x  {flag}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} of {len(rows)} benchmarks regressed by more than {threshold:.0%}")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run benchmarks")
+    run.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmark groups to run")
+    run.add_argument('--quick', action='store_true', help="Small inputs only, for a fast smoke run")
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--output', help="Write the JSON report here")
+    run.add_argument('--baseline', help="Compare against this JSON report afterwards")
+    run.add_argument('--threshold', type=float, default=0.1, help="Allowed slowdown as a fraction")
+    run.add_argument('--database-url', help="Database for the ingest benchmark (default: temporary SQLite)")
+
+    cmp = commands.add_parser('compare', help="Compare two JSON reports")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.1, help="Allowed slowdown as a fraction")
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        rows = compare(_load(args.baseline), _load(args.current), args.threshold)
+        return 1 if print_comparison(rows, args.threshold) else 0
+
+    report = run_benchmarks(args.only, args.quick, args.repeat, args.database_url)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print_results(report)
+    if args.baseline:
+        rows = compare(_load(args.baseline), report, args.threshold)
+        return 1 if print_comparison(rows, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
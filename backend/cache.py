@@ -1,20 +1,400 @@
-import redis
 import json
-from config import Config
+import logging
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from backend.comment_batch import CommentBatch, as_comment_batch
+from backend.config import Config
+from backend.metrics import record_cache
 
-redis_client = redis.from_url(Config.REDIS_URL)
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional, falls back to JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, falls back to lz4 or zlib
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+def get_redis():
+    """
+    Returns the process-wide Redis client, creating it on first use.
+
+    Nothing connects at import time, and a client created before a fork is
+    never reused by the children: call reset_redis() in the child.
+    """
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                import redis
+                _redis_client = redis.from_url(Config.REDIS_URL)
+    return _redis_client
+
+def reset_redis():
+    """Drops the client so the next get_redis() opens fresh connections (e.g. after fork)."""
+    global _redis_client
+    with _redis_lock:
+        _redis_client = None
+
+# Binary values start with a NUL byte, which no JSON document does, followed
+# by one byte for the serializer and one for the codec. Anything else is a
+# legacy JSON value and is decoded as before. CommentBatch values are stored
+# in their own columnar layout rather than as msgpack or JSON.
+_FRAME = b'\x00'
+_MSGPACK, _JSON, _BATCH = b'm', b'j', b'c'
+_ZSTD, _LZ4, _ZLIB, _RAW = b'z', b'l', b'd', b'-'
+
+COMPRESS_MIN_BYTES = 1024
+
+def _serialize(data):
+    if isinstance(data, CommentBatch):
+        return _BATCH, data.to_bytes()
+    if msgpack is not None:
+        return _MSGPACK, msgpack.packb(data, use_bin_type=True)
+    return _JSON, json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _compress(payload):
+    if len(payload) < COMPRESS_MIN_BYTES:
+        return _RAW, payload
+    if zstandard is not None:
+        return _ZSTD, zstandard.ZstdCompressor(level=3).compress(payload)
+    if lz4 is not None:
+        return _LZ4, lz4.frame.compress(payload)
+    return _ZLIB, zlib.compress(payload, 6)
+
+def encode_value(data):
+    """Encodes data for Redis; returns (stored bytes, serialized size before compression)."""
+    serializer, payload = _serialize(data)
+    codec, compressed = _compress(payload)
+    return _FRAME + serializer + codec + compressed, len(payload)
+
+def decode_value(raw):
+    if not raw.startswith(_FRAME):
+        return json.loads(raw)
+    serializer, codec, payload = raw[1:2], raw[2:3], raw[3:]
+    if codec == _ZSTD:
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == _LZ4:
+        payload = lz4.frame.decompress(payload)
+    elif codec == _ZLIB:
+        payload = zlib.decompress(payload)
+    if serializer == _BATCH:
+        return CommentBatch.from_bytes(payload)
+    if serializer == _MSGPACK:
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+_VERSION_SEGMENT = re.compile(r'^v\d+$')
+
+def key_prefix(key):
+    """Groups keys for stats: video:<id>[:v<n>]:comments -> video:*:comments."""
+    parts = [part for part in key.split(':') if not _VERSION_SEGMENT.match(part)]
+    if len(parts) >= 3:
+        return ':'.join([parts[0], '*'] + parts[2:])
+    return parts[0]
+
+# Items of longer lists and dicts are sized from an even sample.
+SIZE_SAMPLE = 256
+
+def resident_size(value):
+    """
+    Estimates the memory a decoded value holds in L1.
+
+    The compressed Redis payload understates it several times over for
+    lists of strings or dicts, so L1 is charged by this estimate instead.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, CommentBatch):
+        return size + value.nbytes
+    if isinstance(value, dict):
+        items = list(value.items())
+        item_size = lambda item: resident_size(item[0]) + resident_size(item[1])
+    elif isinstance(value, (list, tuple)):
+        items = value
+        item_size = resident_size
+    else:
+        return size
+    if len(items) <= SIZE_SAMPLE:
+        return size + sum(map(item_size, items))
+    sample = items[::len(items) // SIZE_SAMPLE][:SIZE_SAMPLE]
+    return size + sum(map(item_size, sample)) * len(items) // len(sample)
+
+class LocalCache:
+    """
+    Bounded in-process L1 cache with per-entry TTL and size-based LRU eviction.
+
+    It holds decoded values, so a hit costs neither a Redis round-trip nor a
+    decode. Entries are charged at their resident_size(), so max_bytes bounds
+    the memory they take. Callers must treat returned values as read-only.
+    """
+
+    def __init__(self, max_bytes, max_entries, ttl):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, timeout):
+        if self.max_entries <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+        expires_at = time.monotonic() + min(timeout, self.ttl)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (expires_at, size, value)
+            self.size += size
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+local_cache = LocalCache(Config.CACHE_L1_MAX_BYTES, Config.CACHE_L1_MAX_ENTRIES, Config.CACHE_L1_TTL)
+
+_stats = defaultdict(lambda: defaultdict(int))
+_stats_lock = threading.Lock()
+
+def _record(key, **counts):
+    prefix = key_prefix(key)
+    with _stats_lock:
+        stats = _stats[prefix]
+        for name, value in counts.items():
+            stats[name] += value
+    record_cache(prefix, counts)
+
+def cache_stats():
+    """
+    Reports cache effectiveness per key prefix.
+
+    Returns:
+        dict: For each prefix (e.g. video:*:comments), L1/L2 hits, misses,
+        hit ratio, sets, serialized and stored bytes, and bytes saved by
+        compression.
+    """
+    with _stats_lock:
+        report = {}
+        for prefix, stats in _stats.items():
+            lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+            report[prefix] = dict(stats)
+            report[prefix]['hit_ratio'] = (stats['l1_hits'] + stats['l2_hits']) / lookups if lookups else 0.0
+            report[prefix]['bytes_saved'] = stats['serialized_bytes'] - stats['stored_bytes']
+        report['l1'] = {'bytes': local_cache.size, 'max_bytes': local_cache.max_bytes}
+        return report
 
 def cache_results(key, data, timeout=Config.CACHE_TIMEOUT):
-    redis_client.setex(key, timeout, json.dumps(data))
+    cache_many({key: data}, timeout)
+
+def cache_many(items, timeout=Config.CACHE_TIMEOUT):
+    """Stores several values in one pipelined round-trip."""
+    pipe = get_redis().pipeline(transaction=False)
+    for key, data in items.items():
+        raw, serialized_size = encode_value(data)
+        pipe.setex(key, timeout, raw)
+        local_cache.set(key, data, resident_size(data), min(timeout, Config.CACHE_L1_TTL))
+        _record(key, sets=1, serialized_bytes=serialized_size, stored_bytes=len(raw))
+    pipe.execute()
 
 def get_cached_results(key):
-    data = redis_client.get(key)
-    return json.loads(data) if data else None
+    return get_many_cached([key]).get(key)
+
+def get_many_cached(keys):
+    """
+    Looks up several keys, going to Redis with a single MGET for L1 misses.
+
+    Returns:
+        dict: Values of the keys that were found.
+    """
+    found = {}
+    remote_keys = []
+    for key in keys:
+        value = local_cache.get(key)
+        if value is None:
+            remote_keys.append(key)
+        else:
+            found[key] = value
+            _record(key, l1_hits=1)
+    if not remote_keys:
+        return found
+
+    for key, raw in zip(remote_keys, get_redis().mget(remote_keys)):
+        if raw is None:
+            _record(key, misses=1)
+            continue
+        value = decode_value(raw)
+        found[key] = value
+        local_cache.set(key, value, resident_size(value), Config.CACHE_L1_TTL)
+        _record(key, l2_hits=1)
+    return found
+
+def delete_cached(keys):
+    """Removes keys from both tiers."""
+    for key in keys:
+        local_cache.delete(key)
+    if keys:
+        get_redis().delete(*keys)
+
+# Version keys outlive the longest-lived value of their namespace. Once one
+# expires the namespace restarts at version 0, by which time every key
+# built for an older version has expired too.
+NAMESPACE_VERSION_TTL = max(Config.CACHE_TIMEOUT, Config.ANALYSIS_FRESH_TTL + Config.ANALYSIS_STALE_TTL)
+
+def _version_key(tag):
+    return f"ns:{tag}:version"
+
+def namespace_version(tag):
+    """
+    Returns the current version of a cache namespace (0 if never invalidated).
+
+    Versions are cached in L1 like any other value, so other workers see an
+    invalidation within CACHE_L1_TTL seconds.
+    """
+    version_key = _version_key(tag)
+    version = local_cache.get(version_key)
+    if version is None:
+        raw = get_redis().get(version_key)
+        version = int(raw) if raw else 0
+        local_cache.set(version_key, version, 8, Config.CACHE_L1_TTL)
+    return version
+
+def invalidate_namespace(tag):
+    """
+    Invalidates every key of a namespace in O(1) by bumping its version.
+
+    Keys built for the old version are never read again and expire on
+    their own TTL, so nothing has to be scanned or deleted. The version key
+    itself expires NAMESPACE_VERSION_TTL seconds after the last bump.
+    """
+    version_key = _version_key(tag)
+    pipeline = get_redis().pipeline()
+    pipeline.incr(version_key)
+    pipeline.expire(version_key, NAMESPACE_VERSION_TTL)
+    version = pipeline.execute()[0]
+    local_cache.set(version_key, version, 8, Config.CACHE_L1_TTL)
+    return version
+
+def video_cache_key(video_id, name):
+    """Builds the current key for a per-video value, e.g. video:<id>:v2:comments."""
+    version = namespace_version(f"video:{video_id}")
+    if version:
+        return f"video:{video_id}:v{version}:{name}"
+    return f"video:{video_id}:{name}"
+
+_refresh_executor = ThreadPoolExecutor(max_workers=Config.CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def _store_fresh(key, value, ttl, stale_ttl):
+    cache_results(key, {'value': value, 'fresh_until': time.time() + ttl}, timeout=ttl + stale_ttl)
+    return value
+
+def _refresh(key, loader, ttl, stale_ttl):
+    try:
+        _store_fresh(key, loader(), ttl, stale_ttl)
+    except Exception as e:
+        logging.warning(f"Background refresh of {key} failed: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        get_redis().delete(f"{key}:refreshing")
+
+def _schedule_refresh(key, loader, ttl, stale_ttl):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    # Only one worker across the deployment refreshes a given key.
+    if not get_redis().set(f"{key}:refreshing", 1, nx=True, ex=max(int(ttl), 1)):
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        return
+    _record(key, refreshes=1)
+    _refresh_executor.submit(_refresh, key, loader, ttl, stale_ttl)
+
+def get_or_refresh(key, loader, ttl, stale_ttl):
+    """
+    Returns a cached value, serving stale data while it is refreshed.
+
+    Values are fresh for `ttl` seconds and then served stale for up to
+    `stale_ttl` more seconds while one background refresh calls `loader`.
+    Only a cold miss calls `loader` inline.
+
+    Args:
+        key (str): Cache key.
+        loader (callable): Computes the value; results must be serializable.
+        ttl (int): Seconds a value is fresh.
+        stale_ttl (int): Extra seconds a value may be served stale.
+    """
+    envelope = get_cached_results(key)
+    if envelope is None:
+        return _store_fresh(key, loader(), ttl, stale_ttl)
+    if time.time() >= envelope['fresh_until']:
+        _record(key, stale_hits=1)
+        _schedule_refresh(key, loader, ttl, stale_ttl)
+    return envelope['value']
 
 def cache_video_metadata(video_id, metadata):
-    cache_key = f"video:{video_id}:metadata"
+    cache_key = video_cache_key(video_id, 'metadata')
     cache_results(cache_key, metadata, timeout=3600)  # Cache metadata for 1 hour
 
 def cache_video_comments(video_id, comments):
-    cache_key = f"video:{video_id}:comments"
+    cache_key = video_cache_key(video_id, 'comments')
     cache_results(cache_key, comments, timeout=600)  # Cache comments for 10 minutes
+
+# CommentBatch values get a key of their own: workers still running code
+# from before batches read the comments key and could not decode them.
+def cache_comment_batch(video_id, batch):
+    cache_key = video_cache_key(video_id, 'comment_batch')
+    cache_results(cache_key, batch, timeout=600)  # Cache comments for 10 minutes
+
+def get_cached_comment_batch(video_id):
+    """
+    Returns a video's cached comments as a CommentBatch, or None.
+
+    Falls back to a list of texts cached under the comments key by a worker
+    that predates batches.
+    """
+    batch = get_cached_results(video_cache_key(video_id, 'comment_batch'))
+    if batch is not None:
+        return batch
+    legacy = get_cached_results(video_cache_key(video_id, 'comments'))
+    return as_comment_batch(legacy) if legacy else None
@@ -0,0 +1,369 @@
+# backend/comment_batch.py
+"""
+Columnar storage for batches of comments.
+
+A CommentBatch keeps every field of its comments in a handful of arrays
+instead of one dict (and several str objects) per comment: texts, IDs and
+parent IDs each live in one contiguous UTF-8 buffer with an offsets array,
+timestamps are float64 Unix seconds (NaN when missing), like counts int64
+and scores, once computed, a float32 (n, 4) array laid out like
+sentiment_analysis.score_comments() output. It serializes to one compact
+binary blob, which cache.py stores as is.
+
+Iterating a batch yields its comment texts, so anything that takes a list
+of texts (score_comments, analyze_sentiment, count_tokens) accepts a batch.
+"""
+import struct
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backend.utils import parse_youtube_timestamp
+
+_COMPOUND = 3
+
+
+class StringColumn:
+    """
+    Strings stored as one UTF-8 buffer plus an int64 offsets array.
+
+    Item i is data[offsets[i]:offsets[i + 1]]; an empty string doubles as
+    "missing" for optional columns such as parent IDs.
+    """
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data=b'', offsets=None):
+        self.data = data
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        return cls._from_encoded([(value or '').encode('utf-8') for value in strings])
+
+    @classmethod
+    def _from_encoded(cls, encoded):
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(b''.join(encoded), offsets)
+
+    @classmethod
+    def concat(cls, columns):
+        columns = list(columns)
+        if not columns:
+            return cls()
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for column in columns:
+            offsets.append(column.offsets[1:] - column.offsets[0] + base)
+            base += int(column.offsets[-1] - column.offsets[0])
+        data = b''.join(column.data[column.offsets[0]:column.offsets[-1]] for column in columns)
+        return cls(data, np.concatenate(offsets))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self):
+        data = self.data
+        bounds = self.offsets.tolist()
+        for start, end in zip(bounds, bounds[1:]):
+            yield data[start:end].decode('utf-8')
+
+    def tolist(self):
+        return list(self)
+
+    def take(self, indices):
+        data = self.data
+        bounds = self.offsets.tolist()
+        return StringColumn._from_encoded([data[bounds[i]:bounds[i + 1]] for i in indices])
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.nbytes
+
+
+# Serialized layout: magic, comment count, has-scores flag, the three string
+# buffers' lengths, then offsets, numeric columns and string buffers.
+_MAGIC = b'CB1'
+_HEADER = struct.Struct('<3sQBQQQ')
+
+
+class CommentBatch:
+    """
+    A batch of comments in columnar form.
+
+    Build one with from_comment_threads() (straight from a commentThreads.list
+    response), from_records() (youtube_api.parse_comment_threads() dicts) or
+    from_texts(), and combine pages with concat().
+    """
+
+    __slots__ = ('ids', 'text', 'parent_ids', 'published_at', 'like_count', 'scores')
+
+    def __init__(self, ids, text, parent_ids, published_at, like_count, scores=None):
+        self.ids = ids
+        self.text = text
+        self.parent_ids = parent_ids
+        self.published_at = published_at
+        self.like_count = like_count
+        self.scores = scores
+
+    @classmethod
+    def empty(cls):
+        return cls.from_texts([])
+
+    @classmethod
+    def from_texts(cls, texts):
+        """A batch of bare texts, without IDs, timestamps or like counts."""
+        texts = list(texts)
+        return cls.from_columns([''] * len(texts), texts)
+
+    @classmethod
+    def from_columns(cls, ids, texts, parent_ids=None, published_at=None, like_counts=None, compound=None):
+        """
+        A batch from per-field sequences of equal length, e.g. database rows
+        transposed. published_at values may be datetimes, publishedAt strings
+        or Unix seconds; compound scores, if given, become the scores' compound
+        column (NaN for unscored comments).
+        """
+        count = len(ids)
+        batch = cls(
+            StringColumn.from_strings(ids),
+            StringColumn.from_strings(texts),
+            StringColumn.from_strings(parent_ids if parent_ids is not None else [''] * count),
+            np.fromiter(
+                (epoch_seconds(value) for value in published_at), dtype=np.float64, count=count
+            ) if published_at is not None else np.full(count, np.nan),
+            np.fromiter(
+                (value or 0 for value in like_counts), dtype=np.int64, count=count
+            ) if like_counts is not None else np.zeros(count, dtype=np.int64)
+        )
+        if compound is not None:
+            scores = np.zeros((count, 4), dtype=np.float32)
+            scores[:, _COMPOUND] = np.fromiter(
+                (np.nan if value is None else value for value in compound), dtype=np.float32, count=count
+            )
+            batch.scores = scores
+        return batch
+
+    @classmethod
+    def from_records(cls, records):
+        """A batch of comment dicts with id, text and optional parent_id, published_at and like_count."""
+        records = list(records)
+        scored = records and all(record.get('sentiment_score') is not None for record in records)
+        return cls.from_columns(
+            [record.get('id') for record in records],
+            [record['text'] for record in records],
+            [record.get('parent_id') for record in records],
+            [record.get('published_at') for record in records],
+            [record.get('like_count') for record in records],
+            [record['sentiment_score'] for record in records] if scored else None
+        )
+
+    @classmethod
+    def from_comment_threads(cls, response):
+        """
+        Builds a batch from one commentThreads.list response, in the same
+        order as youtube_api.parse_comment_threads() but without the
+        intermediate dict per comment.
+        """
+        ids, texts, parent_ids, published_at, like_counts = [], [], [], [], []
+
+        def add(comment, parent_id):
+            snippet = comment['snippet']
+            ids.append(comment['id'])
+            texts.append(snippet['textDisplay'])
+            parent_ids.append(parent_id)
+            published_at.append(snippet.get('publishedAt'))
+            like_counts.append(snippet.get('likeCount', 0))
+
+        for item in response['items']:
+            top_level = item['snippet']['topLevelComment']
+            add(top_level, None)
+            for reply in item.get('replies', {}).get('comments', []):
+                add(reply, top_level['id'])
+        return cls.from_columns(ids, texts, parent_ids, published_at, like_counts)
+
+    @classmethod
+    def concat(cls, batches):
+        """Joins batches in order; scores are kept only if every batch has them."""
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        scored = all(batch.scores is not None for batch in batches)
+        return cls(
+            StringColumn.concat(batch.ids for batch in batches),
+            StringColumn.concat(batch.text for batch in batches),
+            StringColumn.concat(batch.parent_ids for batch in batches),
+            np.concatenate([batch.published_at for batch in batches]),
+            np.concatenate([batch.like_count for batch in batches]),
+            np.concatenate([batch.scores for batch in batches]) if scored else None
+        )
+
+    def __len__(self):
+        return len(self.text)
+
+    def __iter__(self):
+        return iter(self.text)
+
+    def texts(self):
+        """The comment texts as a list of str."""
+        return self.text.tolist()
+
+    def take(self, indices):
+        """A new batch with the comments at `indices` (integers or a boolean mask)."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        indices = indices.tolist()
+        return CommentBatch(
+            self.ids.take(indices),
+            self.text.take(indices),
+            self.parent_ids.take(indices),
+            self.published_at[indices],
+            self.like_count[indices],
+            self.scores[indices] if self.scores is not None else None
+        )
+
+    def with_scores(self, scores):
+        """
+        A new batch with a (len(self), 4) score array attached. The other
+        columns are shared rather than copied, and this batch is left as is,
+        since cached batches are shared between requests.
+        """
+        scores = np.array(scores, dtype=np.float32)
+        if scores.shape != (len(self), 4):
+            raise ValueError(f"Expected scores of shape ({len(self)}, 4), got {scores.shape}")
+        return CommentBatch(self.ids, self.text, self.parent_ids, self.published_at, self.like_count, scores)
+
+    @property
+    def compound(self):
+        return self.scores[:, _COMPOUND] if self.scores is not None else None
+
+    @property
+    def is_top_level(self):
+        """Boolean mask of comments that are not replies."""
+        return np.diff(self.parent_ids.offsets) == 0
+
+    @property
+    def nbytes(self):
+        return (
+            self.ids.nbytes + self.text.nbytes + self.parent_ids.nbytes
+            + self.published_at.nbytes + self.like_count.nbytes
+            + (self.scores.nbytes if self.scores is not None else 0)
+        )
+
+    def records(self):
+        """
+        Yields one dict per comment, shaped like parse_comment_threads()
+        output with published_at as a naive UTC datetime and, once scored,
+        sentiment_score.
+        """
+        compound = self.compound.tolist() if self.scores is not None else None
+        published_at = self.published_at.tolist()
+        like_count = self.like_count.tolist()
+        for i, (comment_id, text, parent_id) in enumerate(zip(self.ids, self.text, self.parent_ids)):
+            record = {
+                'id': comment_id,
+                'text': text,
+                'published_at': _from_epoch_seconds(published_at[i]),
+                'like_count': like_count[i],
+                'parent_id': parent_id or None
+            }
+            if compound is not None:
+                record['sentiment_score'] = compound[i] if compound[i] == compound[i] else None
+            yield record
+
+    def to_bytes(self):
+        columns = (self.ids, self.text, self.parent_ids)
+        parts = [_HEADER.pack(
+            _MAGIC, len(self), self.scores is not None, *(len(column.data) for column in columns)
+        )]
+        for column in columns:
+            parts.append((column.offsets - column.offsets[0]).astype('<i8').tobytes())
+        parts.append(self.published_at.astype('<f8').tobytes())
+        parts.append(self.like_count.astype('<i8').tobytes())
+        if self.scores is not None:
+            parts.append(self.scores.astype('<f4').tobytes())
+        for column in columns:
+            parts.append(column.data[column.offsets[0]:column.offsets[-1]])
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, raw):
+        """Reads a to_bytes() blob; the numeric columns are views into `raw`."""
+        magic, count, has_scores, *data_lengths = _HEADER.unpack_from(raw)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized CommentBatch")
+        position = _HEADER.size
+
+        def array(dtype, items):
+            nonlocal position
+            values = np.frombuffer(raw, dtype=dtype, count=items, offset=position)
+            position += values.nbytes
+            return values
+
+        offsets = [array('<i8', count + 1) for _ in data_lengths]
+        published_at = array('<f8', count)
+        like_count = array('<i8', count)
+        scores = array('<f4', count * 4).reshape(count, 4) if has_scores else None
+        columns = []
+        for column_offsets, length in zip(offsets, data_lengths):
+            columns.append(StringColumn(bytes(raw[position:position + length]), column_offsets))
+            position += length
+        return cls(*columns, published_at, like_count, scores)
+
+    def __eq__(self, other):
+        if not isinstance(other, CommentBatch):
+            return NotImplemented
+        return (
+            self.ids.tolist() == other.ids.tolist()
+            and self.texts() == other.texts()
+            and self.parent_ids.tolist() == other.parent_ids.tolist()
+            and np.array_equal(self.published_at, other.published_at, equal_nan=True)
+            and np.array_equal(self.like_count, other.like_count)
+            and (self.scores is None) == (other.scores is None)
+            and (self.scores is None or np.array_equal(self.scores, other.scores))
+        )
+
+    def __repr__(self):
+        return f"<CommentBatch of {len(self)} comments, {self.nbytes} bytes>"
+
+
+def as_comment_batch(comments):
+    """
+    Returns `comments` as a CommentBatch: batches pass through, lists of
+    texts or of comment dicts are converted.
+    """
+    if isinstance(comments, CommentBatch):
+        return comments
+    comments = list(comments)
+    if comments and isinstance(comments[0], dict):
+        return CommentBatch.from_records(comments)
+    return CommentBatch.from_texts(comments)
+
+
+def epoch_seconds(value):
+    """
+    Unix seconds of a datetime (naive means UTC), publishedAt string or
+    number; NaN when missing (None or an empty string).
+    """
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, str):
+        value = parse_youtube_timestamp(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def _from_epoch_seconds(seconds):
+    if seconds != seconds:  # NaN
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,84 @@
+# backend/comment_sync.py
+import logging
+from datetime import timezone
+
+import numpy as np
+
+from backend.database import (
+    get_db,
+    bulk_upsert_comments,
+    ensure_video,
+    newest_comment_time,
+    known_comment_ids,
+    get_sentiment_aggregate
+)
+from backend.sentiment_analysis import score_batch
+from backend.youtube_api import iter_comment_batches
+
+logger = logging.getLogger(__name__)
+
+
+def _reached_known(page, ids, known_ids, newest):
+    # commentThreads ordered by time are newest first, so the first top-level
+    # comment we already have (or that is older than the newest stored one)
+    # means every later page has been synced before.
+    top_level = page.is_top_level
+    if any(comment_id in known_ids for comment_id, top in zip(ids, top_level.tolist()) if top):
+        return True
+    if newest is None:
+        return False
+    # Missing timestamps are NaN and never compare older.
+    return bool(np.any(page.published_at[top_level] < newest.replace(tzinfo=timezone.utc).timestamp()))
+
+
+def sync_comments(video_id, api_key=None):
+    """
+    Fetches, scores and stores only the comments posted since the last sync.
+
+    Comment threads are paged newest first (order=time) and paging stops at
+    the first page that reaches an already stored comment. Only the new
+    comments are scored, and bulk_upsert_comments() folds their scores into
+    the video's stored VideoSentimentAggregate. Replies added to old threads
+    are not picked up, because those threads are never re-read.
+
+    Args:
+        video_id (str): The ID of the YouTube video.
+        api_key (str): The API key for YouTube Data API v3, or None to use
+            the key pool of youtube_api.get_youtube_api().
+
+    Returns:
+        dict: video_id, pages fetched, the new comment texts, and the
+        aggregate sentiment counts and comment_count of all stored comments.
+    """
+    new_texts = []
+    pages = 0
+    with get_db() as db:
+        ensure_video(db, video_id)
+        newest = newest_comment_time(db, video_id)
+
+        for page in iter_comment_batches(video_id, api_key, order='time'):
+            pages += 1
+            ids = page.ids.tolist()
+            known_ids = known_comment_ids(db, ids)
+            fresh = page.take([i for i, comment_id in enumerate(ids) if comment_id not in known_ids])
+            if len(fresh):
+                bulk_upsert_comments(db, video_id, score_batch(fresh))
+                new_texts.extend(fresh.texts())
+            if _reached_known(page, ids, known_ids, newest):
+                break
+
+        db.commit()
+        aggregate = get_sentiment_aggregate(db, video_id)
+        results = aggregate.to_dict() if aggregate else {
+            'sentiment': {'positive': 0, 'negative': 0, 'neutral': 0},
+            'comment_count': 0
+        }
+
+    logger.info(f"Synced {len(new_texts)} new comments for video_id {video_id} in {pages} pages")
+    return {
+        'video_id': video_id,
+        'pages': pages,
+        'new_comments': new_texts,
+        'sentiment': results['sentiment'],
+        'comment_count': results['comment_count']
+    }
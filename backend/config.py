@@ -5,6 +5,69 @@ load_dotenv()
 
 class Config:
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+    # Per-key daily quota for youtube_api.YouTubeAPI (keys from YOUTUBE_API_KEYS)
+    YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', 10000))
+    # 'local' counts quota per process, so each worker spends a key's full
+    # daily quota on its own; 'redis' shares the counters between processes.
+    QUOTA_BACKEND = os.getenv('QUOTA_BACKEND', 'local')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379')
     POSTGRES_URL = os.getenv('POSTGRES_URL', 'postgresql://user:password@db:5432/sentiment')
-    CACHE_TIMEOUT = 3600  # 1 hour
\ No newline at end of file
+    CACHE_TIMEOUT = 3600  # 1 hour
+    # In-process L1 in front of Redis; its short TTL bounds cross-worker staleness.
+    CACHE_L1_TTL = int(os.getenv('CACHE_L1_TTL', 30))
+    CACHE_L1_MAX_BYTES = int(os.getenv('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 1024))
+    CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 4))
+    # Stale-while-revalidate windows for /comments analyses
+    ANALYSIS_FRESH_TTL = int(os.getenv('ANALYSIS_FRESH_TTL', 600))  # 10 minutes
+    ANALYSIS_STALE_TTL = int(os.getenv('ANALYSIS_STALE_TTL', 3600))  # 1 hour
+
+    # Opt-in multi-core sentiment scoring; lists shorter than
+    # SENTIMENT_PARALLEL_MIN_COMMENTS are always scored in-process.
+    SENTIMENT_PARALLEL = os.getenv('SENTIMENT_PARALLEL', 'False').lower() in ['true', '1', 't']
+    SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', os.cpu_count() or 1))
+    SENTIMENT_PARALLEL_MIN_COMMENTS = int(os.getenv('SENTIMENT_PARALLEL_MIN_COMMENTS', 20000))
+    SENTIMENT_CHUNK_SIZE = int(os.getenv('SENTIMENT_CHUNK_SIZE', 5000))
+
+    # Per-comment score memoization: an in-process LRU of SENTIMENT_MEMO_SIZE
+    # entries (0 disables it) and an optional shared Redis tier.
+    SENTIMENT_MEMO_SIZE = int(os.getenv('SENTIMENT_MEMO_SIZE', 100000))
+    SENTIMENT_MEMO_REDIS = os.getenv('SENTIMENT_MEMO_REDIS', 'False').lower() in ['true', '1', 't']
+    SENTIMENT_MEMO_TTL = int(os.getenv('SENTIMENT_MEMO_TTL', 7 * 24 * 3600))  # 1 week
+
+    # Async YouTube Data API client (youtube_async.py)
+    # Point both clients at a stand-in such as backend/fake_youtube_api.py
+    # (e.g. http://localhost:8085/youtube/v3) to test without spending quota.
+    YOUTUBE_API_BASE_URL = os.getenv('YOUTUBE_API_BASE_URL', 'https://www.googleapis.com/youtube/v3')
+    YOUTUBE_HTTP_CONCURRENCY = int(os.getenv('YOUTUBE_HTTP_CONCURRENCY', 8))
+    YOUTUBE_HTTP_TIMEOUT = float(os.getenv('YOUTUBE_HTTP_TIMEOUT', 30))
+    YOUTUBE_HTTP_RETRIES = int(os.getenv('YOUTUBE_HTTP_RETRIES', 3))
+
+    # Request coalescing for concurrent analyses of the same video. Set
+    # SINGLEFLIGHT_REDIS to coalesce across workers and hosts, not just threads.
+    SINGLEFLIGHT_REDIS = os.getenv('SINGLEFLIGHT_REDIS', 'False').lower() in ['true', '1', 't']
+    SINGLEFLIGHT_LOCK_TTL = float(os.getenv('SINGLEFLIGHT_LOCK_TTL', 300))
+    SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_WAIT_TIMEOUT', 300))
+    SINGLEFLIGHT_RESULT_TTL = int(os.getenv('SINGLEFLIGHT_RESULT_TTL', 30))
+    # Errors are only shared with callers already waiting, not replayed.
+    SINGLEFLIGHT_ERROR_TTL = float(os.getenv('SINGLEFLIGHT_ERROR_TTL', 1))
+
+    # Background analysis jobs (jobs.py). JOBS_BACKEND is 'local' (in-process
+    # queue, one worker process only) or 'redis' (shared by every process).
+    JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'local')
+    JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+    JOBS_MAX_RETRIES = int(os.getenv('JOBS_MAX_RETRIES', 2))
+    JOBS_RETRY_DELAY = float(os.getenv('JOBS_RETRY_DELAY', 2))
+    JOBS_TTL = int(os.getenv('JOBS_TTL', 24 * 3600))  # 1 day
+
+    # Multi-video batch analysis (/batch)
+    BATCH_MAX_VIDEOS = int(os.getenv('BATCH_MAX_VIDEOS', 500))
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+
+    # Admin endpoints and on-demand request profiling (profiling.py) are
+    # refused until ADMIN_TOKEN is set.
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))
+    PROFILING_HISTORY = int(os.getenv('PROFILING_HISTORY', 50))
+    PROFILING_BACKEND = os.getenv('PROFILING_BACKEND', 'local')
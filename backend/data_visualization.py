@@ -1,191 +1,360 @@
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+# plotly, pandas and wordcloud (which pulls in matplotlib) take seconds to
+# import, so they are imported inside the functions that use them. Call
+# warm_up() to load them up front, e.g. in a pre-forking server's master.
+from __future__ import annotations
+
+import functools
 import io
 import base64
-from typing import List, Dict, Any
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Optional, Set, Tuple, Union
 import logging
 
+from backend.metrics import render_timer
+
+if TYPE_CHECKING:
+    from backend.comment_batch import CommentBatch
+    import pandas as pd
+    import plotly.graph_objects as go
+
 logger = logging.getLogger(__name__)
 
-def create_wordcloud(comments: List[Dict[str, Any]], output_file: str) -> None:
-    """Generate an interactive wordcloud visualization from comments."""
-    try:
-        text = ' '.join([comment['text'] for comment in comments])
+# Markup and entities that show up in comment textDisplay values.
+COMMENT_STOPWORDS = {'br', 'quot', 'amp', 'href', 'http', 'https', 'www', 'com', 'lt', 'gt'}
+
+@functools.lru_cache(maxsize=None)
+def default_stopwords() -> frozenset:
+    """WordCloud's English stopwords plus COMMENT_STOPWORDS."""
+    from wordcloud import STOPWORDS
+    return frozenset(STOPWORDS | COMMENT_STOPWORDS)
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+def _comment_text(comment: Union[str, Dict[str, Any]]) -> str:
+    return comment if isinstance(comment, str) else comment['text']
+
+def count_tokens(comments: Union[CommentBatch, Iterable[Union[str, Dict[str, Any]]]], stopwords: Optional[Set[str]] = None,
+                 min_length: int = 2, counter: Optional[Counter] = None) -> Counter:
+    """
+    Counts lower-cased word tokens comment by comment, skipping stopwords.
+
+    Comments may be strings, dicts with a 'text' key or a CommentBatch, and
+    are consumed one at a time, so a generator never has to be joined into
+    one string. Pass an existing counter to keep adding pages to it.
+    """
+    stopwords = default_stopwords() if stopwords is None else stopwords
+    counter = Counter() if counter is None else counter
+    for comment in comments:
+        counter.update(
+            token for token in _TOKEN_PATTERN.findall(_comment_text(comment).lower())
+            if len(token) >= min_length and token not in stopwords
+        )
+    return counter
+
+def _top_frequencies(frequencies: Dict[str, int], max_words: int) -> List[Tuple[str, int]]:
+    # WordCloud only ever draws the max_words most frequent words, so the rest
+    # neither change the image nor belong in its cache key. Ties are broken
+    # by word to keep the selection deterministic.
+    return sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:max_words]
+
+def wordcloud_cache_key(frequencies: Dict[str, int], **params: Any) -> str:
+    """Hashes the words a cloud would draw and its image parameters."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(_top_frequencies(frequencies, params['max_words']), separators=(',', ':')).encode('utf-8'))
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+_render_cache: "OrderedDict[str, str]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+RENDER_CACHE_SIZE = 64
+
+def clear_render_cache() -> None:
+    with _render_cache_lock:
+        _render_cache.clear()
+
+def render_wordcloud(frequencies: Dict[str, int], width: int = 800, height: int = 400,
+                     background_color: str = 'white', max_words: int = 100) -> str:
+    """
+    Renders a word cloud from token frequencies as a base64-encoded PNG.
+
+    Renders are kept in an LRU keyed by wordcloud_cache_key(), so an
+    unchanged frequency table is never drawn or encoded twice.
+
+    Raises:
+        ValueError: If there are no words to draw.
+    """
+    top = dict(_top_frequencies(frequencies, max_words))
+    if not top:
+        raise ValueError("No words to draw a word cloud from")
+    key = wordcloud_cache_key(top, width=width, height=height, background_color=background_color, max_words=max_words)
+    with _render_cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    from wordcloud import WordCloud
+    with render_timer('wordcloud', 'png'):
         wordcloud = WordCloud(
-            width=800,
-            height=400,
-            background_color='white',
-            max_words=100
-        ).generate(text)
+            width=width,
+            height=height,
+            background_color=background_color,
+            max_words=max_words
+        ).generate_from_frequencies(top)
         img_buffer = io.BytesIO()
         wordcloud.to_image().save(img_buffer, format='PNG')
         img_str = base64.b64encode(img_buffer.getvalue()).decode()
-        fig = go.Figure()
-        fig.add_layout_image(
-            dict(
-                source=f'data:image/png;base64,{img_str}',
-                x=0,
-                y=0,
-                sizex=1,
-                sizey=1,
-                xref="paper",
-                yref="paper",
-                sizing="stretch"
-            )
-        )
-        fig.update_layout(
-            title="Comment Word Cloud",
-            showlegend=False,
-            width=800,
-            height=400
+
+    with _render_cache_lock:
+        _render_cache[key] = img_str
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return img_str
+
+PLOTLY_JS_URL = '/static/plotly.min.js'
+OUTPUT_MODES = ('html', 'json', 'standalone')
+
+def figure_spec(fig: go.Figure) -> str:
+    """Serialize a figure to the compact Plotly JSON spec the frontend renders with Plotly.react."""
+    return fig.to_json(validate=False, pretty=False, remove_uids=True)
+
+def _write_figure(fig: go.Figure, output_file: str, output: str = 'standalone') -> None:
+    """
+    Write a figure as a JSON spec ('json'), as HTML loading the plotly.js bundle
+    the backend serves at PLOTLY_JS_URL ('html'), or as HTML with plotly.js
+    inlined for viewing offline ('standalone', ~3-4 MB per file). Files
+    default to 'standalone' so they open anywhere; pass 'html' only for
+    pages the backend serves itself.
+    """
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode {output!r}; expected one of {OUTPUT_MODES}")
+    with render_timer('figure', output):
+        if output == 'json':
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(figure_spec(fig))
+        elif output == 'html':
+            fig.write_html(output_file, include_plotlyjs=PLOTLY_JS_URL, full_html=True)
+        else:
+            fig.write_html(output_file, include_plotlyjs=True)
+
+def warm_up() -> None:
+    """Imports the plotting libraries now instead of inside the first chart request."""
+    import pandas  # noqa: F401
+    import plotly.express  # noqa: F401
+    import plotly.graph_objects  # noqa: F401
+    import wordcloud  # noqa: F401
+
+def plotly_js_path() -> str:
+    """Path of the plotly.min.js bundled with the installed plotly package."""
+    import plotly
+    return os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+def build_wordcloud_figure(comments: Union[CommentBatch, Iterable[Union[str, Dict[str, Any]]]],
+                     frequencies: Optional[Dict[str, int]] = None) -> go.Figure:
+    """Build the word cloud figure."""
+    import plotly.graph_objects as go
+    if frequencies is None:
+        frequencies = count_tokens(comments)
+    img_str = render_wordcloud(frequencies)
+    fig = go.Figure()
+    fig.add_layout_image(
+        dict(
+            source=f'data:image/png;base64,{img_str}',
+            x=0,
+            y=0,
+            sizex=1,
+            sizey=1,
+            xref="paper",
+            yref="paper",
+            sizing="stretch"
         )
-        fig.write_html(output_file)
+    )
+    fig.update_layout(
+        title="Comment Word Cloud",
+        showlegend=False,
+        width=800,
+        height=400
+    )
+    return fig
+
+def create_wordcloud(comments: Union[CommentBatch, Iterable[Union[str, Dict[str, Any]]]], output_file: str,
+                     frequencies: Optional[Dict[str, int]] = None, output: str = 'standalone') -> None:
+    """Generate an interactive wordcloud visualization from comments or precomputed token frequencies."""
+    try:
+        _write_figure(build_wordcloud_figure(comments, frequencies), output_file, output)
     except Exception as e:
         logger.error(f"Error creating wordcloud: {e}")
         raise
 
-def create_sentiment_distribution(sentiment_results: Dict[str, Any], output_file: str) -> None:
+def build_sentiment_distribution_figure(sentiment_results: Dict[str, Any]) -> go.Figure:
+    """Build the sentiment distribution figure."""
+    import plotly.graph_objects as go
+    overall_stats = sentiment_results['overall_stats']
+    distribution = overall_stats['sentiment_distribution']
+    fig = go.Figure(data=[
+        go.Bar(
+            x=list(distribution.keys()),
+            y=list(distribution.values()),
+            marker_color=['#2ecc71', '#95a5a6', '#e74c3c']
+        )
+    ])
+    fig.update_layout(
+        title="Sentiment Distribution",
+        xaxis_title="Sentiment",
+        yaxis_title="Percentage",
+        yaxis_tickformat=',.1%',
+        showlegend=False
+    )
+    fig.add_shape(
+        type="line",
+        x0=overall_stats['average_sentiment'],
+        x1=overall_stats['average_sentiment'],
+        y0=0,
+        y1=max(distribution.values()),
+        line=dict(color="red", width=2, dash="dash")
+    )
+    return fig
+
+def create_sentiment_distribution(sentiment_results: Dict[str, Any], output_file: str, output: str = 'standalone') -> None:
     """Create an interactive sentiment distribution visualization."""
     try:
-        overall_stats = sentiment_results['overall_stats']
-        distribution = overall_stats['sentiment_distribution']
-        fig = go.Figure(data=[
-            go.Bar(
-                x=list(distribution.keys()),
-                y=list(distribution.values()),
-                marker_color=['#2ecc71', '#95a5a6', '#e74c3c']
-            )
-        ])
-        fig.update_layout(
-            title="Sentiment Distribution",
-            xaxis_title="Sentiment",
-            yaxis_title="Percentage",
-            yaxis_tickformat=',.1%',
-            showlegend=False
-        )
-        fig.add_shape(
-            type="line",
-            x0=overall_stats['average_sentiment'],
-            x1=overall_stats['average_sentiment'],
-            y0=0,
-            y1=max(distribution.values()),
-            line=dict(color="red", width=2, dash="dash")
-        )
-        fig.write_html(output_file)
+        _write_figure(build_sentiment_distribution_figure(sentiment_results), output_file, output)
     except Exception as e:
         logger.error(f"Error creating sentiment distribution: {e}")
         raise
 
-def create_engagement_visualization(metadata: Dict[str, Any], output_file: str) -> None:
+def build_engagement_figure(metadata: Dict[str, Any]) -> go.Figure:
+    """Build the engagement figure."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    stats = metadata.get('statistics', {})
+    metrics = {
+        'Views': int(stats.get('viewCount', 0)),
+        'Likes': int(stats.get('likeCount', 0)),
+        'Comments': int(stats.get('commentCount', 0))
+    }
+    fig = make_subplots(
+        rows=1, cols=2,
+        specs=[[{"type": "bar"}, {"type": "pie"}]],
+        subplot_titles=("Engagement Metrics", "Engagement Distribution")
+    )
+    fig.add_trace(
+        go.Bar(
+            x=list(metrics.keys()),
+            y=list(metrics.values()),
+            marker_color=['#3498db', '#2ecc71', '#9b59b6']
+        ),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Pie(
+            labels=list(metrics.keys()),
+            values=list(metrics.values()),
+            textinfo='label+percent'
+        ),
+        row=1, col=2
+    )
+    fig.update_layout(
+        title="Video Engagement Analysis",
+        showlegend=False,
+        height=500
+    )
+    return fig
+
+def create_engagement_visualization(metadata: Dict[str, Any], output_file: str, output: str = 'standalone') -> None:
     """Create an interactive visualization of video engagement metrics."""
     try:
-        stats = metadata.get('statistics', {})
-        metrics = {
-            'Views': int(stats.get('viewCount', 0)),
-            'Likes': int(stats.get('likeCount', 0)),
-            'Comments': int(stats.get('commentCount', 0))
-        }
-        fig = make_subplots(
-            rows=1, cols=2,
-            specs=[[{"type": "bar"}, {"type": "pie"}]],
-            subplot_titles=("Engagement Metrics", "Engagement Distribution")
-        )
-        fig.add_trace(
-            go.Bar(
-                x=list(metrics.keys()),
-                y=list(metrics.values()),
-                marker_color=['#3498db', '#2ecc71', '#9b59b6']
-            ),
-            row=1, col=1
-        )
-        fig.add_trace(
-            go.Pie(
-                labels=list(metrics.keys()),
-                values=list(metrics.values()),
-                textinfo='label+percent'
-            ),
-            row=1, col=2
-        )
-        fig.update_layout(
-            title="Video Engagement Analysis",
-            showlegend=False,
-            height=500
-        )
-        fig.write_html(output_file)
+        _write_figure(build_engagement_figure(metadata), output_file, output)
     except Exception as e:
         logger.error(f"Error creating engagement visualization: {e}")
         raise
 
-def create_sentiment_trends_visualization(trends: List[Dict[str, Any]], output_file: str) -> None:
-    """Create an interactive visualization of sentiment trends over time."""
-    try:
-        df = pd.DataFrame(trends)
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(
-                x=df['timestamp'],
-                y=df['average_sentiment'],
-                mode='lines+markers',
-                name='Average Sentiment',
-                line=dict(color='#2980b9')
-            )
+def build_sentiment_trends_figure(trends: List[Dict[str, Any]]) -> go.Figure:
+    """Build the sentiment trends figure."""
+    import pandas as pd
+    import plotly.graph_objects as go
+    df = pd.DataFrame(trends)
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=df['timestamp'],
+            y=df['average_sentiment'],
+            mode='lines+markers',
+            name='Average Sentiment',
+            line=dict(color='#2980b9')
         )
-        fig.add_trace(
-            go.Scatter(
-                x=df['timestamp'],
-                y=df['num_comments'],
-                name='Number of Comments',
-                fill='tozeroy',
-                line=dict(color='#3498db', width=0.5),
-                fillcolor='rgba(52, 152, 219, 0.2)'
-            )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=df['timestamp'],
+            y=df['num_comments'],
+            name='Number of Comments',
+            fill='tozeroy',
+            line=dict(color='#3498db', width=0.5),
+            fillcolor='rgba(52, 152, 219, 0.2)'
         )
-        fig.update_layout(
-            title="Sentiment Trends Over Time",
-            xaxis_title="Time",
-            yaxis_title="Sentiment Score",
-            hovermode='x unified',
-            showlegend=True
+    )
+    fig.update_layout(
+        title="Sentiment Trends Over Time",
+        xaxis_title="Time",
+        yaxis_title="Sentiment Score",
+        hovermode='x unified',
+        showlegend=True
+    )
+    fig.update_layout(
+        yaxis2=dict(
+            title="Number of Comments",
+            overlaying="y",
+            side="right"
         )
-        fig.update_layout(
-            yaxis2=dict(
-                title="Number of Comments",
-                overlaying="y",
-                side="right"
-            )
-        )
-        fig.write_html(output_file)
+    )
+    return fig
+
+def create_sentiment_trends_visualization(trends: List[Dict[str, Any]], output_file: str, output: str = 'standalone') -> None:
+    """Create an interactive visualization of sentiment trends over time."""
+    try:
+        _write_figure(build_sentiment_trends_figure(trends), output_file, output)
     except Exception as e:
         logger.error(f"Error creating sentiment trends visualization: {e}")
         raise
 
-def create_heatmap(data: pd.DataFrame, x_col: str, y_col: str, z_col: str, output_file: str) -> None:
+def build_heatmap_figure(data: pd.DataFrame, x_col: str, y_col: str, z_col: str) -> go.Figure:
+    """Build the heatmap figure."""
+    import plotly.express as px
+    fig = px.density_heatmap(data, x=x_col, y=y_col, z=z_col, color_continuous_scale='Viridis')
+    fig.update_layout(
+        title="Heatmap",
+        xaxis_title=x_col,
+        yaxis_title=y_col
+    )
+    return fig
+
+def create_heatmap(data: pd.DataFrame, x_col: str, y_col: str, z_col: str, output_file: str, output: str = 'standalone') -> None:
     """Create an interactive heatmap visualization."""
     try:
-        fig = px.density_heatmap(data, x=x_col, y=y_col, z=z_col, color_continuous_scale='Viridis')
-        fig.update_layout(
-            title="Heatmap",
-            xaxis_title=x_col,
-            yaxis_title=y_col
-        )
-        fig.write_html(output_file)
+        _write_figure(build_heatmap_figure(data, x_col, y_col, z_col), output_file, output)
     except Exception as e:
         logger.error(f"Error creating heatmap: {e}")
         raise
 
-def create_scatter_plot(data: pd.DataFrame, x_col: str, y_col: str, color_col: str, output_file: str) -> None:
+def build_scatter_figure(data: pd.DataFrame, x_col: str, y_col: str, color_col: str) -> go.Figure:
+    """Build the scatter plot figure."""
+    import plotly.express as px
+    fig = px.scatter(data, x=x_col, y=y_col, color=color_col, title="Scatter Plot")
+    fig.update_layout(
+        xaxis_title=x_col,
+        yaxis_title=y_col
+    )
+    return fig
+
+def create_scatter_plot(data: pd.DataFrame, x_col: str, y_col: str, color_col: str, output_file: str, output: str = 'standalone') -> None:
     """Create an interactive scatter plot visualization."""
     try:
-        fig = px.scatter(data, x=x_col, y=y_col, color=color_col, title="Scatter Plot")
-        fig.update_layout(
-            xaxis_title=x_col,
-            yaxis_title=y_col
-        )
-        fig.write_html(output_file)
+        _write_figure(build_scatter_figure(data, x_col, y_col, color_col), output_file, output)
     except Exception as e:
         logger.error(f"Error creating scatter plot: {e}")
-        raise
\ No newline at end of file
+        raise
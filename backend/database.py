@@ -1,12 +1,24 @@
-from sqlalchemy import create_engine, Column, String, DateTime, JSON, Integer, Float
+from sqlalchemy import create_engine, Column, String, DateTime, JSON, Integer, Float, ForeignKey, Index, func, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from contextlib import contextmanager
 from datetime import datetime
-from config import Config
+from backend.comment_batch import CommentBatch
+from backend.config import Config
+from backend.metrics import instrument_engine
+from backend.sentiment_analysis import score_comments, summarize_scores, COMPOUND, HISTOGRAM_BINS
+from backend.utils import parse_youtube_timestamp
+import io
+import threading
+import numpy as np
 
-# Use connection pooling for database interactions
-engine = create_engine(Config.POSTGRES_URL, pool_size=10, max_overflow=20)
-SessionLocal = sessionmaker(bind=engine)
+# The engine (and its connection pool) is created on first use by get_engine(),
+# so importing this module never touches the database.
+_engine = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker()
 Base = declarative_base()
 
 class Analysis(Base):
@@ -28,16 +40,431 @@ class Video(Base):
 class Comment(Base):
     __tablename__ = 'comments'
     id = Column(String, primary_key=True)
-    video_id = Column(String)
+    video_id = Column(String, ForeignKey('videos.id'))
     text = Column(String)
     sentiment_score = Column(Float)
+    published_at = Column(DateTime)
+    like_count = Column(Integer, default=0)
     video = relationship("Video", back_populates="comments")
 
-Base.metadata.create_all(engine)
+    __table_args__ = (
+        Index('ix_comments_video_id_published_at', 'video_id', 'published_at'),
+    )
+
+class VideoSentimentAggregate(Base):
+    """Per-video sentiment summary kept up to date as comments are stored or rescored."""
+    __tablename__ = 'video_sentiment_aggregates'
+    video_id = Column(String, ForeignKey('videos.id'), primary_key=True)
+    comment_count = Column(Integer, nullable=False, default=0)
+    positive_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    histogram = Column(JSON)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_sq_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        count = self.comment_count
+        mean = self.score_sum / count if count else 0.0
+        variance = max(self.score_sq_sum / count - mean * mean, 0.0) if count else 0.0
+        return {
+            "video_id": self.video_id,
+            "sentiment": {
+                "positive": self.positive_count,
+                "negative": self.negative_count,
+                "neutral": self.neutral_count
+            },
+            "comment_count": count,
+            "average_sentiment": mean,
+            "sentiment_variance": variance,
+            "histogram": self.histogram,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def init_db(engine):
+    """Creates any missing tables and indexes."""
+    Base.metadata.create_all(engine)
+
+def get_engine():
+    """
+    Returns the process-wide engine, creating it and the schema on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # Use connection pooling for database interactions
+                engine = instrument_engine(create_engine(Config.POSTGRES_URL, pool_size=10, max_overflow=20))
+                init_db(engine)
+                _engine = engine
+    return _engine
+
+def dispose_engine(close=True):
+    """
+    Forgets the engine and its pooled connections.
+
+    In a forked child pass close=False, so connections inherited from the
+    parent are dropped without closing them under the parent's feet.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+        _engine = None
 
+@contextmanager
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
         db.close()
+
+def ensure_video(db, video_id):
+    """Creates a bare Video row for video_id if there is none yet."""
+    if db.get(Video, video_id) is None:
+        db.add(Video(id=video_id))
+        db.flush()
+
+def newest_comment_time(db, video_id):
+    """Returns the publish time of the newest stored comment of a video, or None."""
+    return db.query(func.max(Comment.published_at)).filter(Comment.video_id == video_id).scalar()
+
+def known_comment_ids(db, comment_ids):
+    """Returns the subset of comment_ids that are already stored."""
+    if not comment_ids:
+        return set()
+    return {row[0] for row in db.query(Comment.id).filter(Comment.id.in_(comment_ids))}
+
+
+COMMENT_COLUMNS = ('id', 'video_id', 'text', 'sentiment_score', 'published_at', 'like_count')
+INGEST_BATCH_SIZE = 5000
+
+def _comment_row(video_id, record):
+    published_at = record.get('published_at')
+    if isinstance(published_at, str):
+        published_at = parse_youtube_timestamp(published_at)
+    return {
+        'id': record['id'],
+        'video_id': video_id,
+        'text': record['text'],
+        'sentiment_score': record.get('sentiment_score'),
+        'published_at': published_at,
+        'like_count': record.get('like_count')
+    }
+
+def _csv_field(value):
+    # COPY ... (FORMAT csv) reads an unquoted empty field as NULL. Float
+    # columns of a CommentBatch mark missing values with NaN.
+    if value is None or value != value:
+        return ''
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+_STAGING_CONFLICT = (
+    "ON CONFLICT (id) DO UPDATE SET "
+    "video_id = EXCLUDED.video_id, text = EXCLUDED.text, "
+    "sentiment_score = COALESCE(EXCLUDED.sentiment_score, comments.sentiment_score), "
+    "published_at = COALESCE(EXCLUDED.published_at, comments.published_at), "
+    "like_count = COALESCE(EXCLUDED.like_count, comments.like_count)"
+)
+
+def _copy_upsert(db, rows):
+    """Loads rows with PostgreSQL COPY into a staging table and upserts from it."""
+    columns = ', '.join(COMMENT_COLUMNS)
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS comments_staging "
+        "(LIKE comments INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_csv_field(row[column]) for column in COMMENT_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY comments_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+    db.execute(text(
+        f"INSERT INTO comments ({columns}) SELECT {columns} FROM comments_staging " + _STAGING_CONFLICT
+    ))
+    db.execute(text("TRUNCATE comments_staging"))
+
+def _copy_upsert_batch(db, video_id, batch):
+    """
+    Like _copy_upsert(), but writes the COPY input straight from the columns
+    of a CommentBatch. published_at is staged as Unix seconds.
+    """
+    columns = ', '.join(COMMENT_COLUMNS)
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS comment_batch_staging "
+        "(id varchar, text varchar, sentiment_score double precision, "
+        "published_at double precision, like_count integer) ON COMMIT DROP"
+    ))
+    compound = batch.compound.tolist() if batch.scores is not None else [None] * len(batch)
+    buffer = io.StringIO()
+    for row in zip(batch.ids, batch.text, compound, batch.published_at.tolist(), batch.like_count.tolist()):
+        buffer.write(','.join(_csv_field(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY comment_batch_staging (id, text, sentiment_score, published_at, like_count) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+    db.execute(text(
+        f"INSERT INTO comments ({columns}) "
+        "SELECT id, :video_id, text, sentiment_score, "
+        "to_timestamp(published_at) AT TIME ZONE 'UTC', like_count FROM comment_batch_staging "
+        + _STAGING_CONFLICT
+    ), {'video_id': video_id})
+    db.execute(text("TRUNCATE comment_batch_staging"))
+
+def _empty_aggregate(video_id):
+    return VideoSentimentAggregate(
+        video_id=video_id, comment_count=0, positive_count=0, negative_count=0,
+        neutral_count=0, histogram=[0] * HISTOGRAM_BINS, score_sum=0.0, score_sq_sum=0.0,
+        updated_at=datetime.utcnow()
+    )
+
+def _lock_aggregate(db, video_id):
+    """
+    Returns a video's aggregate row locked for update, creating it first.
+
+    The row is created with INSERT ... ON CONFLICT DO NOTHING, so two
+    transactions ingesting a new video both end up locking the one row
+    instead of each adding their own.
+    """
+    dialect = db.connection().dialect.name
+    insert = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}.get(dialect)
+    if insert is None:
+        aggregate = db.get(VideoSentimentAggregate, video_id, with_for_update=True)
+        if aggregate is None:
+            aggregate = _empty_aggregate(video_id)
+            db.add(aggregate)
+        return aggregate
+
+    empty = _empty_aggregate(video_id)
+    db.execute(insert(VideoSentimentAggregate.__table__).values(
+        **{column.name: getattr(empty, column.name) for column in VideoSentimentAggregate.__table__.columns}
+    ).on_conflict_do_nothing(index_elements=['video_id']))
+    return db.execute(
+        select(VideoSentimentAggregate)
+        .where(VideoSentimentAggregate.video_id == video_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one()
+
+def apply_sentiment_delta(db, video_id, added_scores=(), removed_scores=()):
+    """
+    Adds and subtracts compound scores from a video's sentiment aggregate.
+
+    The aggregate row is created if need be and locked for the update on
+    backends that support it, so concurrent ingests of the same video don't
+    lose counts.
+    """
+    added = summarize_scores(added_scores)
+    removed = summarize_scores(removed_scores)
+    if not added['comment_count'] and not removed['comment_count']:
+        return
+    _apply_summaries(_lock_aggregate(db, video_id), added, removed)
+
+def _apply_summaries(aggregate, added, removed):
+    aggregate.comment_count += added['comment_count'] - removed['comment_count']
+    aggregate.positive_count += added['positive'] - removed['positive']
+    aggregate.negative_count += added['negative'] - removed['negative']
+    aggregate.neutral_count += added['neutral'] - removed['neutral']
+    aggregate.histogram = [
+        current + plus - minus
+        for current, plus, minus in zip(aggregate.histogram, added['histogram'], removed['histogram'])
+    ]
+    aggregate.score_sum += added['score_sum'] - removed['score_sum']
+    aggregate.score_sq_sum += added['score_sq_sum'] - removed['score_sq_sum']
+    aggregate.updated_at = datetime.utcnow()
+
+def _stored_scores(db, comment_ids):
+    if not comment_ids:
+        return []
+    rows = db.execute(
+        select(Comment.sentiment_score).where(Comment.id.in_(comment_ids), Comment.sentiment_score.isnot(None))
+    )
+    return rows.scalars().all()
+
+def _executemany_upsert(db, rows, insert):
+    statement = insert(Comment.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['id'],
+        set_={
+            'video_id': statement.excluded.video_id,
+            'text': statement.excluded.text,
+            'sentiment_score': func.coalesce(statement.excluded.sentiment_score, Comment.__table__.c.sentiment_score),
+            'published_at': func.coalesce(statement.excluded.published_at, Comment.__table__.c.published_at),
+            'like_count': func.coalesce(statement.excluded.like_count, Comment.__table__.c.like_count)
+        }
+    )
+    db.execute(statement, rows)
+
+def bulk_upsert_comments(db, video_id, records, batch_size=INGEST_BATCH_SIZE):
+    """
+    Inserts or updates many comments of a video in batches.
+
+    PostgreSQL with psycopg2 loads each batch with COPY into a staging table
+    and upserts from there, writing a CommentBatch straight from its columns;
+    other backends use a batched executemany upsert.
+    Existing comments keep their sentiment_score, published_at and like_count
+    when the new record has none.
+    The video's VideoSentimentAggregate is updated in the same transaction
+    with every new or changed score. Its row is locked before the previous
+    scores are read, so concurrent ingests of the same comments take turns
+    instead of both counting them as new. The caller commits.
+
+    Args:
+        db (Session): Database session.
+        video_id (str): The video the comments belong to.
+        records (iterable): Dicts with id, text and optionally
+            sentiment_score, published_at (datetime or RFC 3339 string)
+            and like_count, or a CommentBatch (scored or not).
+        batch_size (int): Rows per COPY or executemany round-trip.
+
+    Returns:
+        int: Number of records written.
+    """
+    dialect = db.connection().dialect
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+        write = _copy_upsert
+    elif dialect.name == 'postgresql':
+        write = lambda db, rows: _executemany_upsert(db, rows, postgresql_insert)
+    elif dialect.name == 'sqlite':
+        write = lambda db, rows: _executemany_upsert(db, rows, sqlite_insert)
+    else:
+        write = lambda db, rows: [
+            db.merge(Comment(**{column: value for column, value in row.items() if value is not None}))
+            for row in rows
+        ]
+
+    if isinstance(records, CommentBatch):
+        if write is _copy_upsert:
+            write_batch = lambda db, batch: _copy_upsert_batch(db, video_id, batch)
+        else:
+            write_batch = lambda db, batch: write(db, [_comment_row(video_id, record) for record in batch.records()])
+        return _upsert_comment_batch(db, video_id, records, batch_size, write_batch)
+
+    def flush(batch):
+        rows = list(batch.values())
+        scored = [row for row in rows if row['sentiment_score'] is not None]
+        _write_scored(db, video_id, [row['id'] for row in scored], [row['sentiment_score'] for row in scored],
+                      lambda: write(db, rows))
+        return len(rows)
+
+    written = 0
+    batch = {}
+    for record in records:
+        # One upsert statement can't touch the same row twice, so the last
+        # record with a given ID in a batch wins.
+        batch[record['id']] = _comment_row(video_id, record)
+        if len(batch) >= batch_size:
+            written += flush(batch)
+            batch = {}
+    if batch:
+        written += flush(batch)
+    return written
+
+def _upsert_comment_batch(db, video_id, batch, batch_size, write):
+    """bulk_upsert_comments() for a CommentBatch, chunked without a dict per comment."""
+    # As with records, the last comment with a given ID wins.
+    last = {comment_id: i for i, comment_id in enumerate(batch.ids)}
+    if len(last) < len(batch):
+        batch = batch.take(sorted(last.values()))
+
+    for start in range(0, len(batch), batch_size):
+        chunk = batch if len(batch) <= batch_size else batch.take(np.arange(start, min(start + batch_size, len(batch))))
+        added = []
+        scored_ids = []
+        if chunk.scores is not None:
+            scored = np.flatnonzero(~np.isnan(chunk.compound))
+            added = chunk.compound[scored].tolist()
+            scored_ids = chunk.ids.take(scored.tolist()).tolist()
+        _write_scored(db, video_id, scored_ids, added, lambda: write(db, chunk))
+    return len(batch)
+
+def _write_scored(db, video_id, scored_ids, scores, write):
+    """
+    Runs write() and moves the aggregate from the stored scores of
+    scored_ids to their new scores, with the aggregate row locked throughout.
+    """
+    if not scored_ids:
+        write()
+        return
+    aggregate = _lock_aggregate(db, video_id)
+    removed = _stored_scores(db, scored_ids)
+    write()
+    _apply_summaries(aggregate, summarize_scores(scores), summarize_scores(removed))
+
+def load_comment_texts(db, video_id):
+    """Returns the texts of a video's comments without building ORM objects."""
+    return db.execute(select(Comment.text).where(Comment.video_id == video_id)).scalars().all()
+
+def load_comment_batch(db, video_id):
+    """
+    Returns a video's stored comments as a CommentBatch, with their stored
+    scores (NaN where unscored), without building ORM objects.
+    """
+    rows = db.execute(
+        select(Comment.id, Comment.text, Comment.published_at, Comment.like_count, Comment.sentiment_score)
+        .where(Comment.video_id == video_id)
+    ).all()
+    ids, texts, published_at, like_counts, compound = zip(*rows) if rows else ((),) * 5
+    return CommentBatch.from_columns(ids, texts, published_at=published_at, like_counts=like_counts, compound=compound)
+
+def load_comment_scores(db, video_id):
+    """
+    Returns a video's stored comment scores as a float32 array.
+
+    Comments that have not been scored yet are returned as NaN.
+    """
+    scores = db.execute(select(Comment.sentiment_score).where(Comment.video_id == video_id)).scalars()
+    return np.fromiter((np.nan if score is None else score for score in scores), dtype=np.float32)
+
+def rebuild_sentiment_aggregate(db, video_id):
+    """
+    Recomputes a video's aggregate from its stored comments.
+
+    Comments stored without a score are scored and saved first. Used to
+    backfill aggregates for comments ingested before the aggregate existed.
+
+    Returns:
+        VideoSentimentAggregate: The rebuilt aggregate.
+    """
+    # Reset under the row lock, so a concurrent rebuild waits for this one
+    # and then starts over from zero instead of adding on top of it.
+    aggregate = _lock_aggregate(db, video_id)
+    empty = _empty_aggregate(video_id)
+    for column in VideoSentimentAggregate.__table__.columns:
+        if column.name != 'video_id':
+            setattr(aggregate, column.name, getattr(empty, column.name))
+    scores = load_comment_scores(db, video_id)
+    _apply_summaries(aggregate, summarize_scores(scores[~np.isnan(scores)]), summarize_scores(()))
+    db.flush()
+
+    unscored = db.execute(
+        select(Comment.id, Comment.text).where(Comment.video_id == video_id, Comment.sentiment_score.is_(None))
+    ).all()
+    if unscored:
+        compound = score_comments([row.text for row in unscored])[:, COMPOUND]
+        bulk_upsert_comments(db, video_id, (
+            {'id': row.id, 'text': row.text, 'sentiment_score': float(score)}
+            for row, score in zip(unscored, compound)
+        ))
+    db.flush()
+    return aggregate
+
+def get_sentiment_aggregate(db, video_id):
+    """Returns a video's VideoSentimentAggregate, or None if it has none."""
+    return db.get(VideoSentimentAggregate, video_id)
@@ -0,0 +1,354 @@
+# backend/fake_youtube_api.py
+"""
+Local stand-in for the parts of the YouTube Data API v3 this backend uses.
+
+    python -m backend.fake_youtube_api --port 8085 --comments 5000 --latency-ms 80
+    YOUTUBE_API_BASE_URL=http://localhost:8085/youtube/v3 python -m backend.app
+
+Serves commentThreads.list, comments.list and videos.list with deterministic
+synthetic data: the same video ID always has the same threads, texts and
+timestamps. Responses carry ETags and honour If-None-Match with a 304.
+
+The video ID selects the behaviour:
+
+    <anything>          comments_per_video top-level threads (the default)
+    size-<n>-<rest>     n top-level threads, e.g. size-200000-trending
+    missing-<rest>      404 videoNotFound
+    quota-<rest>        403 quotaExceeded
+    error-<rest>        500 backendError
+
+Server-wide, latency_ms (+ up to latency_jitter_ms) is added to every
+request, error_rate of requests fail with 503 backendError, and once
+quota_units list calls have been served every request gets 403 quotaExceeded.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+POSITIVE_WORDS = ['love', 'great', 'amazing', 'awesome', 'helpful', 'beautiful', 'fantastic', 'best']
+NEGATIVE_WORDS = ['hate', 'awful', 'boring', 'worst', 'terrible', 'annoying', 'bad', 'useless']
+NEUTRAL_WORDS = [
+    'video', 'song', 'part', 'minute', 'channel', 'editing', 'camera', 'voice', 'intro', 'ending',
+    'the', 'this', 'that', 'was', 'is', 'and', 'but', 'really', 'so', 'at', 'when', 'who', 'here'
+]
+VOCABULARY = POSITIVE_WORDS + NEGATIVE_WORDS + NEUTRAL_WORDS * 3
+
+# Keys of the app's state; aiohttp >= 3.9 wants typed AppKeys.
+FAKE_KEY = web.AppKey('fake', object) if hasattr(web, 'AppKey') else 'fake'
+STATS_KEY = web.AppKey('stats', dict) if hasattr(web, 'AppKey') else 'stats'
+
+# The API inlines at most this many replies in a commentThreads item.
+INLINE_REPLIES = 5
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_text(seed):
+    """Deterministic comment text for a seed string."""
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(4, 24)))
+
+
+def _timestamp(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _error(status, reason, message=None):
+    return web.json_response({'error': {
+        'code': status,
+        'message': message or reason,
+        'errors': [{'reason': reason, 'domain': 'youtube.fake'}]
+    }}, status=status)
+
+
+class FakeYouTube:
+    """
+    Generates the synthetic videos, threads and replies served by create_app().
+
+    Args:
+        comments_per_video (int): Top-level threads of a video without a size- prefix.
+        replies_every (int): Every n-th thread has replies (0 for none).
+        replies_per_thread (int): Replies of such a thread; more than
+            INLINE_REPLIES are only listed in full by comments.list.
+        seed (int): Seed mixed into every generated value.
+    """
+
+    def __init__(self, comments_per_video=1000, replies_every=5, replies_per_thread=2, seed=0):
+        self.comments_per_video = comments_per_video
+        self.replies_every = replies_every
+        self.replies_per_thread = replies_per_thread
+        self.seed = seed
+
+    def thread_count(self, video_id):
+        if video_id.startswith('size-'):
+            return int(video_id.split('-')[1])
+        return self.comments_per_video
+
+    def reply_count(self, index):
+        if self.replies_every and index % self.replies_every == 0:
+            return self.replies_per_thread
+        return 0
+
+    def comment(self, comment_id, seconds, parent_id=None):
+        snippet = {
+            'textDisplay': synthetic_text(f'{self.seed}:{comment_id}'),
+            'textOriginal': None,
+            'authorDisplayName': f"user{zlib.crc32(comment_id.encode('utf-8')) % 10000}",
+            'likeCount': random.Random(f'{self.seed}:likes:{comment_id}').randint(0, 500),
+            'publishedAt': _timestamp(seconds),
+            'updatedAt': _timestamp(seconds)
+        }
+        snippet['textOriginal'] = snippet['textDisplay']
+        if parent_id is not None:
+            snippet['parentId'] = parent_id
+        return {'kind': 'youtube#comment', 'id': comment_id, 'snippet': snippet}
+
+    def _thread_seconds(self, video_id, index):
+        # Thread 0 is the newest, so order=time pages run newest first.
+        return (self.thread_count(video_id) - index) * 60
+
+    def replies(self, video_id, index):
+        parent_id = f'{video_id}.{index}'
+        start = self._thread_seconds(video_id, index)
+        return [
+            self.comment(f'{parent_id}.{reply}', start + 30 + reply, parent_id=parent_id)
+            for reply in range(self.reply_count(index))
+        ]
+
+    def thread(self, video_id, index):
+        top_level = self.comment(f'{video_id}.{index}', self._thread_seconds(video_id, index))
+        replies = self.replies(video_id, index)
+        item = {
+            'kind': 'youtube#commentThread',
+            'id': top_level['id'],
+            'snippet': {
+                'videoId': video_id,
+                'topLevelComment': top_level,
+                'totalReplyCount': len(replies),
+                'canReply': True,
+                'isPublic': True
+            }
+        }
+        if replies:
+            item['replies'] = {'comments': replies[:INLINE_REPLIES]}
+        return item
+
+    def video(self, video_id):
+        count = self.thread_count(video_id)
+        return {
+            'kind': 'youtube#video',
+            'id': video_id,
+            'snippet': {
+                'title': f'Synthetic video {video_id}',
+                'description': synthetic_text(f'{self.seed}:description:{video_id}'),
+                'publishedAt': _timestamp(0),
+                'channelTitle': 'Fake channel'
+            },
+            'contentDetails': {'duration': 'PT10M'},
+            'statistics': {
+                'viewCount': str(count * 100),
+                'likeCount': str(count * 5),
+                'commentCount': str(count + sum(self.reply_count(i) for i in range(count)))
+            }
+        }
+
+
+def _page(items, page_token, max_results):
+    start = int(page_token or 0)
+    end = min(start + max_results, items)
+    return range(start, end), (str(end) if end < items else None)
+
+
+def _max_results(request, limit):
+    try:
+        return max(1, min(int(request.query.get('maxResults', 20)), limit))
+    except ValueError:
+        return limit
+
+
+def _video_error(video_id):
+    if video_id.startswith('missing-'):
+        return _error(404, 'videoNotFound', 'The video identified by the videoId parameter could not be found.')
+    if video_id.startswith('quota-'):
+        return _error(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.')
+    if video_id.startswith('error-'):
+        return _error(500, 'backendError', 'Backend Error')
+    return None
+
+
+class _ResponseCache:
+    # Generating a page costs far more than serving it, and the data never
+    # changes, so encoded bodies are kept (LRU) to keep the fake off the
+    # critical path of load tests.
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, request, build):
+        key = (request.path, tuple(sorted((k, v) for k, v in request.query.items() if k != 'key')))
+        entry = self._entries.get(key)
+        if entry is None:
+            payload = build()
+            etag = '"' + hashlib.blake2b(
+                json.dumps(payload, separators=(',', ':')).encode('utf-8'), digest_size=12
+            ).hexdigest() + '"'
+            entry = (etag, json.dumps(dict(payload, etag=etag), separators=(',', ':')).encode('utf-8'))
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        etag, body = entry
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
+
+
+def create_app(comments_per_video=1000, replies_every=5, replies_per_thread=2, latency_ms=0,
+               latency_jitter_ms=0, error_rate=0.0, quota_units=None, seed=0):
+    """
+    Builds the fake API as an aiohttp application rooted at /youtube/v3.
+
+    app[STATS_KEY] counts requests, injected errors and quota units used.
+    """
+    fake = FakeYouTube(comments_per_video, replies_every, replies_per_thread, seed)
+    rng = random.Random(seed)
+    stats = {'requests': 0, 'errors': 0, 'quota_used': 0, 'not_modified': 0}
+    responses = _ResponseCache()
+
+    @web.middleware
+    async def simulate(request, handler):
+        stats['requests'] += 1
+        delay = latency_ms + (rng.uniform(0, latency_jitter_ms) if latency_jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if 'key' not in request.query:
+            return _error(403, 'forbidden', 'The request is missing a valid API key.')
+        if quota_units is not None and stats['quota_used'] >= quota_units:
+            stats['errors'] += 1
+            return _error(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.')
+        if error_rate and rng.random() < error_rate:
+            stats['errors'] += 1
+            return _error(503, 'backendError', 'Backend Error')
+        stats['quota_used'] += 1
+        response = await handler(request)
+        if response.status == 304:
+            stats['not_modified'] += 1
+        return response
+
+    async def comment_threads(request):
+        video_id = request.query.get('videoId')
+        if not video_id:
+            return _error(400, 'missingRequiredParameter', 'No filter selected.')
+        error = _video_error(video_id)
+        if error is not None:
+            return error
+
+        def build():
+            indexes, next_token = _page(fake.thread_count(video_id), request.query.get('pageToken'),
+                                        _max_results(request, 100))
+            payload = {
+                'kind': 'youtube#commentThreadListResponse',
+                'pageInfo': {'totalResults': len(indexes), 'resultsPerPage': len(indexes)},
+                'items': [fake.thread(video_id, index) for index in indexes]
+            }
+            if next_token:
+                payload['nextPageToken'] = next_token
+            return payload
+        return responses.get(request, build)
+
+    async def comments(request):
+        parent_id = request.query.get('parentId', '')
+        video_id, _, index = parent_id.rpartition('.')
+        if not video_id or not index.isdigit():
+            return _error(404, 'commentNotFound', 'The comment could not be found.')
+
+        def build():
+            replies = fake.replies(video_id, int(index))
+            indexes, next_token = _page(len(replies), request.query.get('pageToken'), _max_results(request, 100))
+            payload = {
+                'kind': 'youtube#commentListResponse',
+                'items': [replies[i] for i in indexes]
+            }
+            if next_token:
+                payload['nextPageToken'] = next_token
+            return payload
+        return responses.get(request, build)
+
+    async def videos(request):
+        ids = [video_id for video_id in request.query.get('id', '').split(',') if video_id]
+        if not ids:
+            return _error(400, 'missingRequiredParameter', 'No filter selected.')
+        if len(ids) > 50:
+            return _error(400, 'invalidParameter', 'Too many video IDs.')
+
+        def build():
+            items = [fake.video(video_id) for video_id in ids if _video_error(video_id) is None]
+            return {
+                'kind': 'youtube#videoListResponse',
+                'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)},
+                'items': items
+            }
+        return responses.get(request, build)
+
+    app = web.Application(middlewares=[simulate])
+    app[FAKE_KEY] = fake
+    app[STATS_KEY] = stats
+    app.router.add_get('/youtube/v3/commentThreads', comment_threads)
+    app.router.add_get('/youtube/v3/comments', comments)
+    app.router.add_get('/youtube/v3/videos', videos)
+    return app
+
+
+async def start_server(app, host='127.0.0.1', port=0):
+    """
+    Serves an app from create_app() in the running event loop.
+
+    Returns:
+        tuple: (aiohttp AppRunner to clean up, base URL for YOUTUBE_API_BASE_URL).
+    """
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://{host}:{port}/youtube/v3'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--comments', type=int, default=1000, help="Top-level threads per video")
+    parser.add_argument('--replies-every', type=int, default=5)
+    parser.add_argument('--replies-per-thread', type=int, default=2)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with 503")
+    parser.add_argument('--quota', type=int, help="List calls served before every request gets 403 quotaExceeded")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        comments_per_video=args.comments,
+        replies_every=args.replies_every,
+        replies_per_thread=args.replies_per_thread,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        quota_units=args.quota,
+        seed=args.seed
+    )
+    print(f"Fake YouTube API on http://{args.host}:{args.port}/youtube/v3")
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()
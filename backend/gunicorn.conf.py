@@ -0,0 +1,71 @@
+# backend/gunicorn.conf.py
+#
+#   gunicorn -c backend/gunicorn.conf.py backend.app:app
+#
+# The app is imported once in the master (preload_app) and warmed up there,
+# so workers fork with the VADER lexicon and plotting libraries already
+# loaded and share those pages copy-on-write instead of each rebuilding them.
+#
+# With more than one worker, JOBS_BACKEND and PROFILING_BACKEND must be
+# 'redis'; the master refuses to start otherwise.
+import gc
+import logging
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def when_ready(server):
+    from backend import data_visualization, sentiment_analysis
+    from backend.config import Config
+
+    # In-process stores are private to each worker: a job created in one
+    # would be a 404 in the others, and so would a profile.
+    backends = {'JOBS_BACKEND': Config.JOBS_BACKEND, 'PROFILING_BACKEND': Config.PROFILING_BACKEND}
+    local = [name for name, backend in backends.items() if backend == 'local']
+    if server.num_workers > 1 and local:
+        raise RuntimeError(
+            f"{' and '.join(local)} must be 'redis' with {server.num_workers} workers "
+            "(or run a single worker with GUNICORN_WORKERS=1)"
+        )
+
+    if server.num_workers > 1 and Config.QUOTA_BACKEND == 'local':
+        logger.warning(
+            f"QUOTA_BACKEND is 'local': each of the {server.num_workers} workers budgets every "
+            "YouTube API key's full daily quota on its own"
+        )
+
+    started = time.perf_counter()
+    sentiment_analysis.warm_up()
+    data_visualization.warm_up()
+    logger.info(f"Warmed up in {time.perf_counter() - started:.2f}s")
+
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers don't touch (and so copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared with the master or other workers.
+    from backend.cache import reset_redis
+    from backend.database import dispose_engine
+    from backend.youtube_async import reset_async_client
+
+    reset_redis()
+    dispose_engine(close=False)
+    reset_async_client()
+
+
+def child_exit(server, worker):
+    # With PROMETHEUS_MULTIPROC_DIR set, forget the exited worker's live samples.
+    from backend.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
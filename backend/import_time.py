@@ -0,0 +1,78 @@
+# backend/import_time.py
+"""
+Measures how long importing backend modules takes.
+
+    python -m backend.import_time                      # backend.app
+    python -m backend.import_time backend.api --top 30
+    python -m backend.import_time --json
+
+Each module is imported in a fresh interpreter with -X importtime, so the
+numbers are cold-start costs and include everything the module pulls in.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+DEFAULT_MODULES = ['backend.app']
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter and parses -X importtime output.
+
+    Returns:
+        dict: module, total_ms, and per-module self_ms/cumulative_ms entries
+        sorted by cumulative time.
+    """
+    env = dict(os.environ)
+    env.setdefault('YOUTUBE_API_KEY', 'import-time')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+    top_level = [entry for entry in imports if entry['depth'] == 0]
+    return {
+        'module': module,
+        'total_ms': sum(entry['cumulative_ms'] for entry in top_level),
+        'imports': sorted(imports, key=lambda entry: entry['cumulative_ms'], reverse=True)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list per module")
+    parser.add_argument('--json', action='store_true', help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    reports = [measure(module) for module in args.modules]
+    for report in reports:
+        report['imports'] = report['imports'][:args.top]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for report in reports:
+        print(f"{report['module']}: {report['total_ms']:.0f} ms")
+        for entry in report['imports']:
+            print(f"  {entry['cumulative_ms']:9.1f} ms cumulative {entry['self_ms']:8.1f} ms self  {entry['module']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+# backend/jobs.py
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from backend.config import Config
+from backend.exceptions import YouTubeAPIError, InternalServerError, ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+# Errors worth another attempt; everything else (video not found, quota
+# exceeded, bad request, bugs) fails the job straight away.
+RETRYABLE_ERRORS = (InternalServerError, ServiceUnavailableError)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when its cancellation was requested."""
+    pass
+
+
+class LocalJobStore:
+    """
+    Keeps jobs and the pending queue in process memory.
+
+    Jobs are only visible to the process that created them, so use
+    RedisJobStore when the app runs with more than one worker process.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._cancelled = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def load(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def push(self, job_id):
+        self._queue.put(job_id)
+
+    def pop(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            self._cancelled.add(job_id)
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            return job_id in self._cancelled
+
+
+class RedisJobStore:
+    """
+    Keeps jobs in Redis and queues them on a Redis list.
+
+    Any process can create, inspect or cancel a job, and every process that
+    runs a JobQueue takes work from the same list. The cancellation flag is a
+    separate key so a worker's progress updates never overwrite it.
+    """
+
+    def __init__(self, client=None, ttl=None, queue_key='jobs:queue'):
+        if client is None:
+            from backend.cache import get_redis
+            client = get_redis()
+        self.client = client
+        self.ttl = ttl or Config.JOBS_TTL
+        self.queue_key = queue_key
+
+    def save(self, job):
+        self.client.setex(f"job:{job['id']}", self.ttl, json.dumps(job))
+
+    def load(self, job_id):
+        raw = self.client.get(f"job:{job_id}")
+        return json.loads(raw) if raw is not None else None
+
+    def push(self, job_id):
+        self.client.lpush(self.queue_key, job_id)
+
+    def pop(self, timeout):
+        item = self.client.brpop(self.queue_key, timeout=max(int(timeout), 1))
+        if item is None:
+            return None
+        job_id = item[1]
+        return job_id.decode('utf-8') if isinstance(job_id, bytes) else job_id
+
+    def request_cancel(self, job_id):
+        self.client.setex(f"job:{job_id}:cancel", self.ttl, 1)
+
+    def cancel_requested(self, job_id):
+        return bool(self.client.get(f"job:{job_id}:cancel"))
+
+
+class JobQueue:
+    """
+    Runs analysis jobs on a pool of background worker threads.
+
+    submit() stores a queued job and returns it immediately. A worker then
+    calls handler(job, report), where report(**progress) records progress
+    such as pages fetched and comments scored, and raises JobCancelled once
+    cancel() has been called for the job. Jobs failing with a transient
+    YouTube API error are re-queued up to max_retries times with
+    exponential backoff.
+
+    Workers are started on the first submit(), so importing the app does
+    not spawn threads.
+    """
+
+    def __init__(self, handler, store=None, workers=None, max_retries=None, retry_delay=None, poll_interval=1.0):
+        self.handler = handler
+        self.store = store or LocalJobStore()
+        self.workers = workers or Config.JOBS_WORKERS
+        self.max_retries = Config.JOBS_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = Config.JOBS_RETRY_DELAY if retry_delay is None else retry_delay
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # Serializes status changes, so a cancel is never overwritten by a
+        # worker finishing the same job.
+        self._status_lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, wait=True):
+        """Stops the workers after their current job."""
+        self._stopping.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def submit(self, video_id):
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'video_id': video_id,
+            'status': QUEUED,
+            'attempts': 0,
+            'progress': {'pages': 0, 'comments': 0},
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        self.store.save(job)
+        self.store.push(job['id'])
+        self.start()
+        return job
+
+    def get(self, job_id):
+        return self.store.load(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. A queued job is cancelled at once; a running one
+        stops at its next progress report.
+
+        Returns:
+            dict: The job, or None if it does not exist.
+        """
+        with self._status_lock:
+            job = self.store.load(job_id)
+            if job is None or job['status'] in FINISHED:
+                return job
+            self.store.request_cancel(job_id)
+            if job['status'] == QUEUED:
+                self._finish(job, CANCELLED)
+            return job
+
+    def _save(self, job, **changes):
+        job.update(changes, updated_at=time.time())
+        self.store.save(job)
+
+    def _finish(self, job, status, **changes):
+        self._save(job, status=status, **changes)
+
+    def _set_status_unless_cancelled(self, job, status, **changes):
+        # Called with _status_lock held: a cancel requested while the
+        # handler was finishing wins over its outcome.
+        if self.store.cancel_requested(job['id']):
+            self._finish(job, CANCELLED)
+            return False
+        self._finish(job, status, **changes)
+        return True
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job_id = self.store.pop(self.poll_interval)
+            if job_id is not None:
+                self._run(job_id)
+
+    def _run(self, job_id):
+        with self._status_lock:
+            job = self.store.load(job_id)
+            if job is None or job['status'] in FINISHED:
+                return
+            if self.store.cancel_requested(job_id):
+                self._finish(job, CANCELLED)
+                return
+            self._save(job, status=RUNNING, attempts=job['attempts'] + 1)
+
+        def report(**progress):
+            self._save(job, progress=dict(job['progress'], **progress))
+            if self.store.cancel_requested(job_id):
+                raise JobCancelled(job_id)
+
+        try:
+            result = self.handler(job, report)
+        except JobCancelled:
+            logger.info(f"Job {job_id} cancelled")
+            with self._status_lock:
+                self._finish(job, CANCELLED)
+        except Exception as e:
+            error = _job_error(e)
+            with self._status_lock:
+                if isinstance(e, RETRYABLE_ERRORS) and job['attempts'] <= self.max_retries:
+                    if self._set_status_unless_cancelled(job, QUEUED, error=error):
+                        delay = self.retry_delay * (2 ** (job['attempts'] - 1))
+                        logger.warning(f"Job {job_id} failed ({e}); retrying in {delay:.1f}s")
+                        self._requeue(job_id, delay)
+                    return
+                logger.error(f"Job {job_id} failed: {e}")
+                self._set_status_unless_cancelled(job, FAILED, error=error)
+        else:
+            with self._status_lock:
+                self._set_status_unless_cancelled(job, SUCCEEDED, result=result, error=None)
+
+    def _requeue(self, job_id, delay):
+        if delay <= 0:
+            self.store.push(job_id)
+            return
+        timer = threading.Timer(delay, self.store.push, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+
+
+def _job_error(error):
+    """The error recorded on a job, for retries and final failures alike."""
+    return {
+        'message': str(error),
+        'status_code': error.status_code if isinstance(error, YouTubeAPIError) else 500
+    }
+
+
+def create_job_queue(handler):
+    """Returns a JobQueue backed by Redis if JOBS_BACKEND is 'redis', else by process memory."""
+    store = RedisJobStore() if Config.JOBS_BACKEND == 'redis' else LocalJobStore()
+    return JobQueue(handler, store=store)
@@ -1,12 +1,279 @@
-from locust import HttpUser, task, between
+# backend/locustfile.py
+"""
+Load-test scenarios for the backend, meant to run against the local fake API.
 
-class YouTubeSentimentUser(HttpUser):
-    wait_time = between(1, 5)
+    python -m backend.fake_youtube_api --port 8085 --comments 1000 --latency-ms 60 --latency-jitter-ms 60
+    export POSTGRES_URL=postgresql://localhost/load_test JOBS_BACKEND=redis PROFILING_BACKEND=redis QUOTA_BACKEND=redis
+    YOUTUBE_API_BASE_URL=http://localhost:8085/youtube/v3 YOUTUBE_API_KEY=load-test \\
+        gunicorn -c backend/gunicorn.conf.py --workers 4 -b :5000 backend.app:app
+    gunicorn -c backend/gunicorn.conf.py --workers 2 -b :5001 backend.api:app
+    python -m locust -f backend/locustfile.py --host http://localhost:5000 --headless -u 200 -r 20 -t 5m \\
+        --report-file load-report.json
+
+Scenarios (one user class each, weighted to a rough production mix):
+
+    cached     a small pool of popular videos, almost always cache hits
+    cold       a never-seen video per request, in small/medium/large comment tiers
+    trending   every user hammering the same large video at once (single flight)
+    batch      /batch with a mix of popular and never-seen videos
+    stream     /comments?stream=ndjson, timing the first page and the whole stream
+    realtime   /api/realtime_analyze/<id> on backend.api, reading stored aggregates
+    jobs       POST /jobs, then polling until the job finishes
+
+The realtime scenario talks to the backend.api app at REALTIME_API_HOST
+(http://localhost:5001 by default). Each realtime user first stores its
+videos through /comments?incremental=true on the main app, which is why
+both apps share POSTGRES_URL.
+
+Comment counts come from the fake's size-<n>- video IDs, so tiers need no
+fixture data. At the end of a run, every request name gets p50/p95/p99
+latency and throughput, plus the same percentiles for each stage of the
+app's Server-Timing header (fetch, score, analysis, ...). Comparing
+throughput and p95 across runs with different --workers shows how many
+workers a node needs before latency turns up.
+
+Stage timings are collected where the users run, so in a distributed run
+each worker reports its own breakdown.
+"""
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+
+from locust import HttpUser, between, constant, events, task
+
+from backend.timing import parse_server_timing
+
+WATCH_URL = 'https://www.youtube.com/watch?v={}'
+
+# Top-level comment threads per tier, and how often each tier is requested.
+TIERS = {'small': 200, 'medium': 2000, 'large': 20000}
+TIER_WEIGHTS = {'small': 6, 'medium': 3, 'large': 1}
+
+CACHED_VIDEOS = [f'size-{TIERS["medium"]}-popular-{i}' for i in range(20)]
+TRENDING_VIDEO = f'size-{TIERS["large"]}-trending'
+
+REALTIME_API_HOST = os.getenv('REALTIME_API_HOST', 'http://localhost:5001').rstrip('/')
+REALTIME_VIDEOS = [f'size-{TIERS["small"]}-stored-{i}' for i in range(10)]
+
+JOB_POLL_INTERVAL = 0.5
+JOB_TIMEOUT = 120
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# (request name, stage) -> durations in ms, from Server-Timing headers.
+stage_timings = defaultdict(list)
+
+
+def cold_video(tier=None):
+    """A video ID nobody has requested before, in the given (or a random) tier."""
+    tier = tier or random.choices(list(TIER_WEIGHTS), weights=list(TIER_WEIGHTS.values()))[0]
+    return tier, f'size-{TIERS[tier]}-cold-{uuid.uuid4().hex[:12]}'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    parser.add_argument('--report-file', default='', help="Write the per-scenario JSON report here")
+
+
+@events.request.add_listener
+def record_stages(name, response=None, exception=None, **kwargs):
+    if exception is not None or response is None:
+        return
+    for stage, duration in parse_server_timing(response.headers.get('Server-Timing')).items():
+        stage_timings[(name, stage)].append(duration)
+
+
+def fire(environment, name, started, length=0, exception=None):
+    """Reports a custom measurement (not a single HTTP request) to Locust's stats."""
+    environment.events.request.fire(
+        request_type='FLOW',
+        name=name,
+        response_time=(time.perf_counter() - started) * 1000,
+        response_length=length,
+        exception=exception,
+        context={}
+    )
+
+
+def build_report(environment):
+    """
+    Summarizes a run per request name.
+
+    Returns:
+        dict: 'users' and 'scenarios', each scenario with request and failure
+        counts, throughput, p50/p95/p99 latency in ms and the same
+        percentiles for every Server-Timing stage seen.
+    """
+    scenarios = {}
+    for entry in environment.stats.entries.values():
+        stages = {
+            stage: {f'p{int(p * 100)}': percentile(durations, p) for p in PERCENTILES}
+            for (name, stage), durations in stage_timings.items() if name == entry.name
+        }
+        scenarios[f'{entry.method} {entry.name}'] = {
+            'requests': entry.num_requests,
+            'failures': entry.num_failures,
+            'rps': entry.total_rps,
+            **{f'p{int(p * 100)}': entry.get_response_time_percentile(p) for p in PERCENTILES},
+            'stages': stages
+        }
+    total = environment.stats.total
+    return {
+        'users': environment.runner.user_count if environment.runner else None,
+        'total': {
+            'requests': total.num_requests,
+            'failures': total.num_failures,
+            'rps': total.total_rps,
+            **{f'p{int(p * 100)}': total.get_response_time_percentile(p) for p in PERCENTILES}
+        },
+        'scenarios': scenarios
+    }
+
+
+def print_report(report):
+    print(f"\n{'scenario':<45} {'reqs':>7} {'fail':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = sorted(report['scenarios'].items()) + [('TOTAL', report['total'])]
+    for name, row in rows:
+        print(f"{name:<45} {row['requests']:>7} {row['failures']:>6} {row['rps']:>8.1f} "
+              f"{row['p50'] or 0:>8.0f} {row['p95'] or 0:>8.0f} {row['p99'] or 0:>8.0f}")
+        for stage, durations in row.get('stages', {}).items():
+            print(f"    {stage:<41} {'':>7} {'':>6} {'':>8} "
+                  f"{durations['p50']:>8.1f} {durations['p95']:>8.1f} {durations['p99']:>8.1f}")
+
+
+@events.test_stop.add_listener
+def report_scenarios(environment, **kwargs):
+    report = build_report(environment)
+    print_report(report)
+    report_file = getattr(environment.parsed_options, 'report_file', '') if environment.parsed_options else ''
+    if report_file:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+class CachedVideoUser(HttpUser):
+    """Reads the analysis of popular videos, which should be served from cache."""
+    weight = 6
+    wait_time = between(0.5, 2)
+
+    @task
+    def popular_video(self):
+        video_id = random.choice(CACHED_VIDEOS)
+        self.client.get('/comments', params={'url': WATCH_URL.format(video_id)}, name='/comments [cached]')
+
+
+class ColdVideoUser(HttpUser):
+    """Asks for videos nobody has seen, so every request fetches and scores."""
+    weight = 2
+    wait_time = between(1, 4)
+
+    @task
+    def new_video(self):
+        tier, video_id = cold_video()
+        self.client.get('/comments', params={'url': WATCH_URL.format(video_id)}, name=f'/comments [cold {tier}]')
+
+
+class TrendingVideoUser(HttpUser):
+    """Many users on one large video at the same moment."""
+    weight = 3
+    wait_time = constant(1)
+
+    @task
+    def trending_video(self):
+        self.client.get('/comments', params={'url': WATCH_URL.format(TRENDING_VIDEO)}, name='/comments [trending]')
+
+
+class BatchUser(HttpUser):
+    """Posts batches mixing popular and never-seen videos."""
+    weight = 1
+    wait_time = between(5, 15)
+
+    @task
+    def batch(self):
+        size = random.randint(5, 25)
+        videos = random.sample(CACHED_VIDEOS, k=size // 2) + [cold_video('small')[1] for _ in range(size - size // 2)]
+        with self.client.post('/batch', json={'videos': [WATCH_URL.format(v) for v in videos]},
+                              name='/batch', catch_response=True) as response:
+            if response.status_code == 200 and response.json().get('failed'):
+                response.failure(f"{response.json()['failed']} of {size} videos failed")
+
+
+class StreamUser(HttpUser):
+    """Streams a video's analysis page by page, as the dashboard does."""
+    weight = 1
+    wait_time = between(2, 6)
 
     @task
-    def fetch_comments(self):
-        self.client.get("/comments?url=https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    def stream(self):
+        tier, video_id = cold_video()
+        started = time.perf_counter()
+        first_page = None
+        length = 0
+        with self.client.get('/comments', params={'url': WATCH_URL.format(video_id), 'stream': 'ndjson'},
+                             name=f'/comments?stream [{tier}]', stream=True, catch_response=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                length += len(line)
+                event = json.loads(line)
+                if first_page is None:
+                    first_page = time.perf_counter()
+                    fire(self.environment, f'stream first page [{tier}]', started)
+                if event.get('error'):
+                    response.failure(event['error'])
+                    return
+        fire(self.environment, f'stream complete [{tier}]', started, length)
+
+
+class RealtimeAnalyzeUser(HttpUser):
+    """Reads the stored sentiment aggregates of synced videos from backend.api."""
+    weight = 1
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        # --host points at the main app; the realtime endpoint lives on
+        # backend.api, so its requests use absolute URLs.
+        for video_id in REALTIME_VIDEOS:
+            self.client.get('/comments', params={'url': WATCH_URL.format(video_id), 'incremental': 'true'},
+                            name='/comments?incremental [seed]')
+
+    @task
+    def realtime_analyze(self):
+        video_id = random.choice(REALTIME_VIDEOS)
+        self.client.get(f'{REALTIME_API_HOST}/api/realtime_analyze/{video_id}', name='/api/realtime_analyze/[id]')
+
+
+class JobUser(HttpUser):
+    """Submits a background analysis and polls until it finishes."""
+    weight = 1
+    wait_time = between(5, 15)
 
     @task
-    def analyze_sentiment(self):
-        self.client.post("/analyze", json={"comments": ["I love this video!", "This is the worst video ever."]})
+    def job(self):
+        tier, video_id = cold_video()
+        started = time.perf_counter()
+        response = self.client.post('/jobs', json={'url': WATCH_URL.format(video_id)}, name='/jobs')
+        if response.status_code != 202:
+            return
+        job_id = response.json()['id']
+        while time.perf_counter() - started < JOB_TIMEOUT:
+            time.sleep(JOB_POLL_INTERVAL)
+            job = self.client.get(f'/jobs/{job_id}', name='/jobs/[id]').json()
+            if job['status'] == 'succeeded':
+                fire(self.environment, f'job complete [{tier}]', started)
+                return
+            if job['status'] in ('failed', 'cancelled'):
+                fire(self.environment, f'job complete [{tier}]', started, exception=RuntimeError(job['status']))
+                return
+        fire(self.environment, f'job complete [{tier}]', started, exception=TimeoutError(job_id))
@@ -0,0 +1,179 @@
+# backend/metrics.py
+"""
+Prometheus metrics for the backend's hot paths, served at /metrics (admin.py).
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so every
+worker writes its samples there and /metrics aggregates all of them;
+gunicorn.conf.py cleans up after workers that exit.
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY
+)
+
+# Latency buckets in seconds, from a cache hit to a very large video.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+YOUTUBE_REQUEST_SECONDS = Histogram(
+    'youtube_request_seconds',
+    "Duration of one YouTube Data API call (e.g. one comment page)",
+    ['resource', 'client'],
+    buckets=LATENCY_BUCKETS
+)
+YOUTUBE_PAGES_PER_VIDEO = Histogram(
+    'youtube_comment_pages_per_video',
+    "commentThreads pages fetched per video",
+    ['client'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+)
+YOUTUBE_ERRORS = Counter(
+    'youtube_errors',
+    "YouTube Data API calls that failed, by exception type",
+    ['resource', 'error']
+)
+YOUTUBE_QUOTA_UNITS = Counter(
+    'youtube_quota_units',
+    "YouTube Data API quota units spent, by key (key_label(): a short sha256 of the key) and method",
+    ['key', 'endpoint']
+)
+SCORING_SECONDS_PER_1K = Histogram(
+    'sentiment_scoring_seconds_per_1k_comments',
+    "Sentiment scoring time normalized to 1,000 comments",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+COMMENTS_SCORED = Counter('sentiment_comments_scored', "Comments scored")
+CACHE_LOOKUPS = Counter(
+    'cache_lookups',
+    "Cache lookups by key prefix and result (l1_hit, l2_hit, miss, stale)",
+    ['prefix', 'result']
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_seconds',
+    "Duration of one database statement, by statement type",
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+RENDER_SECONDS = Histogram(
+    'visualization_render_seconds',
+    "Chart and word cloud render time",
+    ['chart', 'output'],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'request_stage_seconds',
+    "Duration of request stages, as reported in Server-Timing",
+    ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'http_request_seconds',
+    "HTTP request duration by endpoint, method and status",
+    ['endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+
+# cache._record() counter names -> CACHE_LOOKUPS results.
+_CACHE_RESULTS = {'l1_hits': 'l1_hit', 'l2_hits': 'l2_hit', 'misses': 'miss', 'stale_hits': 'stale'}
+
+
+def key_label(api_key):
+    """Identifies an API key in labels and reports by a short hash, without exposing it."""
+    return f"key-{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]}" if api_key else 'none'
+
+
+@contextmanager
+def youtube_call(resource, client):
+    """Times one API call and counts it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        YOUTUBE_ERRORS.labels(resource, type(e).__name__).inc()
+        raise
+    finally:
+        YOUTUBE_REQUEST_SECONDS.labels(resource, client).observe(time.perf_counter() - started)
+
+
+def record_quota(api_key, endpoint, units=1):
+    YOUTUBE_QUOTA_UNITS.labels(key_label(api_key), endpoint).inc(units)
+
+
+def record_pages(pages, client):
+    if pages:
+        YOUTUBE_PAGES_PER_VIDEO.labels(client).observe(pages)
+
+
+def record_scoring(count, seconds):
+    if count:
+        COMMENTS_SCORED.inc(count)
+        SCORING_SECONDS_PER_1K.observe(seconds * 1000 / count)
+
+
+def record_cache(prefix, counts):
+    for name, value in counts.items():
+        result = _CACHE_RESULTS.get(name)
+        if result is not None:
+            CACHE_LOOKUPS.labels(prefix, result).inc(value)
+
+
+@contextmanager
+def render_timer(chart, output):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        RENDER_SECONDS.labels(chart, output).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Times every statement the engine executes in DB_QUERY_SECONDS."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    return engine
+
+
+def metrics_payload():
+    """
+    Renders every metric in the Prometheus text format.
+
+    Returns:
+        tuple: (body bytes, content type).
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drops an exited worker's live gauges in multiprocess mode."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,285 @@
+# backend/profiling.py
+"""
+On-demand sampling profiles of individual requests.
+
+A view wrapped with @profiled is profiled when the request carries an
+`X-Profile: 1` header or a `profile=1` query flag with a matching
+`X-Admin-Token` header (so only once ADMIN_TOKEN is set), or at random for
+PROFILING_SAMPLE_RATE of requests. While it runs, a background thread
+samples the stacks of the threads working on the request every
+PROFILING_INTERVAL seconds: the thread running the view plus any thread
+inside one of the request's timing stages (fetch, score, ...), so work
+handed to asyncio.to_thread() is included.
+
+The last PROFILING_HISTORY profiles are kept with the request's method,
+path, status, duration and Server-Timing stages, and served by the admin
+blueprint as JSON or as collapsed stacks ("frame;frame;frame count" lines),
+which flamegraph.pl, inferno and speedscope read directly. The response of
+a profiled request names its profile in an X-Profile-Id header.
+"""
+import functools
+import hmac
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from flask import after_this_request, request
+
+from backend.config import Config
+from backend.timing import active_threads, ensure_timing, stage_durations
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_FLAG = 'profile'
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[-1]
+    elif filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Formats a frame's stack root first, one function per frame, joined by ';'."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of a changing set of threads at a fixed interval.
+
+    Args:
+        threads (callable): Returns the idents of the threads to sample.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, threads, interval=None):
+        self.threads = threads
+        self.interval = interval or Config.PROFILING_INTERVAL
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling and returns the collapsed stacks with their sample counts."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self.threads():
+                frame = frames.get(ident)
+                if frame is not None and ident != own:
+                    self.stacks[collapse_stack(frame)] += 1
+            self.samples += 1
+
+
+def collapsed(profile):
+    """Renders a stored profile as collapsed stack lines, heaviest first."""
+    return '\n'.join(
+        f"{stack} {count}" for stack, count in sorted(profile['stacks'].items(), key=lambda item: -item[1])
+    ) + '\n'
+
+
+def summary(profile):
+    """A stored profile without its stacks."""
+    return {key: value for key, value in profile.items() if key != 'stacks'}
+
+
+class LocalProfileStore:
+    """Keeps the last `size` profiles in process memory."""
+
+    def __init__(self, size=None):
+        self._profiles = deque(maxlen=size or Config.PROFILING_HISTORY)
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.appendleft(profile)
+
+    def list(self):
+        with self._lock:
+            return list(self._profiles)
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((profile for profile in self._profiles if profile['id'] == profile_id), None)
+
+
+class RedisProfileStore:
+    """
+    Keeps the last `size` profiles on a Redis list, so the admin endpoint
+    sees profiles taken by every worker process.
+    """
+
+    def __init__(self, client=None, size=None, key='profiles'):
+        if client is None:
+            from backend.cache import get_redis
+            client = get_redis()
+        self.client = client
+        self.size = size or Config.PROFILING_HISTORY
+        self.key = key
+
+    def add(self, profile):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lpush(self.key, json.dumps(profile))
+        pipe.ltrim(self.key, 0, self.size - 1)
+        pipe.execute()
+
+    def list(self):
+        return [json.loads(raw) for raw in self.client.lrange(self.key, 0, self.size - 1)]
+
+    def get(self, profile_id):
+        return next((profile for profile in self.list() if profile['id'] == profile_id), None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Returns the process-wide profile store, Redis-backed if PROFILING_BACKEND is 'redis'."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RedisProfileStore() if Config.PROFILING_BACKEND == 'redis' else LocalProfileStore()
+        return _store
+
+
+def is_admin(request):
+    """True if the request carries ADMIN_TOKEN. Without a configured token nobody is."""
+    if not Config.ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ''), Config.ADMIN_TOKEN)
+
+
+def _flag(value):
+    return (value or '').lower() in ['true', '1', 't']
+
+
+def profile_trigger(request):
+    """
+    Decides whether to profile a request.
+
+    Returns:
+        str: 'requested' (header or query flag from an admin), 'sampled'
+        (PROFILING_SAMPLE_RATE), or None.
+    """
+    if _flag(request.headers.get(PROFILE_HEADER)) or _flag(request.args.get(PROFILE_QUERY_FLAG)):
+        if is_admin(request):
+            return 'requested'
+    if Config.PROFILING_SAMPLE_RATE and random.random() < Config.PROFILING_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+
+def _status(result):
+    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+        return result[1]
+    return getattr(result, 'status_code', 200)
+
+
+class _RequestProfile:
+    def __init__(self, trigger):
+        self.trigger = trigger
+        self.status = 500
+        self.record = {
+            'id': uuid.uuid4().hex,
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'args': {key: value for key, value in request.args.items() if key != PROFILE_QUERY_FLAG},
+            'trigger': trigger
+        }
+
+    def __enter__(self):
+        timings = ensure_timing()
+        view_thread = threading.get_ident()
+        self.profiler = SamplingProfiler(lambda: active_threads(timings) | {view_thread})
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stacks = self.profiler.stop()
+        self.record.update(
+            started_at=self.started_at.isoformat(),
+            duration_ms=(time.perf_counter() - self.started) * 1000,
+            status=self.status if exc_type is None else 500,
+            interval_ms=self.profiler.interval * 1000,
+            samples=self.profiler.samples,
+            stages=stage_durations(),
+            stacks=dict(stacks)
+        )
+        try:
+            get_profile_store().add(self.record)
+        except Exception as e:
+            logger.warning(f"Failed to store profile {self.record['id']}: {e}")
+            return False
+        self._name_profile_in_response()
+        return False
+
+    def _name_profile_in_response(self):
+        profile_id = self.record['id']
+
+        @after_this_request
+        def add_profile_id(response):
+            response.headers['X-Profile-Id'] = profile_id
+            return response
+
+
+def profiled(view):
+    """Profiles a Flask view (sync or async) when profile_trigger() says so."""
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            trigger = profile_trigger(request)
+            if trigger is None:
+                return await view(*args, **kwargs)
+            with _RequestProfile(trigger) as profile:
+                result = await view(*args, **kwargs)
+                profile.status = _status(result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        trigger = profile_trigger(request)
+        if trigger is None:
+            return view(*args, **kwargs)
+        with _RequestProfile(trigger) as profile:
+            result = view(*args, **kwargs)
+            profile.status = _status(result)
+        return result
+    return wrapper
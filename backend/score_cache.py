@@ -0,0 +1,174 @@
+# backend/score_cache.py
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Normalizes a comment for memoization.
+
+    Only whitespace is collapsed: VADER splits on whitespace, so this never
+    changes a score, while case and punctuation (which VADER weighs) are kept.
+    """
+    return _whitespace.sub(' ', text).strip()
+
+
+def text_key(text):
+    """Returns the 16-byte content address of a comment's normalized text."""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).digest()
+
+
+class RedisScoreTier:
+    """Shared score tier storing packed scores under sentiment:score:<hex digest>."""
+
+    prefix = 'sentiment:score:'
+
+    def __init__(self, client=None, ttl=Config.SENTIMENT_MEMO_TTL):
+        if client is None:
+            from backend.cache import get_redis
+            client = get_redis()
+        self.client = client
+        self.ttl = ttl
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key.hex() for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(self.prefix + key.hex(), self.ttl, value)
+        pipe.execute()
+
+
+class ScoreMemo:
+    """
+    Content-addressed memo of packed per-comment scores.
+
+    Values are opaque bytes (sentiment_analysis stores the float32 score row).
+    Lookups go to a bounded in-process LRU first and then, if configured, to a
+    shared tier such as RedisScoreTier; shared-tier hits are promoted into the LRU.
+    """
+
+    def __init__(self, max_entries=Config.SENTIMENT_MEMO_SIZE, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys):
+        """
+        Looks up packed scores.
+
+        Args:
+            keys (list): Content keys from text_key().
+
+        Returns:
+            dict: Packed scores for the keys that were found.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+            self.hits += len(found)
+
+        if missing and self.shared is not None:
+            try:
+                shared_found = self.shared.get_many(missing)
+            except Exception as e:
+                logger.warning(f"Shared score memo lookup failed: {e}")
+                shared_found = {}
+            if shared_found:
+                found.update(shared_found)
+                self._store(shared_found)
+            with self._lock:
+                self.shared_hits += len(shared_found)
+                self.misses += len(missing) - len(shared_found)
+        else:
+            with self._lock:
+                self.misses += len(missing)
+        return found
+
+    def set_many(self, items):
+        """
+        Stores packed scores in every tier.
+
+        Args:
+            items (dict): Packed scores keyed by content key.
+        """
+        self._store(items)
+        if self.shared is not None and items:
+            try:
+                self.shared.set_many(items)
+            except Exception as e:
+                logger.warning(f"Shared score memo store failed: {e}")
+
+    def _store(self, items):
+        with self._lock:
+            self._entries.update(items)
+            for key in items:
+                self._entries.move_to_end(key)
+            overflow = len(self._entries) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                self._entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def clear(self):
+        """Drops the in-process tier and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Reports memo effectiveness.
+
+        Returns:
+            dict: Hit/miss counters, current size and overall hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_ratio': (self.hits + self.shared_hits) / lookups if lookups else 0.0
+            }
+
+
+_default_memo = None
+_default_lock = threading.Lock()
+
+
+def get_score_memo():
+    """Returns the process-wide ScoreMemo, or None when memoization is disabled."""
+    global _default_memo
+    if Config.SENTIMENT_MEMO_SIZE <= 0:
+        return None
+    with _default_lock:
+        if _default_memo is None:
+            shared = RedisScoreTier() if Config.SENTIMENT_MEMO_REDIS else None
+            _default_memo = ScoreMemo(Config.SENTIMENT_MEMO_SIZE, shared=shared)
+        return _default_memo
@@ -1,37 +1,492 @@
 # backend/sentiment_analysis.py
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+
+import numpy as np
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
-analyzer = SentimentIntensityAnalyzer()
+from backend.comment_batch import CommentBatch, epoch_seconds
+from backend.config import Config
+from backend.metrics import record_scoring
+from backend.score_cache import get_score_memo, text_key
+
+logger = logging.getLogger(__name__)
+
+# Building the analyzer parses the VADER lexicon, so it is done on first use
+# (or up front by warm_up()) rather than at import.
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+# Column layout of the score arrays returned by score_comments().
+NEG, NEU, POS, COMPOUND = range(4)
+SCORE_FIELDS = ('neg', 'neu', 'pos', 'compound')
+
+# Class labels produced by classify_scores().
+NEGATIVE, NEUTRAL, POSITIVE = -1, 0, 1
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# Equal-width compound-score histogram over [-1, 1] used by summarize_scores().
+HISTOGRAM_BINS = 20
+HISTOGRAM_EDGES = np.linspace(-1.0, 1.0, HISTOGRAM_BINS + 1)
+
+_score_fields = itemgetter(*SCORE_FIELDS)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_analyzer():
+    """Returns the process-wide VADER analyzer, building it on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def warm_up():
+    """
+    Builds the VADER analyzer now instead of inside the first request.
+
+    Call it in a pre-forking server's master (see gunicorn.conf.py) so every
+    worker inherits the parsed lexicon copy-on-write.
+    """
+    get_analyzer().polarity_scores("")
+
+
+def _score_in_process(comments):
+    polarity_scores = get_analyzer().polarity_scores
+    flat = np.fromiter(
+        (value for comment in comments for value in _score_fields(polarity_scores(comment))),
+        dtype=np.float32,
+        count=len(comments) * len(SCORE_FIELDS),
+    )
+    return flat.reshape(-1, len(SCORE_FIELDS))
+
+
+def _count_in_process(comments):
+    scores = _score_in_process(comments)
+    return count_sentiments(classify_scores(scores[:, COMPOUND]))
+
+
+def _init_worker():
+    # Each worker builds the VADER lexicon once; make sure it happens at
+    # startup rather than inside the first chunk.
+    warm_up()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.SENTIMENT_WORKERS,
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """Shuts down the persistent scoring pool, if one was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_pool)
+
+
+def _use_pool(size, parallel):
+    if parallel is None:
+        parallel = Config.SENTIMENT_PARALLEL
+    return parallel and Config.SENTIMENT_WORKERS > 1 and size >= Config.SENTIMENT_PARALLEL_MIN_COMMENTS
+
+
+def _chunks(comments):
+    size = Config.SENTIMENT_CHUNK_SIZE
+    return [comments[start:start + size] for start in range(0, len(comments), size)]
+
+
+def _map_chunks(func, comments):
+    """Runs func over chunks of comments in the pool, falling back to in-process on a broken pool."""
+    try:
+        return list(_get_pool().map(func, _chunks(comments)))
+    except BrokenProcessPool:
+        logger.warning("Sentiment process pool is broken; scoring in-process")
+        shutdown_pool()
+        return [func(comments)]
+
+
+def merge_counts(partials):
+    """
+    Merges sentiment counts produced for separate chunks of comments.
+
+    Args:
+        partials (iterable): Dicts of positive/negative/neutral counts.
+
+    Returns:
+        dict: Summed counts.
+    """
+    merged = {'positive': 0, 'negative': 0, 'neutral': 0}
+    for partial in partials:
+        for label, count in partial.items():
+            merged[label] += count
+    return merged
+
+
+def _score_uncached(comments, parallel):
+    if not _use_pool(len(comments), parallel):
+        return _score_in_process(comments)
+    return np.concatenate(_map_chunks(_score_in_process, comments))
+
+
+def _score_memoized(comments, parallel, memo):
+    # Score each distinct text once, and only if no tier of the memo has it.
+    positions = {}
+    unique_texts = []
+    index = np.empty(len(comments), dtype=np.int64)
+    for i, comment in enumerate(comments):
+        key = text_key(comment)
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(unique_texts)
+            unique_texts.append(comment)
+        index[i] = position
+
+    keys = list(positions)
+    found = memo.get_many(keys)
+    unique_scores = np.empty((len(keys), len(SCORE_FIELDS)), dtype=np.float32)
+    missing = []
+    for position, key in enumerate(keys):
+        packed = found.get(key)
+        if packed is None:
+            missing.append(position)
+        else:
+            unique_scores[position] = np.frombuffer(packed, dtype=np.float32)
+
+    if missing:
+        fresh = _score_uncached([unique_texts[position] for position in missing], parallel)
+        unique_scores[missing] = fresh
+        memo.set_many({keys[position]: row.tobytes() for position, row in zip(missing, fresh)})
+    return unique_scores[index]
+
+
+def score_comments(comments, parallel=None, memo=None):
+    """
+    Scores a batch of comments with vaderSentiment.
+
+    Args:
+        comments (list): List of comment texts, or a CommentBatch.
+        parallel (bool): Score chunks in the process pool. Defaults to
+            Config.SENTIMENT_PARALLEL; small batches are always scored in-process.
+        memo (ScoreMemo): Score memo to consult before scoring. Defaults to the
+            process-wide memo; pass False to always rescore.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (len(comments), 4) holding the
+        neg/neu/pos/compound scores of each comment (see NEG, NEU, POS, COMPOUND).
+    """
+    comments = list(comments)
+    if memo is None:
+        memo = get_score_memo()
+    started = time.perf_counter()
+    if not memo:
+        scores = _score_uncached(comments, parallel)
+    else:
+        scores = _score_memoized(comments, parallel, memo)
+    record_scoring(len(comments), time.perf_counter() - started)
+    return scores
+
+
+def score_batch(batch, parallel=None, memo=None):
+    """Scores a CommentBatch (see score_comments()) and returns a copy with the scores attached."""
+    return batch.with_scores(score_comments(batch, parallel=parallel, memo=memo))
+
+
+def _batch_timestamps(comments, timestamps):
+    if timestamps is not None:
+        return timestamps
+    if isinstance(comments, CommentBatch):
+        return comments.published_at
+    raise ValueError("Timestamps are required unless comments is a CommentBatch")
+
+
+def classify_scores(compound):
+    """
+    Classifies compound scores as positive, negative or neutral.
+
+    Args:
+        compound (numpy.ndarray): Compound scores.
+
+    Returns:
+        numpy.ndarray: int8 array of POSITIVE, NEGATIVE or NEUTRAL labels.
+    """
+    compound = np.asarray(compound)
+    labels = np.zeros(compound.shape, dtype=np.int8)
+    labels[compound >= POSITIVE_THRESHOLD] = POSITIVE
+    labels[compound <= NEGATIVE_THRESHOLD] = NEGATIVE
+    return labels
+
+
+def count_sentiments(labels):
+    """
+    Counts class labels produced by classify_scores().
+
+    Args:
+        labels (numpy.ndarray): int8 array of class labels.
+
+    Returns:
+        dict: Counts for positive, negative, and neutral comments.
+    """
+    negative, neutral, positive = np.bincount(
+        np.asarray(labels, dtype=np.int64) + 1, minlength=3
+    ).tolist()
+    return {
+        'positive': positive,
+        'negative': negative,
+        'neutral': neutral
+    }
+
+
+def summarize_scores(compound):
+    """
+    Reduces compound scores to mergeable summary statistics.
+
+    Summaries of disjoint sets of comments can be added field by field, which
+    is how stored per-video aggregates are maintained incrementally.
+
+    Args:
+        compound (numpy.ndarray): Compound scores.
+
+    Returns:
+        dict: comment_count, positive/negative/neutral counts, a
+        HISTOGRAM_BINS-bin histogram, and the sum and sum of squares of the scores.
+    """
+    compound = np.asarray(compound, dtype=np.float64)
+    summary = count_sentiments(classify_scores(compound))
+    summary['comment_count'] = int(compound.size)
+    summary['histogram'] = np.histogram(np.clip(compound, -1.0, 1.0), bins=HISTOGRAM_EDGES)[0].tolist()
+    summary['score_sum'] = float(compound.sum())
+    summary['score_sq_sum'] = float(np.dot(compound, compound))
+    return summary
+
 
-def analyze_sentiment(comments):
+def analyze_sentiment(comments, parallel=None, memo=None):
     """
     Analyzes sentiment of a list of comments using vaderSentiment.
 
     Args:
-        comments (list): List of comment texts.
+        comments (list): List of comment texts, or a CommentBatch.
+        parallel (bool): Score chunks in the process pool. Defaults to
+            Config.SENTIMENT_PARALLEL.
+        memo (ScoreMemo): Score memo to consult, as for score_comments().
 
     Returns:
         dict: Sentiment analysis results, including counts for positive, negative, and neutral comments.
     """
-    positive_count = 0
-    negative_count = 0
-    neutral_count = 0
+    comments = list(comments)
+    if memo is None:
+        memo = get_score_memo()
+    if memo:
+        scores = _score_memoized(comments, parallel, memo)
+        return count_sentiments(classify_scores(scores[:, COMPOUND]))
+    if not _use_pool(len(comments), parallel):
+        return _count_in_process(comments)
+    # Without a memo the workers only need to send back their partial counts.
+    return merge_counts(_map_chunks(_count_in_process, comments))
 
-    for comment in comments:
-        vs = analyzer.polarity_scores(comment)
-        if vs['compound'] >= 0.05:
-            positive_count += 1
-        elif vs['compound'] <= -0.05:
-            negative_count += 1
-        else:
-            neutral_count += 1
 
+class SentimentAccumulator:
+    """
+    Keeps running sentiment counts over comments that arrive page by page.
+
+    Args:
+        parallel (bool): Passed to score_comments() for every page.
+        memo (ScoreMemo): Passed to score_comments() for every page.
+    """
+
+    def __init__(self, parallel=None, memo=None):
+        self.parallel = parallel
+        self.memo = memo
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.comment_count = 0
+        self.pages = 0
+
+    def update(self, comments):
+        """
+        Scores one page of comments and adds it to the running counts.
+
+        Args:
+            comments (list): Comment texts of the page, or a CommentBatch.
+
+        Returns:
+            dict: Sentiment counts of this page alone.
+        """
+        scores = score_comments(comments, parallel=self.parallel, memo=self.memo)
+        page_counts = count_sentiments(classify_scores(scores[:, COMPOUND]))
+        self.counts = merge_counts([self.counts, page_counts])
+        self.comment_count += len(scores)
+        self.pages += 1
+        return page_counts
+
+    def result(self):
+        """Returns the counts so far in the shape analyze_sentiment() uses."""
+        return dict(self.counts)
+
+
+# Bucket widths in seconds for sentiment trends.
+TREND_RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Columns of the per-bucket statistics built by _bucket_stats().
+_TREND_COUNT, _TREND_SUM, _TREND_NEG, _TREND_NEU, _TREND_POS = range(5)
+
+
+def _resolution_seconds(resolution):
+    try:
+        return TREND_RESOLUTIONS[resolution]
+    except KeyError:
+        raise ValueError(f"Unknown resolution {resolution!r}; expected one of {', '.join(TREND_RESOLUTIONS)}")
+
+
+def to_epoch_seconds(timestamps):
+    """
+    Converts comment timestamps to a float64 array of Unix seconds.
+
+    Args:
+        timestamps: Unix seconds, datetimes (naive ones are taken as UTC) or
+            publishedAt strings. Missing values become NaN.
+
+    Returns:
+        numpy.ndarray: float64 timestamps.
+    """
+    if isinstance(timestamps, np.ndarray) and timestamps.dtype.kind in 'iuf':
+        return timestamps.astype(np.float64, copy=False)
+    return np.fromiter((epoch_seconds(value) for value in timestamps), dtype=np.float64)
+
+
+def _bucket_stats(compound, timestamps, width):
+    # Group-by over the bucket index: one np.unique plus a bincount per column.
+    compound = np.asarray(compound, dtype=np.float64)
+    seconds = to_epoch_seconds(timestamps)
+    if compound.shape != seconds.shape:
+        raise ValueError("Every comment needs exactly one timestamp")
+    known = ~np.isnan(seconds)
+    compound, seconds = compound[known], seconds[known]
+    buckets, inverse = np.unique(np.floor_divide(seconds, width).astype(np.int64), return_inverse=True)
+    labels = classify_scores(compound)
+    stats = np.zeros((buckets.size, 5), dtype=np.float64)
+    stats[:, _TREND_COUNT] = np.bincount(inverse, minlength=buckets.size)
+    stats[:, _TREND_SUM] = np.bincount(inverse, weights=compound, minlength=buckets.size)
+    for column, label in ((_TREND_NEG, NEGATIVE), (_TREND_NEU, NEUTRAL), (_TREND_POS, POSITIVE)):
+        stats[:, column] = np.bincount(inverse[labels == label], minlength=buckets.size)
+    return buckets, stats
+
+
+def _trend_row(bucket, stats, width):
+    count = int(stats[_TREND_COUNT])
+    start = datetime.fromtimestamp(int(bucket) * width, tz=timezone.utc)
     return {
-        'positive': positive_count,
-        'negative': negative_count,
-        'neutral': neutral_count
+        'timestamp': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'average_sentiment': float(stats[_TREND_SUM]) / count if count else 0.0,
+        'num_comments': count,
+        'positive': int(stats[_TREND_POS]),
+        'negative': int(stats[_TREND_NEG]),
+        'neutral': int(stats[_TREND_NEU])
     }
 
+
+def generate_sentiment_trends(comments, timestamps=None, resolution='hour', parallel=None, memo=None):
+    """
+    Buckets comments by publication time and averages their sentiment.
+
+    Args:
+        comments (list): Comment texts, or a CommentBatch.
+        timestamps (list): One timestamp per comment (see to_epoch_seconds()),
+            by default a CommentBatch's published_at. Comments without one
+            are skipped.
+        resolution (str): Bucket width, one of TREND_RESOLUTIONS.
+        parallel (bool): Passed to score_comments().
+        memo (ScoreMemo): Passed to score_comments().
+
+    Returns:
+        list: One dict per non-empty bucket in time order, with the bucket's
+        start as an ISO 8601 UTC timestamp, average_sentiment, num_comments
+        and positive/negative/neutral counts.
+    """
+    if not isinstance(comments, CommentBatch):
+        comments = list(comments)
+    if not len(comments):
+        return []
+    timestamps = _batch_timestamps(comments, timestamps)
+    width = _resolution_seconds(resolution)
+    compound = score_comments(comments, parallel=parallel, memo=memo)[:, COMPOUND]
+    buckets, stats = _bucket_stats(compound, timestamps, width)
+    return [_trend_row(bucket, row, width) for bucket, row in zip(buckets, stats)]
+
+
+class SentimentTrends:
+    """
+    Keeps per-bucket sentiment trends up to date as comments arrive.
+
+    Each update only adds to the buckets its comments fall in, so new
+    comments never cause the whole history to be recomputed.
+
+    Args:
+        resolution (str): Bucket width, one of TREND_RESOLUTIONS.
+        parallel (bool): Passed to score_comments() for every update.
+        memo (ScoreMemo): Passed to score_comments() for every update.
+    """
+
+    def __init__(self, resolution='hour', parallel=None, memo=None):
+        self.resolution = resolution
+        self.width = _resolution_seconds(resolution)
+        self.parallel = parallel
+        self.memo = memo
+        self._buckets = {}
+
+    def update(self, comments, timestamps=None):
+        """
+        Scores new comments and adds them to their buckets.
+
+        Args:
+            comments (list): Comment texts, or a CommentBatch.
+            timestamps (list): As for generate_sentiment_trends().
+
+        Returns:
+            list: Trend rows of the buckets that changed.
+        """
+        if not isinstance(comments, CommentBatch):
+            comments = list(comments)
+        if not len(comments):
+            return []
+        timestamps = _batch_timestamps(comments, timestamps)
+        compound = score_comments(comments, parallel=self.parallel, memo=self.memo)[:, COMPOUND]
+        return self.update_scores(compound, timestamps)
+
+    def update_scores(self, compound, timestamps):
+        """Adds already scored comments to their buckets; returns the changed rows."""
+        buckets, stats = _bucket_stats(compound, timestamps, self.width)
+        changed = []
+        for bucket, row in zip(buckets.tolist(), stats):
+            current = self._buckets.get(bucket)
+            self._buckets[bucket] = row if current is None else current + row
+            changed.append(_trend_row(bucket, self._buckets[bucket], self.width))
+        return changed
+
+    def trends(self):
+        """Returns every bucket's trend row in time order."""
+        return [_trend_row(bucket, self._buckets[bucket], self.width) for bucket in sorted(self._buckets)]
+
 if __name__ == '__main__':
     # Example usage
     comments = [
@@ -0,0 +1,166 @@
+# backend/singleflight.py
+import logging
+import threading
+import time
+import uuid
+
+from backend import exceptions
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key within one process.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for it and get the same result or
+    exception instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            return call.outcome()
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+# Deletes the lock only if it still holds our token.
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _encode_error(error):
+    return {'__error__': {
+        'type': type(error).__name__,
+        'message': str(error),
+        'status_code': getattr(error, 'status_code', 500)
+    }}
+
+
+def _decode_error(payload):
+    error_type = getattr(exceptions, payload['type'], None)
+    if isinstance(error_type, type) and issubclass(error_type, exceptions.YouTubeAPIError):
+        error = error_type.__new__(error_type)
+        exceptions.YouTubeAPIError.__init__(error, payload['message'], payload['status_code'])
+        return error
+    return exceptions.YouTubeAPIError(payload['message'], payload['status_code'])
+
+
+class RedisSingleFlight:
+    """
+    Collapses concurrent calls for the same key across workers and hosts.
+
+    Threads in one process are first collapsed with SingleFlight. The
+    process-level leader then races for a Redis lock (SET NX PX). The holder
+    runs the function and publishes the result under a short-lived result
+    key. Everyone else polls for that key. A YouTubeAPIError is published
+    for only error_ttl seconds, long enough to reach the followers already
+    polling, so callers arriving later retry instead of getting a stale
+    failure. If the lock disappears without a result (the holder crashed),
+    or the wait times out, the follower runs the function itself rather
+    than failing.
+
+    Results must be serializable by backend.cache.
+    """
+
+    def __init__(self, client=None, lock_ttl=None, wait_timeout=None, result_ttl=None, error_ttl=None,
+                 poll_interval=0.05):
+        if client is None:
+            from backend.cache import get_redis
+            client = get_redis()
+        self.client = client
+        self.lock_ttl = lock_ttl or Config.SINGLEFLIGHT_LOCK_TTL
+        self.wait_timeout = wait_timeout or Config.SINGLEFLIGHT_WAIT_TIMEOUT
+        self.result_ttl = result_ttl or Config.SINGLEFLIGHT_RESULT_TTL
+        self.error_ttl = error_ttl or Config.SINGLEFLIGHT_ERROR_TTL
+        self.poll_interval = poll_interval
+        self._local = SingleFlight()
+
+    def do(self, key, fn, *args, **kwargs):
+        return self._local.do(key, self._do_shared, key, fn, args, kwargs)
+
+    def _published(self, result_key):
+        from backend.cache import decode_value
+
+        raw = self.client.get(result_key)
+        if raw is None:
+            return False, None
+        value = decode_value(raw)
+        if isinstance(value, dict) and '__error__' in value:
+            raise _decode_error(value['__error__'])
+        return True, value
+
+    def _do_shared(self, key, fn, args, kwargs):
+        from backend.cache import encode_value
+
+        lock_key = f"singleflight:{key}:lock"
+        result_key = f"singleflight:{key}:result"
+        deadline = time.monotonic() + self.wait_timeout
+        token = uuid.uuid4().hex
+
+        while True:
+            found, value = self._published(result_key)
+            if found:
+                return value
+            if self.client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for single-flight leader of {key}; running it here")
+                return fn(*args, **kwargs)
+            time.sleep(self.poll_interval)
+
+        try:
+            result = fn(*args, **kwargs)
+        except exceptions.YouTubeAPIError as e:
+            self.client.set(result_key, encode_value(_encode_error(e))[0], px=int(self.error_ttl * 1000))
+            raise
+        else:
+            self.client.setex(result_key, self.result_ttl, encode_value(result)[0])
+            return result
+        finally:
+            self.client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+
+
+def create_single_flight():
+    """Returns a RedisSingleFlight if SINGLEFLIGHT_REDIS is set, else an in-process SingleFlight."""
+    if Config.SINGLEFLIGHT_REDIS:
+        return RedisSingleFlight()
+    return SingleFlight()
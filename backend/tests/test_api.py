@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.config import Config
+
+# Run against a throwaway SQLite database unless one is configured. The
+# engine is created on first use, so this works whatever was imported first.
+if not os.environ.get('POSTGRES_URL'):
+    Config.POSTGRES_URL = f"sqlite:///{tempfile.gettempdir()}/test_api.db"
+
+from backend.api import app
+from backend.database import get_db, Comment, Video, VideoSentimentAggregate, bulk_upsert_comments
+from backend.profiling import LocalProfileStore
+
+
+class TestRealTimeAnalyze(unittest.TestCase):
+    video_id = 'realtime_test_video'
+
+    def setUp(self):
+        self._clear()
+        self.addCleanup(self._clear)
+        self.client = app.test_client()
+
+    def _clear(self):
+        with get_db() as db:
+            db.query(Comment).filter(Comment.video_id == self.video_id).delete()
+            db.query(VideoSentimentAggregate).filter(VideoSentimentAggregate.video_id == self.video_id).delete()
+            db.query(Video).filter(Video.id == self.video_id).delete()
+            db.commit()
+
+    def _store(self, records):
+        with get_db() as db:
+            db.add(Video(id=self.video_id))
+            bulk_upsert_comments(db, self.video_id, records)
+            db.commit()
+
+    def test_reads_the_stored_aggregate(self):
+        self._store([
+            {'id': 'a', 'text': 'good', 'sentiment_score': 0.5},
+            {'id': 'b', 'text': 'bad', 'sentiment_score': -0.5}
+        ])
+        response = self.client.get(f'/api/realtime_analyze/{self.video_id}')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['comment_count'], 2)
+        self.assertEqual(data['sentiment'], {'positive': 1, 'negative': 1, 'neutral': 0})
+
+    def test_builds_a_missing_aggregate_once(self):
+        self._store([{'id': 'a', 'text': 'I love this!'}])
+        response = self.client.get(f'/api/realtime_analyze/{self.video_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['sentiment']['positive'], 1)
+        with get_db() as db:
+            self.assertIsNotNone(db.get(VideoSentimentAggregate, self.video_id))
+
+    def test_unknown_video(self):
+        response = self.client.get(f'/api/realtime_analyze/{self.video_id}')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json(), {"error": "Video not found"})
+
+    @patch('backend.profiling.Config.ADMIN_TOKEN', 'secret')
+    @patch('backend.profiling.Config.PROFILING_INTERVAL', 0.002)
+    def test_profiled_on_request(self):
+        store = LocalProfileStore(size=1)
+        self._store([{'id': 'a', 'text': 'good', 'sentiment_score': 0.5}])
+        with patch('backend.profiling.get_profile_store', return_value=store):
+            response = self.client.get(
+                f'/api/realtime_analyze/{self.video_id}',
+                headers={'X-Profile': '1', 'X-Admin-Token': 'secret'}
+            )
+        self.assertEqual(response.status_code, 200)
+        profile = store.get(response.headers['X-Profile-Id'])
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['endpoint'], 'realtimeanalyze')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import patch
+
+from backend.benchmark import compare, run_benchmarks, synthetic_comments
+from backend.config import Config
+
+
+def _report(**medians):
+    return {'results': {name: {'median_s': median} for name, median in medians.items()}}
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_synthetic_comments_are_deterministic(self):
+        self.assertEqual(synthetic_comments(50), synthetic_comments(50))
+        self.assertEqual(len(set(synthetic_comments(50))), 50)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        rows = compare(_report(a=1.0, b=1.0, gone=1.0), _report(a=1.05, b=1.5, new=1.0), threshold=0.1)
+        self.assertEqual([(name, regressed) for name, _, _, _, regressed in rows], [('a', False), ('b', True)])
+
+    def test_quick_cache_run_reports_throughput(self):
+        report = run_benchmarks(['cache'], quick=True, repeat=1)
+        result = report['results']['cache.encode[1000]']
+        self.assertEqual(result['items'], 1000)
+        self.assertGreater(result['items_per_s'], 0)
+        self.assertLess(result['stored_bytes'], result['serialized_bytes'])
+
+    @patch('backend.config.Config.POSTGRES_URL', 'postgresql://nowhere.invalid/production')
+    def test_ingest_ignores_the_configured_database(self):
+        report = run_benchmarks(['ingest'], quick=True, repeat=1)
+        self.assertEqual(report['results']['db.ingest[1000]']['items'], 1000)
+        self.assertEqual(Config.POSTGRES_URL, 'postgresql://nowhere.invalid/production')
+
+
+if __name__ == '__main__':
+    unittest.main()
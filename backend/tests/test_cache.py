@@ -0,0 +1,212 @@
+import json
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+from backend import cache
+from backend.comment_batch import CommentBatch
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client calls cache.py makes."""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    def setex(self, key, timeout, value):
+        self.store[key] = value
+        self.ttls[key] = timeout
+
+    def expire(self, key, timeout):
+        self.ttls[key] = timeout
+        return key in self.store
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+class TestTwoTierCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(cache, '_redis_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.local_cache.clear()
+        self.addCleanup(cache.local_cache.clear)
+        cache._stats.clear()
+
+    def test_round_trip_compresses_large_values(self):
+        comments = [f"comment number {i}" for i in range(1000)]
+        cache.cache_results('video:abc:comments', comments, timeout=600)
+        raw = self.redis.store['video:abc:comments']
+        self.assertTrue(raw.startswith(b'\x00'))
+        self.assertLess(len(raw), len(json.dumps(comments)))
+
+        cache.local_cache.clear()
+        self.assertEqual(cache.get_cached_results('video:abc:comments'), comments)
+        self.assertEqual(cache.get_cached_results('video:abc:comments'), comments)
+
+        stats = cache.cache_stats()['video:*:comments']
+        self.assertEqual((stats['l2_hits'], stats['l1_hits']), (1, 1))
+        self.assertGreater(stats['bytes_saved'], 0)
+
+    def test_reads_legacy_json_values(self):
+        self.redis.store['video:old:metadata'] = json.dumps({'id': 'old'}).encode()
+        self.assertEqual(cache.get_cached_results('video:old:metadata'), {'id': 'old'})
+
+    def test_multi_get_uses_one_round_trip(self):
+        cache.cache_many({'video:a:metadata': {'id': 'a'}, 'video:b:metadata': {'id': 'b'}}, timeout=60)
+        cache.local_cache.clear()
+        self.redis.round_trips = 0
+        found = cache.get_many_cached(['video:a:metadata', 'video:b:metadata', 'video:c:metadata'])
+        self.assertEqual(found, {'video:a:metadata': {'id': 'a'}, 'video:b:metadata': {'id': 'b'}})
+        self.assertEqual(self.redis.round_trips, 1)
+        self.assertEqual(cache.cache_stats()['video:*:metadata']['misses'], 1)
+
+    def test_l1_is_charged_at_decoded_size(self):
+        comments = [f"comment number {i}" for i in range(10000)]
+        cache.cache_results('video:abc:comments', comments, timeout=600)
+        raw = self.redis.store['video:abc:comments']
+        self.assertGreater(cache.local_cache.size, 5 * len(raw))
+
+        cache.local_cache.clear()
+        cache.get_cached_results('video:abc:comments')
+        estimate = cache.local_cache.size
+        actual = sys.getsizeof(comments) + sum(map(sys.getsizeof, comments))
+        self.assertAlmostEqual(estimate / actual, 1.0, delta=0.05)
+
+    @patch('backend.cache.Config.CACHE_L1_TTL', 5)
+    @patch('backend.cache.time.monotonic', return_value=100.0)
+    def test_l1_entries_expire_on_the_l1_ttl(self, mock_monotonic):
+        cache.cache_results('video:a:metadata', {'id': 'a'}, timeout=3600)
+        self.redis.store.clear()
+        mock_monotonic.return_value = 106.0
+        self.assertIsNone(cache.get_cached_results('video:a:metadata'))
+
+    def test_delete_clears_both_tiers(self):
+        cache.cache_results('video:a:metadata', {'id': 'a'})
+        cache.delete_cached(['video:a:metadata'])
+        self.assertIsNone(cache.get_cached_results('video:a:metadata'))
+
+
+class TestVersionedNamespaces(TestTwoTierCache):
+    def test_invalidation_switches_to_new_keys(self):
+        self.assertEqual(cache.video_cache_key('abc', 'comments'), 'video:abc:comments')
+        cache.cache_video_comments('abc', ['old'])
+        self.assertEqual(cache.invalidate_namespace('video:abc'), 1)
+        self.assertEqual(cache.video_cache_key('abc', 'comments'), 'video:abc:v1:comments')
+        self.assertIsNone(cache.get_cached_results(cache.video_cache_key('abc', 'comments')))
+        self.assertEqual(cache.key_prefix('video:abc:v1:comments'), 'video:*:comments')
+
+    def test_version_keys_outlive_the_values_they_version(self):
+        cache.invalidate_namespace('video:abc')
+        cache.cache_results(cache.video_cache_key('abc', 'analysis'), {'n': 1},
+                            timeout=cache.Config.ANALYSIS_FRESH_TTL + cache.Config.ANALYSIS_STALE_TTL)
+        cache.cache_video_metadata('abc', {'id': 'abc'})
+        ttl = self.redis.ttls['ns:video:abc:version']
+        self.assertGreaterEqual(ttl, max(self.redis.ttls[key] for key in self.redis.store if key.startswith('video:')))
+
+
+class TestCommentBatchCache(TestTwoTierCache):
+    def test_batches_do_not_share_the_comments_key(self):
+        batch = CommentBatch.from_texts(['a', 'b'])
+        cache.cache_comment_batch('abc', batch)
+        self.assertNotIn('video:abc:comments', self.redis.store)
+        cache.local_cache.clear()
+        self.assertEqual(cache.get_cached_comment_batch('abc'), batch)
+
+    def test_reads_comment_lists_cached_by_older_workers(self):
+        cache.cache_video_comments('abc', ['old', 'list'])
+        self.assertEqual(cache.get_cached_comment_batch('abc').texts(), ['old', 'list'])
+        self.assertIsNone(cache.get_cached_comment_batch('xyz'))
+
+
+class TestStaleWhileRevalidate(TestTwoTierCache):
+    def test_cold_miss_loads_inline(self):
+        value = cache.get_or_refresh('video:a:analysis', lambda: {'n': 1}, ttl=60, stale_ttl=60)
+        self.assertEqual(value, {'n': 1})
+        self.assertEqual(cache.get_or_refresh('video:a:analysis', lambda: {'n': 2}, ttl=60, stale_ttl=60), {'n': 1})
+
+    @patch('backend.cache.time.time')
+    def test_stale_value_is_served_while_refreshing(self, mock_time):
+        mock_time.return_value = 1000.0
+        cache.get_or_refresh('video:a:analysis', lambda: 'v1', ttl=60, stale_ttl=600)
+
+        refreshed = threading.Event()
+
+        def loader():
+            refreshed.set()
+            return 'v2'
+
+        mock_time.return_value = 1100.0
+        self.assertEqual(cache.get_or_refresh('video:a:analysis', loader, ttl=60, stale_ttl=600), 'v1')
+        self.assertTrue(refreshed.wait(5))
+        cache._refresh_executor.submit(lambda: None).result()
+        self.assertEqual(cache.get_or_refresh('video:a:analysis', loader, ttl=60, stale_ttl=600), 'v2')
+        self.assertEqual(cache.cache_stats()['video:*:analysis']['refreshes'], 1)
+
+
+class TestLocalCache(unittest.TestCase):
+    def test_size_based_eviction(self):
+        local = cache.LocalCache(max_bytes=100, max_entries=10, ttl=60)
+        local.set('a', 'A', 60, 60)
+        local.set('b', 'B', 30, 60)
+        local.get('a')
+        local.set('c', 'C', 30, 60)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual((local.get('a'), local.get('c')), ('A', 'C'))
+        self.assertEqual(local.size, 90)
+
+    @patch('backend.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        local = cache.LocalCache(max_bytes=100, max_entries=10, ttl=5)
+        mock_monotonic.return_value = 100.0
+        local.set('a', 'A', 1, 600)
+        mock_monotonic.return_value = 104.0
+        self.assertEqual(local.get('a'), 'A')
+        mock_monotonic.return_value = 106.0
+        self.assertIsNone(local.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
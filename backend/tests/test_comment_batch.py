@@ -0,0 +1,102 @@
+import sys
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backend.benchmark import synthetic_records
+from backend.cache import decode_value, encode_value
+from backend.comment_batch import CommentBatch, as_comment_batch
+from backend.data_visualization import count_tokens
+from backend.sentiment_analysis import COMPOUND, generate_sentiment_trends, score_batch, score_comments
+from backend.youtube_api import parse_comment_threads
+
+
+def _comment(comment_id, text, published_at, likes=0):
+    return {'id': comment_id, 'snippet': {'textDisplay': text, 'publishedAt': published_at, 'likeCount': likes}}
+
+
+RESPONSE = {'items': [
+    {
+        'snippet': {'topLevelComment': _comment('c1', 'I love this video', '2024-02-17T10:00:00Z', likes=4)},
+        'replies': {'comments': [_comment('c1r', 'Me too, it is great', '2024-02-17T10:30:00Z')]}
+    },
+    {'snippet': {'topLevelComment': _comment('c2', 'This is the worst, naïve', '2024-02-17T11:15:00Z')}}
+]}
+
+
+class TestCommentBatch(unittest.TestCase):
+    def test_built_from_a_response_like_parse_comment_threads(self):
+        batch = CommentBatch.from_comment_threads(RESPONSE)
+        self.assertEqual(batch, CommentBatch.from_records(parse_comment_threads(RESPONSE)))
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch), ['I love this video', 'Me too, it is great', 'This is the worst, naïve'])
+        self.assertEqual(batch.is_top_level.tolist(), [True, False, True])
+        self.assertEqual(batch.like_count.tolist(), [4, 0, 0])
+
+        records = list(batch.records())
+        self.assertEqual(records[1], {
+            'id': 'c1r',
+            'text': 'Me too, it is great',
+            'published_at': datetime(2024, 2, 17, 10, 30),
+            'like_count': 0,
+            'parent_id': 'c1'
+        })
+
+    def test_take_and_concat(self):
+        batch = CommentBatch.from_comment_threads(RESPONSE)
+        top_level = batch.take(batch.is_top_level)
+        self.assertEqual(top_level.ids.tolist(), ['c1', 'c2'])
+
+        joined = CommentBatch.concat([top_level, CommentBatch.from_texts(['bare'])])
+        self.assertEqual(joined.texts(), ['I love this video', 'This is the worst, naïve', 'bare'])
+        self.assertTrue(np.isnan(joined.published_at[2]))
+        self.assertIsNone(list(joined.records())[2]['published_at'])
+        self.assertEqual(len(CommentBatch.concat([])), 0)
+
+    def test_bytes_and_cache_round_trip(self):
+        batch = score_batch(CommentBatch.from_records(synthetic_records(500)), memo=False)
+        self.assertEqual(CommentBatch.from_bytes(batch.to_bytes()), batch)
+
+        raw, _ = encode_value(batch)
+        decoded = decode_value(raw)
+        self.assertIsInstance(decoded, CommentBatch)
+        self.assertEqual(decoded, batch)
+
+    def test_smaller_than_records(self):
+        records = synthetic_records(1000)
+        batch = CommentBatch.from_records(records)
+        # A record's dict alone, before its strings, costs more than a whole
+        # comment in the batch.
+        self.assertLess(batch.nbytes / len(batch), sys.getsizeof(records[0]))
+
+    def test_scoring_trends_and_tokens_accept_batches(self):
+        batch = CommentBatch.from_comment_threads(RESPONSE)
+        texts = batch.texts()
+        np.testing.assert_array_equal(score_comments(batch, memo=False), score_comments(texts, memo=False))
+
+        scored = score_batch(batch, memo=False)
+        self.assertIsNone(batch.scores)
+        self.assertIs(scored.text, batch.text)
+        self.assertGreater(scored.compound[0], 0)
+        np.testing.assert_array_equal(scored.compound, score_comments(texts, memo=False)[:, COMPOUND])
+
+        self.assertEqual(
+            generate_sentiment_trends(batch, memo=False),
+            generate_sentiment_trends(texts, [c['published_at'] for c in parse_comment_threads(RESPONSE)], memo=False)
+        )
+        self.assertEqual(count_tokens(batch), count_tokens(texts))
+
+    def test_as_comment_batch(self):
+        batch = CommentBatch.from_texts(['a'])
+        self.assertIs(as_comment_batch(batch), batch)
+        self.assertEqual(as_comment_batch(['a']), batch)
+        self.assertEqual(as_comment_batch(parse_comment_threads(RESPONSE)), CommentBatch.from_comment_threads(RESPONSE))
+
+    def test_stored_scores_round_trip_through_records(self):
+        batch = CommentBatch.from_columns(['a', 'b'], ['x', 'y'], compound=[0.5, None])
+        self.assertEqual([record['sentiment_score'] for record in batch.records()], [0.5, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault('YOUTUBE_API_KEY', 'test_key')
+
+from backend.app import app
+from backend.comment_batch import CommentBatch
+
+URL = '/comments?url=https://www.youtube.com/watch?v=abcdefghijk'
+PAGES = [CommentBatch.from_texts(['I love this!', 'Great video']), CommentBatch.from_texts(['I hate this.'])]
+
+
+@patch('backend.app.cache_comment_batch')
+@patch('backend.app.get_cached_comment_batch', return_value=None)
+@patch('backend.app.iter_comment_batches', side_effect=lambda video_id: iter(PAGES))
+class TestCommentStream(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_ndjson_stream(self, mock_pages, mock_cached, mock_cache):
+        response = self.client.get(URL + '&stream=ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.endswith('\n'))
+        events = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual([event['done'] for event in events], [False, False, True])
+        self.assertEqual([event.get('page') for event in events[:2]], [1, 2])
+        self.assertEqual(events[-1]['comment_count'], 3)
+        self.assertEqual(events[-1]['sentiment']['negative'], 1)
+
+        video_id, batch = mock_cache.call_args[0]
+        self.assertEqual(video_id, 'abcdefghijk')
+        self.assertEqual(batch.texts(), ['I love this!', 'Great video', 'I hate this.'])
+
+    def test_sse_stream(self, mock_pages, mock_cached, mock_cache):
+        response = self.client.get(URL + '&stream=sse')
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        messages = response.get_data(as_text=True).split('\n\n')
+        self.assertEqual(messages[-1], '')
+        names = [message.split('\n')[0] for message in messages[:-1]]
+        self.assertEqual(names, ['event: progress', 'event: progress', 'event: done'])
+
+        done = json.loads(messages[-2].split('\n')[1][len('data: '):])
+        self.assertEqual((done['done'], done['comment_count']), (True, 3))
+
+    def test_cached_comments_are_not_cached_again(self, mock_pages, mock_cached, mock_cache):
+        mock_cached.return_value = PAGES[0]
+        events = [json.loads(line) for line in self.client.get(URL + '&stream=ndjson').get_data(as_text=True).splitlines()]
+        self.assertEqual(events[-1]['comment_count'], 2)
+        mock_pages.assert_not_called()
+        mock_cache.assert_not_called()
+
+    def test_failed_fetch_is_not_cached(self, mock_pages, mock_cached, mock_cache):
+        def pages():
+            yield PAGES[0]
+            raise RuntimeError("connection reset")
+        mock_pages.side_effect = lambda video_id: pages()
+        events = [json.loads(line) for line in self.client.get(URL + '&stream=ndjson').get_data(as_text=True).splitlines()]
+        self.assertTrue(events[-1]['done'])
+        self.assertIn('error', events[-1])
+        mock_cache.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
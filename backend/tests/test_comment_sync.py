@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.config import Config
+
+# Run against a throwaway SQLite database unless one is configured. The
+# engine is created on first use, so this works whatever was imported first.
+if not os.environ.get('POSTGRES_URL'):
+    Config.POSTGRES_URL = f"sqlite:///{tempfile.gettempdir()}/test_comment_sync.db"
+
+from backend.comment_batch import CommentBatch
+from backend.comment_sync import sync_comments
+from backend.database import get_db, Analysis, Comment, Video, VideoSentimentAggregate
+
+
+def _comment(comment_id, text, published_at, parent_id=None):
+    return {
+        'id': comment_id,
+        'text': text,
+        'published_at': published_at,
+        'like_count': 0,
+        'parent_id': parent_id
+    }
+
+
+class TestCommentSync(unittest.TestCase):
+    video_id = 'sync_test_video'
+
+    def setUp(self):
+        self._clear()
+        self.addCleanup(self._clear)
+
+    def _clear(self):
+        with get_db() as db:
+            db.query(Comment).filter(Comment.video_id == self.video_id).delete()
+            db.query(Analysis).filter(Analysis.video_id == self.video_id).delete()
+            db.query(VideoSentimentAggregate).filter(VideoSentimentAggregate.video_id == self.video_id).delete()
+            db.query(Video).filter(Video.id == self.video_id).delete()
+            db.commit()
+
+    @patch('backend.comment_sync.iter_comment_batches')
+    def test_second_sync_only_scores_new_comments(self, mock_pages):
+        first_run = [
+            [_comment('c2', 'I love this!', '2024-02-17T10:02:00Z'),
+             _comment('c2r', 'Me too', '2024-02-17T10:03:00Z', parent_id='c2')],
+            [_comment('c1', 'This is awful.', '2024-02-17T10:01:00Z')]
+        ]
+        mock_pages.return_value = iter(CommentBatch.from_records(page) for page in first_run)
+        result = sync_comments(self.video_id, 'key')
+        self.assertEqual(result['comment_count'], 3)
+        self.assertEqual(result['pages'], 2)
+        mock_pages.assert_called_with(self.video_id, 'key', order='time')
+
+        second_run = [
+            [_comment('c3', 'Great video', '2024-02-17T11:00:00Z'),
+             _comment('c2', 'I love this!', '2024-02-17T10:02:00Z')],
+            [_comment('c1', 'This is awful.', '2024-02-17T10:01:00Z')]
+        ]
+        pages = iter([CommentBatch.from_records(page) for page in second_run])
+        mock_pages.return_value = pages
+        result = sync_comments(self.video_id, 'key')
+
+        self.assertEqual(result['new_comments'], ['Great video'])
+        self.assertEqual(result['pages'], 1)
+        self.assertEqual(next(pages).ids[0], 'c1')  # never requested
+        self.assertEqual(result['comment_count'], 4)
+        self.assertEqual(result['sentiment']['negative'], 1)
+        self.assertEqual(sum(result['sentiment'].values()), 4)
+
+        with get_db() as db:
+            stored = db.query(Comment).filter(Comment.video_id == self.video_id).count()
+        self.assertEqual(stored, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,13 @@ import unittest
 import os
 import json
 from datetime import datetime
+from unittest.mock import patch
+from wordcloud import WordCloud
+from backend import data_visualization
 from backend.data_visualization import (
+    count_tokens,
+    render_wordcloud,
+    wordcloud_cache_key,
     create_wordcloud,
     create_sentiment_distribution,
     create_engagement_visualization,
@@ -86,6 +92,29 @@ class TestDataVisualization(unittest.TestCase):
         self.assertTrue(os.path.exists(output_file))
         self.assertGreater(os.path.getsize(output_file), 0)
 
+    def test_json_output_is_a_figure_spec(self):
+        output_file = os.path.join(self.test_dir, 'engagement.json')
+        create_engagement_visualization(self.metadata, output_file, output='json')
+        with open(output_file) as f:
+            spec = json.load(f)
+        self.assertEqual([trace['type'] for trace in spec['data']], ['bar', 'pie'])
+        self.assertLess(os.path.getsize(output_file), 50000)
+
+    def test_html_output_references_shared_plotly_js(self):
+        shared_file = os.path.join(self.test_dir, 'shared.html')
+        standalone_file = os.path.join(self.test_dir, 'standalone.html')
+        create_sentiment_trends_visualization(self.trends, shared_file, output='html')
+        create_sentiment_trends_visualization(self.trends, standalone_file)
+        with open(shared_file) as f:
+            self.assertIn(f'src="{data_visualization.PLOTLY_JS_URL}"', f.read())
+        with open(standalone_file) as f:
+            self.assertNotIn(data_visualization.PLOTLY_JS_URL, f.read())
+        self.assertLess(os.path.getsize(shared_file) * 100, os.path.getsize(standalone_file))
+
+    def test_unknown_output_mode(self):
+        with self.assertRaises(ValueError):
+            create_engagement_visualization(self.metadata, os.path.join(self.test_dir, 'x'), output='png')
+
     def test_handle_empty_data(self):
         """Test visualization functions with empty data."""
         empty_file = os.path.join(self.test_dir, 'empty.html')
@@ -102,5 +131,40 @@ class TestDataVisualization(unittest.TestCase):
         with self.assertRaises(Exception):
             create_sentiment_trends_visualization([], empty_file)
 
+
+class TestWordcloudFrequencies(unittest.TestCase):
+    def setUp(self):
+        data_visualization.clear_render_cache()
+
+    def test_count_tokens_skips_stopwords_and_markup(self):
+        counts = count_tokens(['This was GREAT<br>great!', {'text': "It's a great &quot;video&quot; 10/10"}])
+        self.assertEqual(counts['great'], 3)
+        self.assertEqual(counts['video'], 1)
+        for word in ['this', 'was', 'br', 'quot', "it's", 'a', '10']:
+            self.assertNotIn(word, counts)
+
+    def test_count_tokens_accumulates_pages(self):
+        counts = count_tokens(['nice song'])
+        count_tokens(iter(['nice beat']), counter=counts)
+        self.assertEqual(counts, {'nice': 2, 'song': 1, 'beat': 1})
+
+    def test_cache_key_ignores_words_that_are_not_drawn(self):
+        frequencies = {'great': 5, 'song': 3, 'beat': 1}
+        key = wordcloud_cache_key(frequencies, max_words=2, width=800)
+        self.assertEqual(key, wordcloud_cache_key({'song': 3, 'great': 5, 'rare': 1}, max_words=2, width=800))
+        self.assertNotEqual(key, wordcloud_cache_key(frequencies, max_words=2, width=400))
+
+    def test_render_is_cached(self):
+        frequencies = {'great': 5, 'song': 3}
+        with patch('wordcloud.WordCloud', wraps=WordCloud) as wordcloud:
+            first = render_wordcloud(frequencies, width=200, height=100)
+            second = render_wordcloud(dict(frequencies), width=200, height=100)
+        self.assertEqual(first, second)
+        self.assertEqual(wordcloud.call_count, 1)
+
+    def test_render_without_words_raises(self):
+        with self.assertRaises(ValueError):
+            render_wordcloud({})
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backend.comment_batch import CommentBatch
+from backend.config import Config
+
+# Run against a throwaway SQLite database unless one is configured. The
+# engine is created on first use, so this works whatever was imported first.
+if not os.environ.get('POSTGRES_URL'):
+    Config.POSTGRES_URL = f"sqlite:///{tempfile.gettempdir()}/test_database.db"
+
+from backend.database import (
+    get_db,
+    Comment,
+    Video,
+    VideoSentimentAggregate,
+    bulk_upsert_comments,
+    get_sentiment_aggregate,
+    rebuild_sentiment_aggregate,
+    load_comment_texts,
+    load_comment_scores
+)
+
+
+class TestBulkIngest(unittest.TestCase):
+    video_id = 'bulk_test_video'
+
+    def setUp(self):
+        self._clear()
+        self.addCleanup(self._clear)
+        with get_db() as db:
+            db.add(Video(id=self.video_id))
+            db.commit()
+
+    def _clear(self):
+        with get_db() as db:
+            db.query(Comment).filter(Comment.video_id == self.video_id).delete()
+            db.query(VideoSentimentAggregate).filter(VideoSentimentAggregate.video_id == self.video_id).delete()
+            db.query(Video).filter(Video.id == self.video_id).delete()
+            db.commit()
+
+    def test_bulk_upsert_inserts_in_batches(self):
+        records = [
+            {'id': f'c{i}', 'text': f'comment {i}', 'published_at': '2024-02-17T10:00:00Z', 'like_count': i}
+            for i in range(25)
+        ]
+        with get_db() as db:
+            self.assertEqual(bulk_upsert_comments(db, self.video_id, records, batch_size=10), 25)
+            db.commit()
+            self.assertEqual(sorted(load_comment_texts(db, self.video_id)), sorted(r['text'] for r in records))
+            stored = db.get(Comment, 'c3')
+            self.assertEqual(stored.like_count, 3)
+            self.assertEqual(stored.published_at, datetime(2024, 2, 17, 10, 0))
+
+    def test_upsert_updates_and_keeps_existing_score(self):
+        with get_db() as db:
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': 'a', 'text': 'old', 'sentiment_score': 0.5},
+                {'id': 'b', 'text': 'unscored'}
+            ])
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': 'a', 'text': 'edited', 'like_count': 7},
+                {'id': 'a', 'text': 'edited twice', 'like_count': 8}
+            ])
+            db.commit()
+            stored = db.get(Comment, 'a')
+            self.assertEqual((stored.text, stored.sentiment_score, stored.like_count), ('edited twice', 0.5, 8))
+            scores = load_comment_scores(db, self.video_id)
+            self.assertEqual(scores.dtype, np.float32)
+            self.assertEqual(sorted(scores[~np.isnan(scores)].tolist()), [0.5])
+            self.assertEqual(int(np.isnan(scores).sum()), 1)
+
+
+    def test_aggregate_tracks_ingest_and_rescore(self):
+        with get_db() as db:
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': 'a', 'text': 'good', 'sentiment_score': 0.5},
+                {'id': 'b', 'text': 'bad', 'sentiment_score': -0.5},
+                {'id': 'c', 'text': 'meh', 'sentiment_score': 0.0}
+            ])
+            bulk_upsert_comments(db, self.video_id, [{'id': 'b', 'text': 'fine', 'sentiment_score': 0.25}])
+            db.commit()
+
+            summary = get_sentiment_aggregate(db, self.video_id).to_dict()
+            self.assertEqual(summary['sentiment'], {'positive': 2, 'negative': 0, 'neutral': 1})
+            self.assertEqual(summary['comment_count'], 3)
+            self.assertAlmostEqual(summary['average_sentiment'], 0.25)
+            self.assertEqual(sum(summary['histogram']), 3)
+
+            rebuilt = rebuild_sentiment_aggregate(db, self.video_id).to_dict()
+            self.assertEqual(rebuilt['sentiment'], summary['sentiment'])
+            self.assertAlmostEqual(rebuilt['sentiment_variance'], summary['sentiment_variance'])
+
+    def test_bulk_upsert_of_a_batch(self):
+        batch = CommentBatch.from_columns(
+            ['a', 'b', 'c', 'a'], ['good', 'unscored', 'bad', 'good again'],
+            published_at=['2024-02-17T10:00:00Z', None, None, '2024-02-17T11:00:00Z'],
+            like_counts=[1, 2, 3, 4], compound=[0.5, float('nan'), -0.5, 0.25]
+        )
+        with get_db() as db:
+            self.assertEqual(bulk_upsert_comments(db, self.video_id, batch, batch_size=2), 3)
+            db.commit()
+            stored = db.get(Comment, 'a')
+            self.assertEqual((stored.text, stored.like_count), ('good again', 4))
+            self.assertAlmostEqual(stored.sentiment_score, 0.25)
+            self.assertEqual(stored.published_at, datetime(2024, 2, 17, 11, 0))
+            self.assertIsNone(db.get(Comment, 'b').sentiment_score)
+            self.assertIsNone(db.get(Comment, 'b').published_at)
+            summary = get_sentiment_aggregate(db, self.video_id).to_dict()
+            self.assertEqual(summary['sentiment'], {'positive': 1, 'negative': 1, 'neutral': 0})
+
+    def test_rebuild_scores_unscored_comments(self):
+        with get_db() as db:
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': 'a', 'text': 'I love this!', 'like_count': 4},
+                {'id': 'b', 'text': 'I hate this.'}
+            ])
+            self.assertIsNone(get_sentiment_aggregate(db, self.video_id))
+            summary = rebuild_sentiment_aggregate(db, self.video_id).to_dict()
+            db.commit()
+            self.assertEqual(summary['sentiment'], {'positive': 1, 'negative': 1, 'neutral': 0})
+            self.assertEqual(db.get(Comment, 'a').like_count, 4)
+
+    def test_rebuilding_twice_does_not_double_count(self):
+        with get_db() as db:
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': 'a', 'text': 'good', 'sentiment_score': 0.5},
+                {'id': 'b', 'text': 'I hate this.'}
+            ])
+            db.commit()
+        for _ in range(2):
+            with get_db() as db:
+                summary = rebuild_sentiment_aggregate(db, self.video_id).to_dict()
+                db.commit()
+            self.assertEqual(summary['comment_count'], 2)
+            self.assertEqual(summary['sentiment'], {'positive': 1, 'negative': 1, 'neutral': 0})
+
+    def test_concurrent_rebuilds_do_not_double_count(self):
+        with get_db() as db:
+            bulk_upsert_comments(db, self.video_id, [
+                {'id': f'c{i}', 'text': 'good', 'sentiment_score': 0.5} for i in range(10)
+            ])
+            db.query(VideoSentimentAggregate).filter(VideoSentimentAggregate.video_id == self.video_id).delete()
+            db.commit()
+
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def rebuild():
+            try:
+                with get_db() as db:
+                    barrier.wait()
+                    rebuild_sentiment_aggregate(db, self.video_id)
+                    db.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=rebuild) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with get_db() as db:
+            self.assertEqual(get_sentiment_aggregate(db, self.video_id).to_dict()['comment_count'], 10)
+
+    def test_concurrent_ingests_of_the_same_comments_count_them_once(self):
+        records = [{'id': f'c{i}', 'text': 'good', 'sentiment_score': 0.5} for i in range(10)]
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def ingest():
+            try:
+                with get_db() as db:
+                    barrier.wait()
+                    bulk_upsert_comments(db, self.video_id, records)
+                    db.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=ingest) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with get_db() as db:
+            self.assertEqual(get_sentiment_aggregate(db, self.video_id).to_dict()['comment_count'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
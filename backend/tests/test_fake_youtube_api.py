@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.exceptions import QuotaExceededError, ServiceUnavailableError, VideoNotFoundError
+from backend.fake_youtube_api import STATS_KEY, create_app, start_server
+from backend.youtube_async import AsyncYouTubeClient
+from backend.youtube_client import clear_youtube_clients
+
+
+class TestFakeYouTubeAPI(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **options):
+        self.app = create_app(**options)
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+        client = AsyncYouTubeClient(
+            'test_key',
+            base_url=str(self.server.make_url('/youtube/v3')),
+            max_retries=1,
+            backoff_base=0.001
+        )
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_pages_threads_with_inline_replies(self):
+        client = await self.start(comments_per_video=250, replies_every=10, replies_per_thread=2)
+        pages = [page async for page in client.iter_comment_pages('video')]
+
+        self.assertEqual(len(pages), 3)
+        records = [record for page in pages for record in page]
+        self.assertEqual(sum(record['parent_id'] is None for record in records), 250)
+        self.assertEqual(sum(record['parent_id'] is not None for record in records), 50)
+        self.assertEqual(records[1]['parent_id'], records[0]['id'])
+
+    async def test_data_is_deterministic_and_sized_by_video_id(self):
+        client = await self.start(comments_per_video=10)
+        first = await client.fetch_comments('size-120-a')
+        second = await client.fetch_comments('size-120-a')
+        self.assertEqual(first, second)
+        self.assertGreaterEqual(len(first), 120)
+
+    async def test_error_videos(self):
+        client = await self.start()
+        with self.assertRaises(VideoNotFoundError):
+            await client.fetch_comments('missing-1')
+        with self.assertRaises(QuotaExceededError):
+            await client.fetch_comments('quota-1')
+
+    async def test_quota_runs_out(self):
+        client = await self.start(comments_per_video=500, quota_units=2)
+        with self.assertRaises(QuotaExceededError):
+            await client.fetch_comments('video')
+        self.assertEqual(self.app[STATS_KEY]['quota_used'], 2)
+
+    async def test_injected_server_errors_are_retried(self):
+        client = await self.start(error_rate=1.0)
+        with self.assertRaises(ServiceUnavailableError):
+            await client.fetch_comments('video')
+        self.assertEqual(self.app[STATS_KEY]['errors'], 2)
+
+    async def test_etag_and_not_modified(self):
+        await self.start()
+        async with TestClient(self.server) as http:
+            response = await http.get('/youtube/v3/videos', params={'id': 'a,b', 'key': 'k', 'part': 'snippet'})
+            payload = await response.json()
+            etag = response.headers['ETag']
+            self.assertEqual(payload['etag'], etag)
+            self.assertEqual([item['id'] for item in payload['items']], ['a', 'b'])
+
+            response = await http.get('/youtube/v3/videos', params={'id': 'a,b', 'key': 'k', 'part': 'snippet'},
+                                      headers={'If-None-Match': etag})
+            self.assertEqual(response.status, 304)
+
+
+class TestDiscoveryClientAgainstFake(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self.loop)
+            self.runner, self.base_url = self.loop.run_until_complete(
+                start_server(create_app(comments_per_video=150, replies_every=0))
+            )
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        started.wait(5)
+        clear_youtube_clients()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+        clear_youtube_clients()
+
+    def test_base_url_override_reaches_the_fake(self):
+        from backend.youtube_api import iter_comment_pages
+
+        with patch('backend.youtube_client.Config.YOUTUBE_API_BASE_URL', self.base_url):
+            pages = list(iter_comment_pages('video', 'test_key'))
+        self.assertEqual([len(page) for page in pages], [100, 50])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from googleapiclient.errors import HttpError
+
+from backend.exceptions import ServiceUnavailableError, VideoNotFoundError
+from backend.jobs import JobQueue, LocalJobStore, CANCELLED, FAILED, SUCCEEDED, FINISHED
+from backend.youtube_api import iter_comment_batches
+from backend.youtube_client import clear_youtube_clients
+
+
+def _http_error(status, reason):
+    body = {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason}]}}
+    return HttpError(Mock(status=status), json.dumps(body).encode('utf-8'))
+
+
+def _page(*texts):
+    return {'items': [
+        {'snippet': {'topLevelComment': {'id': f"c{i}", 'snippet': {'textDisplay': text}}}}
+        for i, text in enumerate(texts)
+    ]}
+
+
+def _wait_for(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job['status'] in FINISHED:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue(unittest.TestCase):
+    def make_queue(self, handler, **kwargs):
+        jobs = JobQueue(handler, store=LocalJobStore(), workers=2, retry_delay=0, poll_interval=0.05, **kwargs)
+        self.addCleanup(jobs.shutdown)
+        return jobs
+
+    def test_job_reports_progress_and_result(self):
+        def handler(job, report):
+            for page in range(1, 4):
+                report(pages=page, comments=page * 100)
+            return {'video_id': job['video_id']}
+
+        jobs = self.make_queue(handler)
+        job = jobs.submit('abc')
+        self.assertEqual(job['status'], 'queued')
+
+        job = _wait_for(jobs, job['id'])
+        self.assertEqual(job['status'], SUCCEEDED)
+        self.assertEqual(job['progress'], {'pages': 3, 'comments': 300})
+        self.assertEqual(job['result'], {'video_id': 'abc'})
+        self.assertEqual(job['attempts'], 1)
+
+    def test_transient_errors_are_retried(self):
+        calls = []
+
+        def handler(job, report):
+            calls.append(job['attempts'])
+            if len(calls) < 3:
+                raise ServiceUnavailableError()
+            return 'ok'
+
+        jobs = self.make_queue(handler, max_retries=2)
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], SUCCEEDED)
+        self.assertEqual(calls, [1, 2, 3])
+
+    def test_permanent_errors_fail_without_retry(self):
+        calls = []
+
+        def handler(job, report):
+            calls.append(1)
+            raise VideoNotFoundError()
+
+        jobs = self.make_queue(handler)
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['error']['status_code'], 404)
+        self.assertEqual(len(calls), 1)
+
+    def test_retries_share_the_final_error_shape(self):
+        def handler(job, report):
+            raise ServiceUnavailableError()
+
+        jobs = self.make_queue(handler, max_retries=1)
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['attempts'], 2)
+        self.assertEqual(job['error'], {'message': 'YouTube API service unavailable', 'status_code': 503})
+
+    def test_cancel_while_finishing_is_not_overwritten(self):
+        def handler(job, report):
+            report(pages=1, comments=10)
+            jobs.cancel(job['id'])
+            return 'finished'
+
+        jobs = self.make_queue(handler)
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], CANCELLED)
+        self.assertIsNone(job['result'])
+
+    def test_running_job_stops_at_next_report_after_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(job, report):
+            report(pages=1, comments=10)
+            started.set()
+            release.wait(5)
+            report(pages=2, comments=20)
+            return 'finished'
+
+        jobs = self.make_queue(handler)
+        job_id = jobs.submit('abc')['id']
+        self.assertTrue(started.wait(5))
+        jobs.cancel(job_id)
+        release.set()
+
+        job = _wait_for(jobs, job_id)
+        self.assertEqual(job['status'], CANCELLED)
+        self.assertIsNone(job['result'])
+
+    def test_unknown_job(self):
+        jobs = self.make_queue(lambda job, report: None)
+        self.assertIsNone(jobs.get('missing'))
+        self.assertIsNone(jobs.cancel('missing'))
+
+
+@patch('backend.youtube_client.build')
+class TestJobsOnTheDiscoveryClient(unittest.TestCase):
+    def setUp(self):
+        clear_youtube_clients()
+        self.addCleanup(clear_youtube_clients)
+
+    def make_queue(self):
+        def handler(job, report):
+            comments = 0
+            for page in iter_comment_batches(job['video_id'], 'test_key'):
+                comments += len(page)
+                report(comments=comments)
+            return comments
+
+        jobs = JobQueue(handler, store=LocalJobStore(), workers=1, max_retries=2, retry_delay=0, poll_interval=0.05)
+        self.addCleanup(jobs.shutdown)
+        return jobs
+
+    def test_http_503_is_retried(self, mock_build):
+        youtube = mock_build.return_value
+        youtube.commentThreads.return_value.list.return_value.execute.side_effect = [
+            _http_error(503, 'backendError'),
+            _page('first', 'second')
+        ]
+        youtube.commentThreads.return_value.list_next.return_value = None
+
+        jobs = self.make_queue()
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], SUCCEEDED)
+        self.assertEqual(job['attempts'], 2)
+        self.assertEqual(job['result'], 2)
+
+    def test_http_404_fails_with_its_status(self, mock_build):
+        youtube = mock_build.return_value
+        youtube.commentThreads.return_value.list.return_value.execute.side_effect = _http_error(404, 'videoNotFound')
+
+        jobs = self.make_queue()
+        job = _wait_for(jobs, jobs.submit('abc')['id'])
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['attempts'], 1)
+        self.assertEqual(job['error']['status_code'], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from backend import cache
+from backend.backend_app import app
+from backend.metrics import instrument_engine, key_label, record_quota, record_scoring
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics(unittest.TestCase):
+    def test_metrics_endpoint(self):
+        record_quota('abcdefgh1234', 'commentThreads.list', 3)
+        response = app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        label = key_label('abcdefgh1234')
+        self.assertNotIn('1234', label)
+        self.assertIn(f'youtube_quota_units_total{{endpoint="commentThreads.list",key="{label}"}}'.encode(), response.data)
+
+    def test_health_check(self):
+        self.assertEqual(app.test_client().get('/api/health').get_json(), {"status": "healthy"})
+
+    def test_cache_lookups_by_prefix(self):
+        before = _sample('cache_lookups_total', prefix='video:*:comments', result='miss')
+        cache._record('video:abc:v2:comments', misses=1, sets=1)
+        self.assertEqual(_sample('cache_lookups_total', prefix='video:*:comments', result='miss'), before + 1)
+
+    def test_scoring_is_normalized_per_thousand(self):
+        before = _sample('sentiment_scoring_seconds_per_1k_comments_sum')
+        record_scoring(500, 0.1)
+        self.assertAlmostEqual(_sample('sentiment_scoring_seconds_per_1k_comments_sum') - before, 0.2)
+        record_scoring(0, 0.1)
+        self.assertAlmostEqual(_sample('sentiment_scoring_seconds_per_1k_comments_sum') - before, 0.2)
+
+    def test_db_queries_are_timed_by_operation(self):
+        engine = instrument_engine(create_engine('sqlite://'))
+        before = _sample('db_query_seconds_count', operation='SELECT')
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            with self.assertRaises(Exception):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 2'))
+        self.assertEqual(_sample('db_query_seconds_count', operation='SELECT'), before + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
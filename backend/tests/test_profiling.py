@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask import Flask, jsonify
+
+from backend.admin import admin
+from backend.profiling import LocalProfileStore, SamplingProfiler, profiled
+from backend.timing import stage
+
+
+def busy_scoring(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def create_app():
+    app = Flask(__name__)
+    app.register_blueprint(admin)
+
+    @app.route('/sync')
+    @profiled
+    def sync_view():
+        busy_scoring(0.05)
+        return jsonify({"ok": True})
+
+    @app.route('/async')
+    @profiled
+    async def async_view():
+        def work():
+            with stage('score'):
+                busy_scoring(0.05)
+        await asyncio.to_thread(work)
+        return jsonify({"ok": True}), 201
+
+    return app
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_the_given_threads(self):
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (busy_scoring(0.1), done.set()))
+        thread.start()
+        profiler = SamplingProfiler(lambda: {thread.ident}, interval=0.002)
+        profiler.start()
+        done.wait(5)
+        stacks = profiler.stop()
+        thread.join()
+
+        self.assertGreater(profiler.samples, 0)
+        self.assertTrue(any('busy_scoring (backend/tests/test_profiling.py' in stack for stack in stacks))
+
+
+@patch('backend.profiling.Config.PROFILING_INTERVAL', 0.002)
+@patch('backend.profiling.Config.PROFILING_SAMPLE_RATE', 0)
+@patch('backend.profiling.Config.ADMIN_TOKEN', 'secret')
+class TestProfiledViews(unittest.TestCase):
+    def setUp(self):
+        self.store = LocalProfileStore(size=2)
+        patcher = patch('backend.profiling.get_profile_store', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        admin_patcher = patch('backend.admin.get_profile_store', return_value=self.store)
+        admin_patcher.start()
+        self.addCleanup(admin_patcher.stop)
+        self.client = create_app().test_client()
+        self.client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+
+    def test_unflagged_requests_are_not_profiled(self):
+        response = self.client.get('/sync')
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(self.store.list(), [])
+
+    def test_header_profiles_a_sync_view(self):
+        response = self.client.get('/sync', headers={'X-Profile': '1'})
+        profile = self.store.get(response.headers['X-Profile-Id'])
+        self.assertEqual(profile['trigger'], 'requested')
+        self.assertEqual(profile['path'], '/sync')
+        self.assertEqual(profile['status'], 200)
+        self.assertTrue(any('busy_scoring' in stack for stack in profile['stacks']))
+
+    def test_query_flag_profiles_worker_threads_of_an_async_view(self):
+        response = self.client.get('/async?profile=1&v=abc')
+        self.assertEqual(response.status_code, 201)
+        profile_id = response.headers['X-Profile-Id']
+
+        listing = self.client.get('/admin/profiles').get_json()['profiles']
+        self.assertEqual([p['id'] for p in listing], [profile_id])
+        self.assertNotIn('stacks', listing[0])
+        self.assertEqual(listing[0]['args'], {'v': 'abc'})
+        self.assertIn('score', listing[0]['stages'])
+
+        text = self.client.get(f'/admin/profiles/{profile_id}').get_data(as_text=True)
+        lines = [line for line in text.splitlines() if 'busy_scoring' in line]
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn(';work (backend/tests/test_profiling.py', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_only_the_last_profiles_are_kept(self):
+        ids = [self.client.get('/sync', headers={'X-Profile': '1'}).headers['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual([profile['id'] for profile in self.store.list()], ids[:0:-1])
+        self.assertEqual(self.client.get(f'/admin/profiles/{ids[0]}').status_code, 404)
+
+    def test_sample_rate(self):
+        with patch('backend.profiling.Config.PROFILING_SAMPLE_RATE', 1.0):
+            response = self.client.get('/sync')
+        self.assertEqual(self.store.get(response.headers['X-Profile-Id'])['trigger'], 'sampled')
+
+    def test_admin_token(self):
+        anonymous = create_app().test_client()
+        response = anonymous.get('/sync', headers={'X-Profile': '1'})
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(anonymous.get('/admin/profiles').status_code, 403)
+        self.assertEqual(anonymous.get('/admin/profiles', headers={'X-Admin-Token': 'wrong'}).status_code, 403)
+
+        response = anonymous.get('/sync', headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+        self.assertIn('X-Profile-Id', response.headers)
+        listing = anonymous.get('/admin/profiles', headers={'X-Admin-Token': 'secret'})
+        self.assertEqual(len(listing.get_json()['profiles']), 1)
+
+    def test_without_a_configured_token_nobody_is_admin(self):
+        with patch('backend.profiling.Config.ADMIN_TOKEN', None):
+            response = self.client.get('/sync?profile=1')
+            self.assertNotIn('X-Profile-Id', response.headers)
+            self.assertEqual(self.client.get('/admin/profiles').status_code, 403)
+            self.assertEqual(self.client.get('/admin/cache').status_code, 403)
+        self.assertEqual(self.store.list(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from backend.score_cache import ScoreMemo, normalize_text, text_key
+from backend.sentiment_analysis import score_comments
+
+
+class TestScoreMemo(unittest.TestCase):
+    def test_text_key_ignores_whitespace_only(self):
+        self.assertEqual(text_key("first  \n comment "), text_key("first comment"))
+        self.assertNotEqual(text_key("GREAT video"), text_key("great video"))
+        self.assertEqual(normalize_text("  a \t b  "), "a b")
+
+    def test_lru_eviction(self):
+        memo = ScoreMemo(max_entries=2)
+        memo.set_many({b'a': b'1', b'b': b'2'})
+        memo.get_many([b'a'])
+        memo.set_many({b'c': b'3'})
+        self.assertEqual(memo.get_many([b'a', b'b', b'c']), {b'a': b'1', b'c': b'3'})
+        self.assertEqual(memo.stats()['evictions'], 1)
+
+    def test_shared_tier_hits_are_promoted(self):
+        shared = Mock()
+        shared.get_many.return_value = {b'k': b'v'}
+        memo = ScoreMemo(max_entries=10, shared=shared)
+        self.assertEqual(memo.get_many([b'k', b'x']), {b'k': b'v'})
+        self.assertEqual(memo.get_many([b'k']), {b'k': b'v'})
+        stats = memo.stats()
+        self.assertEqual((stats['hits'], stats['shared_hits'], stats['misses']), (1, 1, 1))
+
+    def test_shared_tier_failure_is_a_miss(self):
+        shared = Mock()
+        shared.get_many.side_effect = ConnectionError("redis down")
+        memo = ScoreMemo(max_entries=10, shared=shared)
+        self.assertEqual(memo.get_many([b'k']), {})
+        self.assertEqual(memo.stats()['misses'], 1)
+
+    def test_score_comments_reuses_memoized_scores(self):
+        memo = ScoreMemo(max_entries=100)
+        comments = ["first", "I love this!", "first", "first  "]
+        expected = score_comments(comments, memo=False)
+        np.testing.assert_array_equal(score_comments(comments, memo=memo), expected)
+        self.assertEqual(memo.stats()['misses'], 2)
+        np.testing.assert_array_equal(score_comments(comments, memo=memo), expected)
+        self.assertEqual(memo.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
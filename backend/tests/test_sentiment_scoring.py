@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from backend.sentiment_analysis import (
+    analyze_sentiment,
+    score_comments,
+    classify_scores,
+    count_sentiments,
+    get_analyzer,
+    merge_counts,
+    shutdown_pool,
+    SentimentAccumulator,
+    COMPOUND,
+    NEGATIVE,
+    NEUTRAL,
+    POSITIVE,
+)
+
+
+class TestSentimentScoring(unittest.TestCase):
+    def setUp(self):
+        self.comments = [
+            "I absolutely love this video! Amazing content!",
+            "This is the worst video I've ever seen.",
+            "The video was published on Tuesday.",
+            "Great insights and very well explained.",
+        ]
+
+    def test_score_comments_matches_polarity_scores(self):
+        scores = score_comments(self.comments)
+        self.assertEqual(scores.shape, (len(self.comments), 4))
+        self.assertEqual(scores.dtype, np.float32)
+        for row, comment in zip(scores, self.comments):
+            vs = get_analyzer().polarity_scores(comment)
+            np.testing.assert_allclose(
+                row, [vs['neg'], vs['neu'], vs['pos'], vs['compound']], atol=1e-6
+            )
+
+    def test_score_comments_empty(self):
+        self.assertEqual(score_comments([]).shape, (0, 4))
+
+    def test_classify_scores_thresholds(self):
+        labels = classify_scores(np.array([0.05, -0.05, 0.0, 0.049, -0.9], dtype=np.float32))
+        self.assertEqual(labels.tolist(), [POSITIVE, NEGATIVE, NEUTRAL, NEUTRAL, NEGATIVE])
+
+    def test_count_sentiments(self):
+        counts = count_sentiments(np.array([POSITIVE, POSITIVE, NEGATIVE], dtype=np.int8))
+        self.assertEqual(counts, {'positive': 2, 'negative': 1, 'neutral': 0})
+
+    def test_analyze_sentiment_counts(self):
+        results = analyze_sentiment(self.comments)
+        self.assertEqual(results, {'positive': 2, 'negative': 1, 'neutral': 1})
+        scores = score_comments(self.comments)
+        self.assertEqual(sum(results.values()), len(scores[:, COMPOUND]))
+
+    def test_analyze_sentiment_empty(self):
+        self.assertEqual(analyze_sentiment([]), {'positive': 0, 'negative': 0, 'neutral': 0})
+
+
+class TestSentimentAccumulator(unittest.TestCase):
+    def test_running_counts_match_batch_analysis(self):
+        pages = [["I love it!", "I hate it."], ["It is a video."], []]
+        accumulator = SentimentAccumulator(memo=False)
+        page_counts = [accumulator.update(page) for page in pages]
+
+        self.assertEqual(page_counts[1], {'positive': 0, 'negative': 0, 'neutral': 1})
+        self.assertEqual(accumulator.result(), analyze_sentiment(sum(pages, []), memo=False))
+        self.assertEqual(accumulator.comment_count, 3)
+        self.assertEqual(accumulator.pages, 3)
+
+
+class TestParallelScoring(unittest.TestCase):
+    def setUp(self):
+        self.comments = ["I love it!", "I hate it.", "It is a video."] * 20
+        patcher = patch.multiple(
+            'backend.sentiment_analysis.Config',
+            SENTIMENT_WORKERS=2,
+            SENTIMENT_PARALLEL_MIN_COMMENTS=10,
+            SENTIMENT_CHUNK_SIZE=7,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutdown_pool)
+
+    def test_parallel_scores_match_in_process(self):
+        np.testing.assert_array_equal(
+            score_comments(self.comments, parallel=True, memo=False),
+            score_comments(self.comments, parallel=False, memo=False),
+        )
+
+    def test_parallel_counts_match_in_process(self):
+        self.assertEqual(
+            analyze_sentiment(self.comments, parallel=True, memo=False),
+            {'positive': 20, 'negative': 20, 'neutral': 20},
+        )
+
+    def test_small_batches_stay_in_process(self):
+        with patch('backend.sentiment_analysis._get_pool') as mock_get_pool:
+            analyze_sentiment(self.comments[:3], parallel=True, memo=False)
+        mock_get_pool.assert_not_called()
+
+    def test_merge_counts(self):
+        merged = merge_counts([
+            {'positive': 1, 'negative': 2, 'neutral': 3},
+            {'positive': 4, 'negative': 0, 'neutral': 1},
+        ])
+        self.assertEqual(merged, {'positive': 5, 'negative': 2, 'neutral': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from backend.sentiment_analysis import SentimentTrends, generate_sentiment_trends, to_epoch_seconds
+
+
+class TestGenerateSentimentTrends(unittest.TestCase):
+    def test_buckets_by_resolution(self):
+        comments = ["I love this!", "This is awful.", "Great video", "Terrible"]
+        timestamps = [
+            '2024-02-17T10:00:05Z',
+            '2024-02-17T10:00:50Z',
+            '2024-02-17T10:59:00Z',
+            '2024-02-17T12:30:00Z'
+        ]
+
+        by_minute = generate_sentiment_trends(comments, timestamps, resolution='minute', memo=False)
+        self.assertEqual([row['timestamp'] for row in by_minute],
+                         ['2024-02-17T10:00:00Z', '2024-02-17T10:59:00Z', '2024-02-17T12:30:00Z'])
+        self.assertEqual(by_minute[0]['num_comments'], 2)
+        self.assertEqual((by_minute[0]['positive'], by_minute[0]['negative']), (1, 1))
+
+        by_hour = generate_sentiment_trends(comments, timestamps, resolution='hour', memo=False)
+        self.assertEqual([row['num_comments'] for row in by_hour], [3, 1])
+        self.assertLess(by_hour[1]['average_sentiment'], 0)
+
+        by_day = generate_sentiment_trends(comments, timestamps, resolution='day', memo=False)
+        self.assertEqual(len(by_day), 1)
+        self.assertEqual(by_day[0]['timestamp'], '2024-02-17T00:00:00Z')
+
+    def test_accepts_epoch_seconds_and_datetimes(self):
+        when = datetime(2024, 2, 17, 10, 0)
+        seconds = to_epoch_seconds([when, 1708164000, '2024-02-17T10:00:00Z', None, ''])
+        self.assertEqual(seconds[0], seconds[2])
+        self.assertEqual(seconds[1], seconds[2])
+        self.assertTrue(np.isnan(seconds[3:]).all())
+
+    def test_comments_without_timestamp_are_skipped(self):
+        trends = generate_sentiment_trends(["Nice", "Bad", "Meh"], ['2024-02-17T10:00:00Z', None, ''], memo=False)
+        self.assertEqual(sum(row['num_comments'] for row in trends), 1)
+
+    def test_empty_input(self):
+        self.assertEqual(generate_sentiment_trends([], []), [])
+
+    def test_rejects_unknown_resolution_and_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            generate_sentiment_trends(["Nice"], [0], resolution='week')
+        with self.assertRaises(ValueError):
+            generate_sentiment_trends(["Nice", "Bad"], [0], memo=False)
+
+
+class TestSentimentTrends(unittest.TestCase):
+    def test_incremental_updates_match_full_recompute(self):
+        comments = ["I love this!", "This is awful.", "Great video", "Terrible", "okay"]
+        timestamps = [0, 30, 3600, 3700, 90000]
+
+        trends = SentimentTrends('hour', memo=False)
+        trends.update(comments[:2], timestamps[:2])
+        changed = trends.update(comments[2:], timestamps[2:])
+
+        self.assertEqual([row['timestamp'] for row in changed],
+                         ['1970-01-01T01:00:00Z', '1970-01-02T01:00:00Z'])
+        self.assertEqual(trends.trends(), generate_sentiment_trends(comments, timestamps, memo=False))
+
+    def test_update_only_touches_affected_buckets(self):
+        trends = SentimentTrends('minute', memo=False)
+        trends.update(["Great", "Awful"], [0, 120])
+        changed = trends.update(["Lovely"], [10])
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(changed[0]['num_comments'], 2)
+        self.assertEqual(trends.trends()[1]['num_comments'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+
+from backend.exceptions import QuotaExceededError
+from backend.singleflight import RedisSingleFlight, SingleFlight
+
+
+class FakeRedis:
+    """Just enough of the redis client for RedisSingleFlight."""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and key in self.store:
+                return None
+            self.store[key] = value
+            self.ttls[key] = px / 1000 if px else None
+            return True
+
+    def setex(self, key, timeout, value):
+        self.store[key] = value
+        self.ttls[key] = timeout
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.store.get(key) == token:
+                del self.store[key]
+                return 1
+            return 0
+
+
+def _run_concurrently(target, count):
+    results = [None] * count
+    errors = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'comment_count': 3}
+
+        results, errors = _run_concurrently(lambda: flight.do('video:a', work), 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'comment_count': 3}] * 8)
+        self.assertEqual(errors, [None] * 8)
+
+    def test_followers_receive_the_leaders_exception(self):
+        flight = SingleFlight()
+
+        def work():
+            time.sleep(0.1)
+            raise QuotaExceededError()
+
+        _, errors = _run_concurrently(lambda: flight.do('video:a', work), 4)
+        self.assertTrue(all(isinstance(error, QuotaExceededError) for error in errors))
+
+    def test_key_is_released_after_completion(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('k', lambda: 1), 1)
+        self.assertEqual(flight.do('k', lambda: 2), 2)
+
+
+class TestRedisSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+
+    def test_processes_share_the_leaders_result(self):
+        # Separate instances stand in for separate worker processes.
+        flights = [RedisSingleFlight(self.redis, poll_interval=0.01) for _ in range(4)]
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'sentiment': {'positive': 1}}
+
+        results = [None] * 4
+        threads = [
+            threading.Thread(target=lambda i=i: results.__setitem__(i, flights[i].do('video:a', work)))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'sentiment': {'positive': 1}}] * 4)
+        self.assertNotIn('singleflight:video:a:lock', self.redis.store)
+
+    def test_published_api_errors_are_reraised(self):
+        leader = RedisSingleFlight(self.redis)
+        with self.assertRaises(QuotaExceededError):
+            leader.do('video:b', lambda: (_ for _ in ()).throw(QuotaExceededError("out of quota")))
+
+        follower = RedisSingleFlight(self.redis)
+        with self.assertRaises(QuotaExceededError) as raised:
+            follower.do('video:b', lambda: 'should not run')
+        self.assertEqual(raised.exception.status_code, 429)
+
+    def test_errors_are_published_briefly(self):
+        flight = RedisSingleFlight(self.redis, result_ttl=30, error_ttl=1)
+        with self.assertRaises(QuotaExceededError):
+            flight.do('video:d', lambda: (_ for _ in ()).throw(QuotaExceededError("out of quota")))
+        self.assertEqual(self.redis.ttls['singleflight:video:d:result'], 1)
+
+        flight.do('video:e', lambda: 'fine')
+        self.assertEqual(self.redis.ttls['singleflight:video:e:result'], 30)
+
+    def test_follower_runs_work_when_wait_times_out(self):
+        self.redis.set('singleflight:video:c:lock', 'someone-else')
+        flight = RedisSingleFlight(self.redis, wait_timeout=0.05, poll_interval=0.01)
+        self.assertEqual(flight.do('video:c', lambda: 'computed locally'), 'computed locally')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+import unittest
+
+from backend.timing import parse_server_timing, server_timing_header, stage, stage_durations, start_timing
+
+
+def _in_fresh_context(fn):
+    return contextvars.Context().run(fn)
+
+
+class TestServerTiming(unittest.TestCase):
+    def test_stages_are_summed_and_formatted(self):
+        def run():
+            start_timing()
+            with stage('fetch'):
+                pass
+            with stage('score'):
+                pass
+            with stage('fetch'):
+                pass
+            return server_timing_header()
+
+        durations = parse_server_timing(_in_fresh_context(run))
+        self.assertEqual(list(durations), ['fetch', 'score', 'app'])
+        self.assertGreaterEqual(durations['app'], durations['fetch'])
+
+    def test_stages_in_worker_threads_are_recorded(self):
+        def run():
+            start_timing()
+
+            def work():
+                with stage('score'):
+                    pass
+
+            async def main():
+                await asyncio.to_thread(work)
+
+            asyncio.run(main())
+            return stage_durations()
+
+        self.assertIn('score', _in_fresh_context(run))
+
+    def test_nothing_is_recorded_outside_a_request(self):
+        def run():
+            with stage('fetch'):
+                pass
+            return server_timing_header(), stage_durations()
+
+        self.assertEqual(_in_fresh_context(run), (None, {}))
+
+    def test_parse_ignores_malformed_metrics(self):
+        self.assertEqual(
+            parse_server_timing('cache;desc="hit";dur=1.5, bad;dur=x, ,total;dur=3'),
+            {'cache': 1.5, 'total': 3.0}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
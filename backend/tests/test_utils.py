@@ -0,0 +1,24 @@
+import unittest
+
+from backend.utils import extract_video_id
+
+
+class TestExtractVideoId(unittest.TestCase):
+    def test_urls_and_bare_ids(self):
+        for value in [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ',
+            'https://youtu.be/dQw4w9WgXcQ',
+            'https://www.youtube.com/embed/dQw4w9WgXcQ',
+            'dQw4w9WgXcQ'
+        ]:
+            self.assertEqual(extract_video_id(value), 'dQw4w9WgXcQ', value)
+
+    def test_invalid_input(self):
+        for value in ['', 'not a video', 'https://www.youtube.com/']:
+            with self.assertRaises(ValueError):
+                extract_video_id(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
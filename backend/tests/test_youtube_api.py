@@ -1,23 +1,54 @@
 import unittest
 from unittest.mock import Mock, patch
-from youtube_api import YouTubeAPI, create_youtube_client
+from backend.metrics import key_label
+from backend.youtube_api import RedisQuotaStore, YouTubeAPI, create_youtube_client, invalidate_cache, iter_comment_batches
+from backend.youtube_client import clear_youtube_clients
 from googleapiclient.errors import HttpError
 import datetime
-from backend.cache import cache_video_metadata, cache_video_comments, get_cached_results, invalidate_cache
+import threading
+from backend.cache import cache_video_metadata, cache_video_comments, get_cached_results
+
+class FakeRedis:
+    """Just enough of the redis client for RedisQuotaStore."""
+
+    def __init__(self):
+        self.store = {}
+        self.expire_at = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.store[key] = value
+
+    def incrby(self, key, amount):
+        self.store[key] = int(self.store.get(key, 0)) + amount
+
+    def expireat(self, key, when):
+        self.expire_at[key] = when
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
 
 class TestYouTubeAPI(unittest.TestCase):
     def setUp(self):
+        clear_youtube_clients()
+        self.addCleanup(clear_youtube_clients)
         self.api_keys = ['test_key_1', 'test_key_2']
         self.api = YouTubeAPI(self.api_keys)
 
-    @patch('youtube_api.build')
+    @patch('backend.youtube_client.build')
     def test_initialize_client(self, mock_build):
         mock_youtube = Mock()
         mock_build.return_value = mock_youtube
         
         api = YouTubeAPI(['test_key'])
         self.assertIsNotNone(api.youtube)
-        mock_build.assert_called_once_with('youtube', 'v3', developerKey='test_key')
+        mock_build.assert_called_once_with('youtube', 'v3', developerKey='test_key', static_discovery=True, client_options=None)
 
     def test_rotate_api_key(self):
         initial_key_index = self.api.current_key_index
@@ -37,13 +68,37 @@ class TestYouTubeAPI(unittest.TestCase):
         result = api.handle_quota_exceeded()
         self.assertFalse(result)
 
-    @patch('youtube_api.time.sleep')
+    @patch('backend.youtube_api.time.sleep')
     def test_apply_rate_limiting(self, mock_sleep):
         self.api.last_request_time = datetime.datetime.now() - datetime.timedelta(seconds=0.05)
         self.api.apply_rate_limiting()
         mock_sleep.assert_called()
 
-    @patch('youtube_api.build')
+    def test_rate_limiting_sleeps_without_the_lock(self):
+        acquired = []
+
+        def take_lock():
+            if self.api._lock.acquire(timeout=1):
+                acquired.append(True)
+                self.api._lock.release()
+
+        def sleep(seconds):
+            # Another thread can use the scheduler while this one waits.
+            thread = threading.Thread(target=take_lock)
+            thread.start()
+            thread.join()
+
+        self.api.last_request_time = datetime.datetime.now()
+        with patch('backend.youtube_api.time.sleep', side_effect=sleep) as mock_sleep:
+            self.api.apply_rate_limiting()
+        mock_sleep.assert_called_once()
+        self.assertEqual(acquired, [True])
+
+    def test_quota_status_labels_keys_apart(self):
+        api = YouTubeAPI(['project-a-1234', 'project-b-1234'])
+        self.assertEqual(len(api.quota_status()), 2)
+
+    @patch('backend.youtube_client.build')
     def test_get_video_metadata_success(self, mock_build):
         mock_youtube = Mock()
         mock_videos = Mock()
@@ -63,7 +118,7 @@ class TestYouTubeAPI(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result['id'], 'test_id')
 
-    @patch('youtube_api.build')
+    @patch('backend.youtube_client.build')
     def test_get_video_metadata_quota_exceeded(self, mock_build):
         mock_youtube = Mock()
         mock_videos = Mock()
@@ -83,6 +138,59 @@ class TestYouTubeAPI(unittest.TestCase):
         self.assertIsNone(result)
         self.assertEqual(api.current_key_index, 1)  # Should have rotated to second key
 
+    @patch('backend.youtube_client.build')
+    def test_select_api_key_prefers_most_remaining_budget(self, mock_build):
+        api = YouTubeAPI(['key1', 'key2'], daily_quota=100)
+        api.quota_store.used['key1'] = 90
+        api.quota_store.used['key2'] = 10
+        self.assertTrue(api.select_api_key())
+        self.assertEqual(api.current_key, 'key2')
+        self.assertEqual(api.remaining_quota('key2'), 90)
+
+    @patch('backend.youtube_api.time.sleep')
+    @patch('backend.youtube_client.build')
+    def test_execute_records_quota_usage(self, mock_build, mock_sleep):
+        mock_build.return_value.videos.return_value.list.return_value.execute.return_value = {'items': []}
+        api = YouTubeAPI(['key1'], daily_quota=100)
+        api.get_video_metadata('test_id')
+        api.get_video_metadata('test_id')
+        self.assertEqual(api.quota_status()[key_label('key1')], {'used': 2, 'remaining': 98, 'exhausted': False})
+
+    @patch('backend.youtube_api.time.sleep')
+    @patch('backend.youtube_client.build')
+    def test_fetches_without_a_key_go_through_the_scheduler(self, mock_build, mock_sleep):
+        mock_resp = Mock()
+        mock_resp.status = 403
+        mock_build.return_value.commentThreads.return_value.list.return_value.execute.side_effect = [
+            HttpError(mock_resp, b'quotaExceeded'),
+            {'items': []}
+        ]
+        api = YouTubeAPI(['key1', 'key2'], daily_quota=100)
+        with patch('backend.youtube_api.get_youtube_api', return_value=api):
+            pages = list(iter_comment_batches('test_id'))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(api.quota_store.exhausted, {'key1'})
+        self.assertEqual(api.remaining_quota('key2'), 99)
+
+    @patch('backend.youtube_api.time.sleep')
+    @patch('backend.youtube_client.build')
+    def test_processes_share_quota_through_redis(self, mock_build, mock_sleep):
+        redis = FakeRedis()
+        # Separate instances stand in for separate worker processes.
+        first = YouTubeAPI(['key1', 'key2'], daily_quota=100, quota_store=RedisQuotaStore(redis))
+        second = YouTubeAPI(['key1', 'key2'], daily_quota=100, quota_store=RedisQuotaStore(redis))
+        first.record_usage('key1', 'commentThreads.list')
+        second.record_usage('key1', 'commentThreads.list')
+        self.assertEqual(first.remaining_quota('key1'), 98)
+
+        second.key_exhausted('key1')
+        self.assertEqual(first.quota_status()[key_label('key1')], {'used': 2, 'remaining': 0, 'exhausted': True})
+        self.assertEqual(first.acquire_key('videos.list'), 'key2')
+        self.assertNotIn('key1', ''.join(redis.store))
+        day_end = max(redis.expire_at.values())
+        self.assertTrue(all(when == day_end for when in redis.expire_at.values()))
+        self.assertLessEqual(day_end - datetime.datetime.now().timestamp(), 25 * 3600)
+
     def test_create_youtube_client_with_env_var(self):
         with patch.dict('os.environ', {'YOUTUBE_API_KEY': 'test_key'}):
             client = create_youtube_client()
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from backend import youtube_async
+from backend.exceptions import BadRequestError, QuotaExceededError, VideoNotFoundError
+from backend.youtube_api import YouTubeAPI
+from backend.youtube_async import AsyncYouTubeClient, fetch_comment_batch, get_async_client, reset_async_client, run_sync
+
+
+def _thread(comment_id, text):
+    return {
+        'snippet': {
+            'topLevelComment': {
+                'id': comment_id,
+                'snippet': {'textDisplay': text, 'publishedAt': '2024-02-17T10:00:00Z', 'likeCount': 1}
+            }
+        }
+    }
+
+
+def _error(status, reason):
+    return web.json_response(
+        {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason}]}},
+        status=status
+    )
+
+
+class TestAsyncYouTubeClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.failures = {}
+
+        async def comment_threads(request):
+            self.requests.append(dict(request.query))
+            video_id = request.query['videoId']
+            if request.query['key'] == 'spent':
+                return _error(403, 'quotaExceeded')
+            if video_id == 'missing':
+                return _error(404, 'videoNotFound')
+            if video_id == 'quota':
+                return _error(403, 'quotaExceeded')
+            if self.failures.get(video_id, 0) > 0:
+                self.failures[video_id] -= 1
+                return _error(503, 'backendError')
+            if request.query.get('pageToken') == 'page2':
+                return web.json_response({'items': [_thread('c2', 'Second page')]})
+            return web.json_response({'items': [_thread('c1', 'First page')], 'nextPageToken': 'page2'})
+
+        async def videos(request):
+            self.requests.append(dict(request.query))
+            ids = request.query['id'].split(',')
+            if 'broken' in ids:
+                return _error(400, 'badRequest')
+            return web.json_response({'items': [{'id': video_id} for video_id in ids]})
+
+        app = web.Application()
+        app.router.add_get('/youtube/v3/commentThreads', comment_threads)
+        app.router.add_get('/youtube/v3/videos', videos)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.client = AsyncYouTubeClient(
+            'test_key',
+            base_url=str(self.server.make_url('/youtube/v3')),
+            max_retries=2,
+            backoff_base=0.001
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_fetch_comments_follows_pagination(self):
+        comments = await self.client.fetch_comments('video1')
+        self.assertEqual(comments, ['First page', 'Second page'])
+        self.assertEqual(self.requests[0]['key'], 'test_key')
+        self.assertEqual(self.requests[1]['pageToken'], 'page2')
+
+    async def test_iter_comment_pages_yields_records(self):
+        pages = [page async for page in self.client.iter_comment_pages('video1')]
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[0][0]['id'], 'c1')
+        self.assertEqual(pages[0][0]['like_count'], 1)
+
+    async def test_retries_transient_errors(self):
+        self.failures['video1'] = 2
+        comments = await self.client.fetch_comments('video1')
+        self.assertEqual(len(comments), 2)
+        self.assertEqual(len(self.requests), 4)
+
+    async def test_quota_exceeded_is_not_retried(self):
+        with self.assertRaises(QuotaExceededError):
+            await self.client.fetch_comments('quota')
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_scheduler_moves_on_from_an_exhausted_key(self):
+        scheduler = YouTubeAPI(['spent', 'fresh'], daily_quota=100)
+        async with AsyncYouTubeClient(
+            base_url=str(self.server.make_url('/youtube/v3')), scheduler=scheduler
+        ) as client:
+            self.assertEqual(await client.fetch_comments('video1'), ['First page', 'Second page'])
+            self.assertEqual([request['key'] for request in self.requests], ['spent', 'fresh', 'fresh'])
+            self.assertEqual(scheduler.quota_store.exhausted, {'spent'})
+            self.assertEqual(scheduler.remaining_quota('fresh'), 98)
+
+            scheduler.key_exhausted('fresh')
+            with self.assertRaises(QuotaExceededError):
+                await client.fetch_comments('video1')
+            self.assertEqual(len(self.requests), 3)
+
+    async def test_video_not_found(self):
+        with self.assertRaises(VideoNotFoundError):
+            await self.client.fetch_comments('missing')
+
+    async def test_videos_joins_ids(self):
+        response = await self.client.videos(['a', 'b'])
+        self.assertEqual([item['id'] for item in response['items']], ['a', 'b'])
+        self.assertEqual(self.requests[0]['id'], 'a,b')
+
+    async def test_metadata_batch_requests_50_ids_per_call(self):
+        video_ids = [f"video{i:03d}" for i in range(120)]
+        metadata = await self.client.fetch_video_metadata_batch(video_ids + video_ids[:10])
+        self.assertEqual(sorted(metadata), video_ids)
+        self.assertEqual(sorted(len(request['id'].split(',')) for request in self.requests), [20, 50, 50])
+
+    async def test_metadata_batch_keeps_the_chunks_that_succeeded(self):
+        video_ids = [f"video{i:03d}" for i in range(60)] + ['broken']
+        with self.assertLogs('backend.youtube_async', 'ERROR'):
+            metadata = await self.client.fetch_video_metadata_batch(video_ids)
+        self.assertEqual(sorted(metadata), video_ids[:50])
+
+        with self.assertRaises(BadRequestError):
+            await self.client.fetch_video_metadata_batch(['broken'])
+
+
+class TestSharedClient(unittest.TestCase):
+    def setUp(self):
+        reset_async_client()
+        self.addCleanup(self._stop)
+        patcher = patch('backend.youtube_async.get_youtube_api', return_value=YouTubeAPI(['shared'], daily_quota=100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stop(self):
+        loop = youtube_async._shared_loop
+        client = youtube_async._shared_client
+        if loop is not None:
+            if client is not None:
+                run_sync(client.close())
+            loop.call_soon_threadsafe(loop.stop)
+        reset_async_client()
+
+    def test_run_sync_shares_one_loop_and_client_per_process(self):
+        async def current():
+            return asyncio.get_running_loop(), get_async_client()
+
+        first = run_sync(current())
+        self.assertEqual(run_sync(current()), first)
+        other_thread = []
+        thread = threading.Thread(target=lambda: other_thread.append(run_sync(current())))
+        thread.start()
+        thread.join()
+        self.assertEqual(other_thread, [first])
+
+    def test_run_sync_raises_the_coroutines_error(self):
+        async def fail():
+            raise VideoNotFoundError()
+
+        with self.assertRaises(VideoNotFoundError):
+            run_sync(fail())
+
+    @patch('backend.youtube_async.cache_comment_batch')
+    @patch('backend.youtube_async.get_cached_comment_batch', return_value=None)
+    def test_fetches_reuse_the_shared_session(self, mock_cached, mock_cache):
+        async def comment_threads(request):
+            return web.json_response({'items': [_thread('c1', 'Only page')]})
+
+        app = web.Application()
+        app.router.add_get('/youtube/v3/commentThreads', comment_threads)
+        server = TestServer(app)
+        run_sync(server.start_server())
+        self.addCleanup(lambda: run_sync(server.close()))
+        youtube_async._shared_client = AsyncYouTubeClient(base_url=str(server.make_url('/youtube/v3')))
+
+        self.assertEqual(run_sync(fetch_comment_batch('video1')).texts(), ['Only page'])
+        session = get_async_client()._session
+        self.assertEqual(run_sync(fetch_comment_batch('video2')).texts(), ['Only page'])
+        self.assertIs(get_async_client()._session, session)
+        self.assertFalse(session.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from backend.youtube_client import clear_youtube_clients, get_youtube_client, thread_http
+
+
+class TestYouTubeClientRegistry(unittest.TestCase):
+    def setUp(self):
+        clear_youtube_clients()
+        self.addCleanup(clear_youtube_clients)
+
+    @patch('backend.youtube_client.build')
+    def test_one_client_per_api_key(self, mock_build):
+        mock_build.side_effect = lambda *args, **kwargs: object()
+        first = get_youtube_client('key1')
+        self.assertIs(get_youtube_client('key1'), first)
+        self.assertIsNot(get_youtube_client('key2'), first)
+        self.assertEqual(mock_build.call_count, 2)
+        mock_build.assert_any_call('youtube', 'v3', developerKey='key1', static_discovery=True, client_options=None)
+
+    @patch('backend.youtube_client.build')
+    def test_concurrent_first_use_builds_once(self, mock_build):
+        threads = [threading.Thread(target=get_youtube_client, args=('key',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        mock_build.assert_called_once()
+
+    def test_thread_http_is_per_thread(self):
+        other = []
+        thread = threading.Thread(target=lambda: other.append(thread_http()))
+        thread.start()
+        thread.join()
+        self.assertIs(thread_http(), thread_http())
+        self.assertIsNot(other[0], thread_http())
+
+
+if __name__ == '__main__':
+    unittest.main()
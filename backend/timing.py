@@ -0,0 +1,106 @@
+# backend/timing.py
+"""
+Per-request stage timings, reported to clients in a Server-Timing header.
+
+start_timing() begins collecting for the current request and stage(name)
+records how long a block took. Work handed to asyncio.to_thread() or
+asyncio.run() inherits the request's context, so its stages are recorded
+too; stages timed outside a request (background refreshes, job workers)
+are dropped. While a stage runs, its thread counts as working for the
+request, which is how profiling.py knows which threads to sample.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_timings = contextvars.ContextVar('server_timings', default=None)
+
+
+def start_timing():
+    """Starts collecting stage timings for the current context."""
+    timings = {'started': time.perf_counter(), 'stages': [], 'threads': {}}
+    _timings.set(timings)
+    return timings
+
+
+def ensure_timing():
+    """Returns the current context's timings, starting them if need be."""
+    return _timings.get() or start_timing()
+
+
+@contextmanager
+def stage(name):
+    """Records the duration of the enclosed block as stage `name`."""
+    timings = _timings.get()
+    ident = threading.get_ident()
+    if timings is not None:
+        threads = timings['threads']
+        threads[ident] = threads.get(ident, 0) + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings['stages'].append((name, (time.perf_counter() - started) * 1000))
+            if threads[ident] > 1:
+                threads[ident] -= 1
+            else:
+                del threads[ident]
+
+
+def active_threads(timings=None):
+    """
+    Idents of the threads currently running a stage of a request: the
+    current one, or the one `timings` (from start_timing()) belongs to.
+    """
+    timings = timings or _timings.get()
+    return set(timings['threads']) if timings is not None else set()
+
+
+def stage_durations():
+    """
+    Returns the durations in milliseconds recorded so far, summed by stage
+    name in the order each stage first finished.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return {}
+    durations = {}
+    for name, duration in list(timings['stages']):
+        durations[name] = durations.get(name, 0.0) + duration
+    return durations
+
+
+def server_timing_header(total_name='app'):
+    """
+    Formats the recorded stages, plus the time since start_timing() as
+    `total_name`, as a Server-Timing header value.
+
+    Returns:
+        str: e.g. 'fetch;dur=210.4, score;dur=35.2, app;dur=251.0', or None
+        when timing was never started.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return None
+    durations = stage_durations()
+    durations[total_name] = (time.perf_counter() - timings['started']) * 1000
+    return ', '.join(f"{name};dur={duration:.1f}" for name, duration in durations.items())
+
+
+def parse_server_timing(value):
+    """Parses a Server-Timing header into {name: duration_ms}."""
+    durations = {}
+    for metric in (value or '').split(','):
+        name, _, params = metric.strip().partition(';')
+        if not name:
+            continue
+        for param in params.split(';'):
+            key, _, number = param.strip().partition('=')
+            if key == 'dur':
+                try:
+                    durations[name] = float(number)
+                except ValueError:
+                    pass
+    return durations
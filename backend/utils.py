@@ -1,6 +1,7 @@
 import re
 import logging
 import os
+from datetime import datetime, timezone
 from logging.handlers import RotatingFileHandler
 
 def extract_video_id(url_or_id):
@@ -11,7 +12,7 @@ def extract_video_id(url_or_id):
     # Common YouTube URL patterns
     patterns = [
         r'(?:youtu\.be/|youtube\.com/(?:embed/|v/|watch\?v=|watch\?.+&v=))([^?&/]+)',
-        r'^[a-zA-Z0-9_-]{11}$'
+        r'^([a-zA-Z0-9_-]{11})$'
     ]
     
     for pattern in patterns:
@@ -21,6 +22,15 @@ def extract_video_id(url_or_id):
             
     raise ValueError("Invalid YouTube URL or video ID")
 
+def parse_youtube_timestamp(value):
+    """Parse a YouTube API RFC 3339 timestamp into a naive UTC datetime."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 def setup_logging():
     """Configure application logging."""
     log_dir = 'logs'
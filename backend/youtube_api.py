@@ -1,97 +1,683 @@
 # backend/youtube_api.py
-from googleapiclient.discovery import build
-from backend.cache import cache_results, get_cached_results
-import hashlib
+from googleapiclient.errors import HttpError
+from backend.cache import (
+    cache_comment_batch,
+    cache_many,
+    cache_results,
+    get_cached_comment_batch,
+    get_cached_results,
+    get_many_cached,
+    invalidate_namespace,
+    video_cache_key
+)
+from backend.comment_batch import CommentBatch
+from backend.config import Config
+from backend.exceptions import (
+    YouTubeAPIError,
+    VideoNotFoundError,
+    QuotaExceededError,
+    InternalServerError,
+    ServiceUnavailableError,
+    BadRequestError
+)
+from backend.metrics import key_label, record_pages, record_quota, youtube_call
+from backend.youtube_client import get_youtube_client, thread_http
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import functools
+import json
+import logging
+import os
+import threading
+import time
 
-def fetch_comments(video_id, api_key):
+def _comment_record(comment, parent_id=None):
+    snippet = comment['snippet']
+    return {
+        'id': comment['id'],
+        'text': snippet['textDisplay'],
+        'published_at': snippet.get('publishedAt'),
+        'like_count': snippet.get('likeCount', 0),
+        'parent_id': parent_id
+    }
+
+
+def parse_comment_threads(response):
+    """
+    Flattens one commentThreads.list response into comment records.
+
+    Args:
+        response (dict): A commentThreads.list response.
+
+    Returns:
+        list: Dicts with id, text, published_at, like_count and parent_id
+        (None for top-level comments) for each comment and reply, in page order.
+    """
+    records = []
+    for item in response['items']:
+        top_level = item['snippet']['topLevelComment']
+        records.append(_comment_record(top_level))
+
+        if 'replies' in item:
+            for reply in item['replies']['comments']:
+                records.append(_comment_record(reply, parent_id=top_level['id']))
+    return records
+
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+
+def error_reason(payload):
+    """The reason of the first error in a YouTube Data API error body, if any."""
+    try:
+        return payload['error']['errors'][0]['reason']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _error_message(payload, status):
+    try:
+        return payload['error']['message']
+    except (KeyError, TypeError):
+        return f"YouTube API returned HTTP {status}"
+
+
+def error_for_response(status, payload):
+    """
+    Maps an unsuccessful YouTube Data API response to a YouTubeAPIError.
+
+    Args:
+        status (int): HTTP status code.
+        payload (dict): Decoded error body, if any.
+
+    Returns:
+        YouTubeAPIError: The matching exception from backend.exceptions.
+    """
+    reason = error_reason(payload)
+    message = _error_message(payload, status)
+    if reason in QUOTA_REASONS:
+        return QuotaExceededError(message)
+    if status == 404 or reason == 'videoNotFound':
+        return VideoNotFoundError(message)
+    if status == 400:
+        return BadRequestError(message)
+    if status == 503:
+        return ServiceUnavailableError(message)
+    if status >= 500:
+        return InternalServerError(message)
+    return YouTubeAPIError(message, status_code=status)
+
+
+def error_for_http_error(error):
+    """Maps a googleapiclient HttpError to the matching YouTubeAPIError."""
+    try:
+        payload = json.loads(error.content)
+    except (TypeError, ValueError):
+        payload = None
+    return error_for_response(error.resp.status, payload)
+
+
+def _execute(api_key, endpoint, make_request):
+    """
+    Executes a request built by make_request(client) on api_key, or on the
+    process-wide YouTubeAPI scheduler's keys when api_key is None.
+
+    Raises:
+        YouTubeAPIError: The exception from backend.exceptions matching a
+        failed API call, as raised by the async client.
+    """
+    if api_key is None:
+        return get_youtube_api().execute(endpoint, make_request)
+    try:
+        with youtube_call(endpoint.split('.')[0], 'sync'):
+            response = make_request(get_youtube_client(api_key)).execute(http=thread_http())
+    except HttpError as e:
+        error = error_for_http_error(e)
+        if not isinstance(error, QuotaExceededError):
+            # Failed calls are charged too, except for running out of quota.
+            record_quota(api_key, endpoint)
+        raise error from e
+    record_quota(api_key, endpoint)
+    return response
+
+
+def iter_comment_pages(video_id, api_key=None, order='time'):
+    """
+    Fetches YouTube comments for a video one commentThreads page at a time.
+
+    Args:
+        video_id (str): The ID of the YouTube video.
+        api_key (str): The API key for YouTube Data API v3, or None to spread
+            the calls over the keys of get_youtube_api().
+        order (str): commentThreads ordering, 'time' (newest first, the API
+            default) or 'relevance'.
+
+    Yields:
+        list: The comment records of each page (see parse_comment_threads), as
+        soon as the page arrives.
+
+    Raises:
+        YouTubeAPIError: The exception from backend.exceptions matching a
+        failed API call, as raised by the async client.
+    """
+    for response in _iter_comment_thread_responses(video_id, api_key, order):
+        yield parse_comment_threads(response)
+
+
+def iter_comment_batches(video_id, api_key=None, order='time'):
+    """
+    Like iter_comment_pages(), but yields each page as a CommentBatch built
+    straight from the response.
+    """
+    for response in _iter_comment_thread_responses(video_id, api_key, order):
+        yield CommentBatch.from_comment_threads(response)
+
+
+def _iter_comment_thread_responses(video_id, api_key, order):
+    if api_key is None:
+        return get_youtube_api()._iter_comment_thread_responses(video_id, order)
+    return _paged_comment_threads(functools.partial(_execute, api_key), video_id, order, 'sync')
+
+
+def _paged_comment_threads(execute, video_id, order, client):
+    page_token = None
+    pages = 0
+    try:
+        while True:
+            response = execute('commentThreads.list', lambda youtube: youtube.commentThreads().list(
+                part="snippet,replies",
+                videoId=video_id,
+                maxResults=100,  # The API maximum
+                order=order,
+                pageToken=page_token
+            ))
+            pages += 1
+            yield response
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+    finally:
+        record_pages(pages, client)
+
+
+def fetch_comments(video_id, api_key=None, incremental=False):
     """
     Fetches YouTube comments for a given video ID using the YouTube API.
 
     Args:
         video_id (str): The ID of the YouTube video.
-        api_key (str): The API key for YouTube Data API v3.
+        api_key (str): The API key for YouTube Data API v3, or None to use
+            the key pool of get_youtube_api().
+        incremental (bool): Only fetch comments newer than the ones already
+            stored in the database, store and score them, and return just
+            those (see comment_sync.sync_comments).
 
     Returns:
         list: A list of comment texts, or None if there's an error.
     """
-    cache_key = f"video:{video_id}:comments"
-    cached_comments = get_cached_results(cache_key)
-    if cached_comments:
-        return cached_comments
+    if incremental:
+        from backend.comment_sync import sync_comments
+        try:
+            return sync_comments(video_id, api_key)['new_comments']
+        except Exception as e:
+            logging.error(f"Failed to sync comments for video_id {video_id}: {e}")
+            return None
 
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        comments = []
-        request = youtube.commentThreads().list(
-            part="snippet,replies",
-            videoId=video_id,
-            maxResults=100  # You can adjust maxResults as needed
-        )
-        while request:
-            response = request.execute()
-
-            for item in response['items']:
-                comment = item['snippet']['topLevelComment']['snippet']['textDisplay']
-                comments.append(comment)
-
-                if 'replies' in item:
-                    for reply in item['replies']['comments']:
-                        reply_comment = reply['snippet']['textDisplay']
-                        comments.append(reply_comment)
-
-            request = youtube.commentThreads().list_next(request, response)
-        
-        cache_results(cache_key, comments, timeout=600)  # Cache comments for 10 minutes
-        return comments
+        return fetch_comment_batch(video_id, api_key).texts()
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logging.error(f"Failed to fetch comments for video_id {video_id}: {e}")
         return None
 
-def fetch_video_metadata(video_id, api_key):
+def fetch_comment_batch(video_id, api_key=None):
+    """
+    Fetches all comments and inline replies of a video as one CommentBatch.
+
+    The batch is cached for 10 minutes in CommentBatch's columnar layout
+    (see cache.cache_comment_batch). API errors propagate to the caller.
+    """
+    cached_comments = get_cached_comment_batch(video_id)
+    if cached_comments is not None:
+        return cached_comments
+
+    comments = CommentBatch.concat(iter_comment_batches(video_id, api_key))
+    cache_comment_batch(video_id, comments)
+    return comments
+
+def fetch_video_metadata(video_id, api_key=None):
     """
     Fetches YouTube video metadata for a given video ID using the YouTube API.
 
     Args:
         video_id (str): The ID of the YouTube video.
-        api_key (str): The API key for YouTube Data API v3.
+        api_key (str): The API key for YouTube Data API v3, or None to use
+            the key pool of get_youtube_api().
 
     Returns:
         dict: A dictionary containing video metadata, or None if there's an error.
     """
-    cache_key = f"video:{video_id}:metadata"
+    cache_key = video_cache_key(video_id, 'metadata')
     cached_metadata = get_cached_results(cache_key)
     if cached_metadata:
         return cached_metadata
 
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        request = youtube.videos().list(
+        response = _execute(api_key, 'videos.list', lambda youtube: youtube.videos().list(
             part="snippet,contentDetails,statistics",
             id=video_id
-        )
-        response = request.execute()
+        ))
         if response['items']:
             metadata = response['items'][0]
             cache_results(cache_key, metadata, timeout=3600)  # Cache metadata for 1 hour
             return metadata
         return None
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logging.error(f"Failed to fetch metadata for video_id {video_id}: {e}")
         return None
 
+# videos.list accepts at most 50 IDs per call.
+METADATA_BATCH_SIZE = 50
+
+def metadata_chunks(video_ids):
+    """Splits unique video IDs into videos.list-sized chunks, keeping their order."""
+    video_ids = list(dict.fromkeys(video_ids))
+    return [video_ids[i:i + METADATA_BATCH_SIZE] for i in range(0, len(video_ids), METADATA_BATCH_SIZE)]
+
+def cached_video_metadata(video_ids):
+    """
+    Looks up cached metadata for several videos with one cache round-trip.
+
+    Returns:
+        tuple: (dict of video ID to cached metadata, list of IDs not cached).
+    """
+    keys = {video_id: video_cache_key(video_id, 'metadata') for video_id in dict.fromkeys(video_ids)}
+    cached = get_many_cached(list(keys.values()))
+    found = {video_id: cached[key] for video_id, key in keys.items() if cached.get(key)}
+    return found, [video_id for video_id in keys if video_id not in found]
+
+def cache_video_metadata_items(items):
+    """Caches videos.list resources under their videos' metadata keys for 1 hour."""
+    if items:
+        cache_many({video_cache_key(item['id'], 'metadata'): item for item in items}, timeout=3600)
+
+def fetch_video_metadata_batch(video_ids, api_key=None):
+    """
+    Fetches metadata for many videos, 50 IDs per videos.list call.
+
+    Cached videos are not requested again. A failing chunk is logged and its
+    videos are left out, the same way fetch_video_metadata returns None.
+
+    Args:
+        video_ids (list): IDs of the YouTube videos.
+        api_key (str): The API key for YouTube Data API v3, or None to use
+            the key pool of get_youtube_api().
+
+    Returns:
+        dict: Video ID to metadata for every video that was found.
+    """
+    metadata, missing = cached_video_metadata(video_ids)
+    for chunk in metadata_chunks(missing):
+        try:
+            response = _execute(api_key, 'videos.list', lambda youtube: youtube.videos().list(
+                part="snippet,contentDetails,statistics",
+                id=','.join(chunk),
+                maxResults=METADATA_BATCH_SIZE
+            ))
+        except Exception as e:
+            logging.error(f"Failed to fetch metadata for {len(chunk)} videos: {e}")
+            continue
+        items = response.get('items', [])
+        cache_video_metadata_items(items)
+        metadata.update((item['id'], item) for item in items)
+    return metadata
+
 def invalidate_cache(video_id):
     """
     Invalidates the cache for a given video ID.
 
+    Bumps the video's cache namespace version, so its comments, metadata and
+    analysis keys are all replaced at once without deleting anything.
+
     Args:
         video_id (str): The ID of the YouTube video.
     """
-    cache_keys = [
-        f"video:{video_id}:metadata",
-        f"video:{video_id}:comments"
-    ]
-    for key in cache_keys:
-        redis_client.delete(key)
+    invalidate_namespace(f"video:{video_id}")
+
+# Quota units charged per call (YouTube Data API v3 quota costs).
+QUOTA_COSTS = {
+    'commentThreads.list': 1,
+    'comments.list': 1,
+    'videos.list': 1,
+    'search.list': 100
+}
+
+# Daily quotas reset at midnight Pacific Time, daylight saving included.
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+def _quota_day():
+    return datetime.now(QUOTA_TIMEZONE).date()
+
+def _quota_day_end(day):
+    """Unix time at which a quota day ends and its counters reset."""
+    return int(datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE).timestamp())
+
+class LocalQuotaStore:
+    """
+    Keeps per-key quota usage in process memory.
+
+    Every process budgets each key's full daily quota on its own, so with N
+    worker processes real spend can reach N times the quota before any of
+    them backs off. Use RedisQuotaStore to share the counters.
+    """
+
+    def __init__(self):
+        self.day = _quota_day()
+        self.used = {}
+        self.exhausted = set()
+
+    def _roll(self, day):
+        if day != self.day:
+            self.day = day
+            self.used = {}
+            self.exhausted = set()
+
+    def usage(self, day, api_keys):
+        """Returns api_key -> (units used, exhausted) for the quota day."""
+        self._roll(day)
+        return {key: (self.used.get(key, 0), key in self.exhausted) for key in api_keys}
+
+    def charge(self, day, api_key, cost):
+        self._roll(day)
+        self.used[api_key] = self.used.get(api_key, 0) + cost
+
+    def mark_exhausted(self, day, api_key):
+        self._roll(day)
+        self.exhausted.add(api_key)
+
+class RedisQuotaStore:
+    """
+    Keeps per-key quota usage in Redis, shared by every process and host.
+
+    Counters are per quota day, labelled with metrics.key_label() rather
+    than the key, and expire when the quota day ends.
+    """
+
+    def __init__(self, client=None):
+        if client is None:
+            from backend.cache import get_redis
+            client = get_redis()
+        self.client = client
+
+    def _key(self, day, api_key, name):
+        return f"quota:{day.isoformat()}:{key_label(api_key)}:{name}"
+
+    def usage(self, day, api_keys):
+        """Returns api_key -> (units used, exhausted) for the quota day, in one round-trip."""
+        names = [self._key(day, key, name) for key in api_keys for name in ('used', 'exhausted')]
+        values = self.client.mget(names)
+        return {
+            key: (int(values[2 * i] or 0), values[2 * i + 1] is not None)
+            for i, key in enumerate(api_keys)
+        }
+
+    def charge(self, day, api_key, cost):
+        name = self._key(day, api_key, 'used')
+        pipeline = self.client.pipeline()
+        pipeline.incrby(name, cost)
+        pipeline.expireat(name, _quota_day_end(day))
+        pipeline.execute()
+
+    def mark_exhausted(self, day, api_key):
+        name = self._key(day, api_key, 'exhausted')
+        pipeline = self.client.pipeline()
+        pipeline.set(name, 1)
+        pipeline.expireat(name, _quota_day_end(day))
+        pipeline.execute()
+
+def create_quota_store():
+    """Returns a RedisQuotaStore if QUOTA_BACKEND is 'redis', else a LocalQuotaStore."""
+    return RedisQuotaStore() if Config.QUOTA_BACKEND == 'redis' else LocalQuotaStore()
+
+def _is_quota_error(error):
+    content = (error.content or b'').lower()
+    return error.resp.status == 403 and (b'quota' in content or b'dailylimitexceeded' in content)
+
+class YouTubeAPI:
+    """
+    YouTube Data API client that schedules calls over several API keys.
+
+    Quota units spent per key are tracked from QUOTA_COSTS in a quota store
+    (see create_quota_store()). Calls go to the key with the most remaining
+    budget, and a quotaExceeded response marks the key as exhausted for the
+    rest of the quota day and moves on to the next one, so long ingestion
+    runs don't fail partway through.
+
+    The module-level fetch functions and AsyncYouTubeClient use the
+    process-wide instance from get_youtube_api() when given no API key:
+    execute() for the discovery client, acquire_key(), record_usage() and
+    key_exhausted() for the async one.
+
+    Args:
+        api_keys (list): YouTube Data API v3 keys.
+        daily_quota (int): Quota units available per key per day.
+        quota_store: LocalQuotaStore or RedisQuotaStore; a LocalQuotaStore
+            by default.
+    """
+
+    min_request_interval = 0.1  # seconds between requests
+
+    def __init__(self, api_keys, daily_quota=None, quota_store=None):
+        if not api_keys:
+            raise ValueError("At least one YouTube API key is required")
+        self.api_keys = list(api_keys)
+        self.daily_quota = daily_quota or Config.YOUTUBE_DAILY_QUOTA
+        self.quota_store = quota_store or LocalQuotaStore()
+        self.current_key_index = 0
+        self.last_request_time = None
+        self._lock = threading.RLock()
+        self.youtube = get_youtube_client(self.current_key)
+
+    @property
+    def current_key(self):
+        return self.api_keys[self.current_key_index]
+
+    def _use_key(self, index):
+        self.current_key_index = index
+        self.youtube = get_youtube_client(self.current_key)
+
+    def _remaining(self, api_keys):
+        usage = self.quota_store.usage(_quota_day(), api_keys)
+        return {
+            key: 0 if exhausted else max(self.daily_quota - used, 0)
+            for key, (used, exhausted) in usage.items()
+        }
+
+    def remaining_quota(self, api_key=None):
+        """Returns the quota units left today for a key (the current key by default)."""
+        with self._lock:
+            api_key = api_key or self.current_key
+            return self._remaining([api_key])[api_key]
+
+    def quota_status(self):
+        """
+        Reports the quota budget of every key.
+
+        Returns:
+            dict: Used and remaining units per key, keyed by
+            metrics.key_label() so the keys themselves are not exposed.
+        """
+        with self._lock:
+            usage = self.quota_store.usage(_quota_day(), self.api_keys)
+            return {
+                key_label(key): {
+                    'used': used,
+                    'remaining': 0 if exhausted else max(self.daily_quota - used, 0),
+                    'exhausted': exhausted
+                }
+                for key, (used, exhausted) in usage.items()
+            }
+
+    def select_api_key(self, cost=1):
+        """
+        Switches to the key with the most remaining budget.
+
+        Returns:
+            bool: False if no key has at least `cost` units left.
+        """
+        with self._lock:
+            remaining = list(self._remaining(self.api_keys).values())
+            best = max(range(len(self.api_keys)), key=remaining.__getitem__)
+            if remaining[best] < cost:
+                return False
+            if best != self.current_key_index:
+                self._use_key(best)
+            return True
+
+    def rotate_api_key(self):
+        """Moves to the next key in round-robin order."""
+        with self._lock:
+            self._use_key((self.current_key_index + 1) % len(self.api_keys))
+
+    def acquire_key(self, endpoint):
+        """
+        Returns the key to spend an `endpoint` call on, switching keys when
+        the current one can't cover its cost.
+
+        Raises:
+            QuotaExceededError: If every key has run out of quota.
+        """
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        with self._lock:
+            if self.remaining_quota() < cost and not self.select_api_key(cost):
+                raise QuotaExceededError("All YouTube API keys have exhausted their quota")
+            return self.current_key
+
+    def key_exhausted(self, api_key):
+        """
+        Marks a key as exhausted for today and switches keys.
+
+        Returns:
+            bool: True if another key with remaining budget is now current.
+        """
+        with self._lock:
+            logging.warning(f"Quota exceeded for API key {key_label(api_key)}")
+            self.quota_store.mark_exhausted(_quota_day(), api_key)
+            return self.select_api_key()
+
+    def handle_quota_exceeded(self):
+        """Marks the current key as exhausted; see key_exhausted()."""
+        return self.key_exhausted(self.current_key)
+
+    def apply_rate_limiting(self):
+        """Sleeps so consecutive requests start at least min_request_interval apart."""
+        with self._lock:
+            now = datetime.now()
+            start = now
+            if self.last_request_time is not None:
+                start = max(now, self.last_request_time + timedelta(seconds=self.min_request_interval))
+            # Claim the slot before sleeping, so other threads queue up
+            # behind it without waiting for the lock.
+            self.last_request_time = start
+        wait = (start - now).total_seconds()
+        if wait > 0:
+            time.sleep(wait)
+
+    def execute(self, endpoint, make_request):
+        """
+        Executes a request on the best available key, rotating on quota errors.
+
+        Args:
+            endpoint (str): Method name used to look up its cost in QUOTA_COSTS.
+            make_request (callable): Builds the request from a discovery client.
+
+        Returns:
+            dict: The API response.
+
+        Raises:
+            QuotaExceededError: If every key has run out of quota.
+            YouTubeAPIError: The matching exception for any other API error.
+        """
+        while True:
+            api_key = self.acquire_key(endpoint)
+            self.apply_rate_limiting()
+            try:
+                with youtube_call(endpoint.split('.')[0], 'scheduler'):
+                    response = make_request(get_youtube_client(api_key)).execute(http=thread_http())
+            except HttpError as e:
+                if not _is_quota_error(e):
+                    self.record_usage(api_key, endpoint)
+                    raise error_for_http_error(e) from e
+                if self.key_exhausted(api_key):
+                    continue
+                raise QuotaExceededError("All YouTube API keys have exhausted their quota") from e
+            self.record_usage(api_key, endpoint)
+            return response
+
+    def record_usage(self, api_key, endpoint):
+        """Charges an `endpoint` call to a key."""
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        with self._lock:
+            self.quota_store.charge(_quota_day(), api_key, cost)
+        record_quota(api_key, endpoint, cost)
+
+    def iter_comment_pages(self, video_id, order='time'):
+        """
+        Quota-aware counterpart of iter_comment_pages().
+
+        Yields:
+            list: The comment records of each page (see parse_comment_threads).
+        """
+        for response in self._iter_comment_thread_responses(video_id, order):
+            yield parse_comment_threads(response)
+
+    def iter_comment_batches(self, video_id, order='time'):
+        """Quota-aware counterpart of iter_comment_batches()."""
+        for response in self._iter_comment_thread_responses(video_id, order):
+            yield CommentBatch.from_comment_threads(response)
+
+    def _iter_comment_thread_responses(self, video_id, order):
+        return _paged_comment_threads(self.execute, video_id, order, 'scheduler')
+
+    def get_video_metadata(self, video_id):
+        """
+        Fetches videos.list metadata for a video.
+
+        Returns:
+            dict: The video resource, or None if it has none or the call fails.
+        """
+        try:
+            response = self.execute('videos.list', lambda youtube: youtube.videos().list(
+                part="snippet,contentDetails,statistics",
+                id=video_id
+            ))
+        except YouTubeAPIError as e:
+            logging.error(f"Failed to fetch metadata for video_id {video_id}: {e}")
+            return None
+        return response['items'][0] if response.get('items') else None
+
+def create_youtube_client(api_keys=None):
+    """
+    Creates a YouTubeAPI scheduler.
+
+    Args:
+        api_keys (list): API keys to schedule over. Defaults to the
+            comma-separated YOUTUBE_API_KEYS, or else YOUTUBE_API_KEY.
+    """
+    if api_keys is None:
+        configured = os.getenv('YOUTUBE_API_KEYS') or os.getenv('YOUTUBE_API_KEY') or ''
+        api_keys = [key.strip() for key in configured.split(',') if key.strip()]
+    return YouTubeAPI(api_keys, quota_store=create_quota_store())
+
+_youtube_api = None
+_youtube_api_lock = threading.Lock()
+
+def get_youtube_api():
+    """Returns the process-wide YouTubeAPI built from the configured keys."""
+    global _youtube_api
+    with _youtube_api_lock:
+        if _youtube_api is None:
+            _youtube_api = create_youtube_client()
+        return _youtube_api
 
 if __name__ == '__main__':
     # Example usage (replace with your video ID and API key)
@@ -0,0 +1,393 @@
+# backend/youtube_async.py
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+
+import aiohttp
+
+from backend.cache import cache_comment_batch, get_cached_comment_batch
+from backend.comment_batch import CommentBatch
+from backend.config import Config
+from backend.exceptions import InternalServerError, QuotaExceededError, ServiceUnavailableError
+from backend.metrics import YOUTUBE_ERRORS, YOUTUBE_REQUEST_SECONDS, record_pages, record_quota
+from backend.youtube_api import (
+    QUOTA_REASONS,
+    error_reason,
+    error_for_response,
+    get_youtube_api,
+    parse_comment_threads,
+    metadata_chunks,
+    cached_video_metadata,
+    cache_video_metadata_items
+)
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+
+def _is_retryable(error, status, reason):
+    return (
+        isinstance(error, (InternalServerError, ServiceUnavailableError))
+        or status == 429
+        or reason in RATE_LIMIT_REASONS
+    )
+
+
+class AsyncYouTubeClient:
+    """
+    aiohttp client for the YouTube Data API v3.
+
+    All requests made through one client share a pooled connector and are
+    bounded by a semaphore, so concurrent page or metadata fetches reuse
+    keep-alive connections. Transient failures (5xx, 429, rate limiting,
+    timeouts, dropped connections) are retried with exponential backoff and
+    jitter; other errors raise the matching exception from backend.exceptions.
+
+    Without an api_key, every call takes its key from a youtube_api.YouTubeAPI
+    scheduler (get_youtube_api() by default), is charged to that key, and
+    moves on to the next key when the current one runs out of quota. The
+    scheduler's request spacing is not applied; the semaphore bounds the
+    client instead.
+
+    Use it as an async context manager, or call close() when done. The
+    session is bound to the event loop that first uses it.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=None, timeout=None,
+                 max_retries=None, backoff_base=0.5, backoff_max=8.0, scheduler=None):
+        self.api_key = api_key
+        if scheduler is None and api_key is None:
+            scheduler = get_youtube_api()
+        self.scheduler = scheduler
+        self.base_url = (base_url or Config.YOUTUBE_API_BASE_URL).rstrip('/')
+        self.max_concurrency = max_concurrency or Config.YOUTUBE_HTTP_CONCURRENCY
+        self.timeout = aiohttp.ClientTimeout(total=timeout or Config.YOUTUBE_HTTP_TIMEOUT)
+        self.max_retries = Config.YOUTUBE_HTTP_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _charge(self, api_key, endpoint):
+        if self.scheduler is not None:
+            self.scheduler.record_usage(api_key, endpoint)
+        else:
+            record_quota(api_key, endpoint)
+
+    async def _get(self, resource, params):
+        session = self.session
+        url = f"{self.base_url}/{resource}"
+        endpoint = f"{resource}.list"
+        params = {key: value for key, value in params.items() if value is not None}
+
+        attempt = 0
+        while True:
+            api_key = self.scheduler.acquire_key(endpoint) if self.scheduler is not None else self.api_key
+            params['key'] = api_key
+            status = reason = None
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    async with session.get(url, params=params) as response:
+                        status = response.status
+                        payload = await response.json(content_type=None)
+                    YOUTUBE_REQUEST_SECONDS.labels(resource, 'async').observe(time.perf_counter() - started)
+                reason = error_reason(payload) if status != 200 else None
+                if reason not in QUOTA_REASONS:
+                    # Failed calls are charged too, except for running out of quota.
+                    self._charge(api_key, endpoint)
+                if status == 200:
+                    return payload
+                error = error_for_response(status, payload)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                error = ServiceUnavailableError(f"YouTube API request failed: {e!r}")
+            except ValueError as e:
+                error = InternalServerError(f"Invalid JSON from YouTube API: {e}")
+            YOUTUBE_ERRORS.labels(resource, type(error).__name__).inc()
+
+            if isinstance(error, QuotaExceededError) and self.scheduler is not None:
+                if self.scheduler.key_exhausted(api_key):
+                    continue  # Another key has budget left; not a retry.
+                raise error
+            if attempt == self.max_retries or not _is_retryable(error, status, reason):
+                raise error
+            delay = self._backoff(attempt)
+            attempt += 1
+            logger.warning(f"Retrying {resource} in {delay:.2f}s after error: {error}")
+            await asyncio.sleep(delay)
+
+    async def comment_threads(self, video_id, page_token=None, order='time', max_results=100):
+        """Calls commentThreads.list for one page of a video's comment threads."""
+        return await self._get('commentThreads', {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': max_results,
+            'order': order,
+            'pageToken': page_token
+        })
+
+    async def comments(self, parent_id, page_token=None, max_results=100):
+        """Calls comments.list for one page of replies to a top-level comment."""
+        return await self._get('comments', {
+            'part': 'snippet',
+            'parentId': parent_id,
+            'maxResults': max_results,
+            'pageToken': page_token
+        })
+
+    async def videos(self, video_ids, part='snippet,contentDetails,statistics'):
+        """Calls videos.list for up to 50 video IDs."""
+        if isinstance(video_ids, str):
+            video_ids = [video_ids]
+        return await self._get('videos', {'part': part, 'id': ','.join(video_ids)})
+
+    async def iter_comment_pages(self, video_id, order='time'):
+        """
+        Fetches a video's comments one commentThreads page at a time.
+
+        Yields:
+            list: The comment records of each page (see
+            youtube_api.parse_comment_threads).
+        """
+        async for response in self._iter_comment_thread_responses(video_id, order):
+            yield parse_comment_threads(response)
+
+    async def iter_comment_batches(self, video_id, order='time'):
+        """Like iter_comment_pages(), but yields each page as a CommentBatch."""
+        async for response in self._iter_comment_thread_responses(video_id, order):
+            yield CommentBatch.from_comment_threads(response)
+
+    async def _iter_comment_thread_responses(self, video_id, order):
+        page_token = None
+        pages = 0
+        try:
+            while True:
+                response = await self.comment_threads(video_id, page_token=page_token, order=order)
+                pages += 1
+                yield response
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        finally:
+            record_pages(pages, 'async')
+
+    async def fetch_comments(self, video_id):
+        """Returns the texts of all comments and inline replies of a video."""
+        return (await self.fetch_comment_batch(video_id)).texts()
+
+    async def fetch_comment_batch(self, video_id):
+        """Returns all comments and inline replies of a video as one CommentBatch."""
+        return CommentBatch.concat([batch async for batch in self.iter_comment_batches(video_id)])
+
+    async def fetch_video_metadata(self, video_id):
+        """Returns the videos.list resource for a video, or None if it has none."""
+        response = await self.videos([video_id])
+        return response['items'][0] if response.get('items') else None
+
+    async def fetch_video_metadata_batch(self, video_ids):
+        """
+        Returns video ID to videos.list resource, requesting 50 IDs per call concurrently.
+
+        Videos of a chunk whose request fails are logged and left out. The
+        error is raised only when every chunk failed.
+        """
+        chunks = list(metadata_chunks(video_ids))
+        responses = await asyncio.gather(*(self.videos(chunk) for chunk in chunks), return_exceptions=True)
+        metadata = {}
+        errors = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                logger.error(f"videos.list failed for {len(chunk)} videos ({chunk[0]}...): {response!r}")
+                errors.append(response)
+                continue
+            metadata.update((item['id'], item) for item in response.get('items', []))
+        if errors and len(errors) == len(chunks):
+            raise errors[0]
+        return metadata
+
+
+# One event loop thread per process runs every fetch made through run_sync(),
+# so the shared client's connection pool outlives the requests using it.
+_shared_lock = threading.Lock()
+_shared_loop = None
+_shared_client = None
+
+
+def _loop():
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None:
+            _shared_loop = asyncio.new_event_loop()
+            threading.Thread(target=_shared_loop.run_forever, name='youtube-async', daemon=True).start()
+        return _shared_loop
+
+
+def _on_shared_loop():
+    try:
+        return asyncio.get_running_loop() is _shared_loop
+    except RuntimeError:
+        return False
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine on the process's shared event loop and returns its result.
+
+    Blocks the calling thread. As with asyncio.run(), the coroutine runs in
+    a copy of the caller's context, so its timing stages are recorded.
+    """
+    loop = _loop()
+    if _on_shared_loop():
+        raise RuntimeError("run_sync() called from the shared event loop")
+    context = contextvars.copy_context()
+    done = concurrent.futures.Future()
+
+    def start():
+        task = context.run(loop.create_task, coro)
+        task.add_done_callback(functools.partial(_resolve, done))
+
+    loop.call_soon_threadsafe(start)
+    return done.result()
+
+
+def _resolve(future, task):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def get_async_client():
+    """
+    Returns the process's shared AsyncYouTubeClient.
+
+    Its session belongs to the shared event loop, so only use it from
+    coroutines run with run_sync().
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = AsyncYouTubeClient()
+        return _shared_client
+
+
+def reset_async_client():
+    """
+    Forgets the shared event loop and client.
+
+    Call it in a freshly forked worker: the loop thread did not survive the
+    fork, and the client's connections belong to the parent.
+    """
+    global _shared_lock, _shared_loop, _shared_client
+    _shared_lock = threading.Lock()
+    _shared_loop = None
+    _shared_client = None
+
+
+async def fetch_comments(video_id, api_key=None, client=None):
+    """
+    Async counterpart of youtube_api.fetch_comments sharing its cache entry.
+
+    Args:
+        video_id (str): The ID of the YouTube video.
+        api_key (str): The API key for YouTube Data API v3, or None to use
+            the key pool of youtube_api.get_youtube_api().
+        client (AsyncYouTubeClient): Client to reuse. When omitted, the
+            shared client is used on the run_sync() loop and a short-lived
+            one is created anywhere else.
+
+    Returns:
+        list: A list of comment texts.
+
+    Raises:
+        YouTubeAPIError: If the API request ultimately fails.
+    """
+    return (await fetch_comment_batch(video_id, api_key, client=client)).texts()
+
+
+async def fetch_comment_batch(video_id, api_key=None, client=None):
+    """
+    Async counterpart of youtube_api.fetch_comment_batch sharing its cache entry.
+
+    Returns:
+        CommentBatch: Every comment and inline reply of the video.
+
+    Raises:
+        YouTubeAPIError: If the API request ultimately fails.
+    """
+    # Cache reads and writes block on Redis (and compress), so they run off
+    # the event loop, which may be the one every request shares.
+    cached_comments = await asyncio.to_thread(get_cached_comment_batch, video_id)
+    if cached_comments is not None:
+        return cached_comments
+
+    if client is None and api_key is None and _on_shared_loop():
+        client = get_async_client()
+    if client is None:
+        async with AsyncYouTubeClient(api_key) as client:
+            comments = await client.fetch_comment_batch(video_id)
+    else:
+        comments = await client.fetch_comment_batch(video_id)
+    await asyncio.to_thread(cache_comment_batch, video_id, comments)
+    return comments
+
+
+async def fetch_video_metadata_batch(video_ids, api_key=None, client=None):
+    """
+    Async counterpart of youtube_api.fetch_video_metadata_batch sharing its cache entries.
+
+    Returns:
+        dict: Video ID to metadata for every video that was found.
+
+    Raises:
+        YouTubeAPIError: If every videos.list request ultimately fails.
+    """
+    metadata, missing = await asyncio.to_thread(cached_video_metadata, video_ids)
+    if not missing:
+        return metadata
+
+    if client is None and api_key is None and _on_shared_loop():
+        client = get_async_client()
+    if client is None:
+        async with AsyncYouTubeClient(api_key) as client:
+            fetched = await client.fetch_video_metadata_batch(missing)
+    else:
+        fetched = await client.fetch_video_metadata_batch(missing)
+    await asyncio.to_thread(cache_video_metadata_items, list(fetched.values()))
+    metadata.update(fetched)
+    return metadata
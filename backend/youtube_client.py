@@ -1,10 +1,70 @@
 from googleapiclient.discovery import build
-from config import Config
+from googleapiclient.http import build_http
+from backend.config import Config
 import logging
+import threading
 
-def get_youtube_client():
-    try:
-        return build('youtube', 'v3', developerKey=Config.YOUTUBE_API_KEY)
-    except Exception as e:
-        logging.error(f"Failed to initialize YouTube client: {e}")
-        raise
\ No newline at end of file
+# One discovery-built client per API key for the whole process. Building a
+# client parses the (vendored) discovery document, so it is only done once.
+_clients = {}
+_clients_lock = threading.Lock()
+
+# httplib2.Http is not thread-safe, so every thread keeps its own transport
+# and reuses its connections across requests.
+_thread_local = threading.local()
+
+DEFAULT_API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+
+def _client_options():
+    # The discovery document's method paths already start with youtube/v3/,
+    # so the endpoint override is just the scheme and host.
+    base_url = Config.YOUTUBE_API_BASE_URL.rstrip('/')
+    if base_url == DEFAULT_API_BASE_URL:
+        return None
+    if base_url.endswith('/youtube/v3'):
+        base_url = base_url[:-len('/youtube/v3')]
+    return {'api_endpoint': base_url + '/'}
+
+def get_youtube_client(api_key=None):
+    """
+    Returns the shared YouTube Data API client for an API key.
+
+    The client is built from the discovery document bundled with
+    google-api-python-client, so no network fetch happens on first use.
+    Requests go to Config.YOUTUBE_API_BASE_URL when it is overridden.
+    Execute its requests with http=thread_http() when sharing it between threads.
+
+    Args:
+        api_key (str): The API key; defaults to Config.YOUTUBE_API_KEY.
+    """
+    api_key = api_key or Config.YOUTUBE_API_KEY
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            try:
+                client = build(
+                    'youtube', 'v3',
+                    developerKey=api_key,
+                    static_discovery=True,
+                    client_options=_client_options()
+                )
+            except Exception as e:
+                logging.error(f"Failed to initialize YouTube client: {e}")
+                raise
+            _clients[api_key] = client
+        return client
+
+def thread_http():
+    """Returns the calling thread's HTTP transport for executing client requests."""
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = _thread_local.http = build_http()
+    return http
+
+def clear_youtube_clients():
+    """Drops every cached client, e.g. after rotating API keys or in tests."""
+    with _clients_lock:
+        _clients.clear()